@@ -22,15 +22,28 @@
 # GNU General Public License along with
 # Decision Descent.  If not,
 # see <https://www.gnu.org/licenses/>.
+import importlib
 import typing
 
 __all__ = ['DescentClient']
 
 from PyQt5 import QtCore
-from . import logic, widgets as descent_widgets, dataclasses as descent_dataclasses
 from core import utils
 from QtUtilities import settings as qsettings
 
+if typing.TYPE_CHECKING:
+    from PyQt5 import QtWidgets
+    from . import logic, widgets as descent_widgets, dataclasses as descent_dataclasses
+
+
+def __getattr__(name: str) -> typing.Any:
+    # Subpackages are loaded on first use so a disabled or headless extension
+    # doesn't pay for Qt widgets, networking, or fuzzy matching at import time.
+    if name in {'logic', 'widgets', 'dataclasses'}:
+        return importlib.import_module(f'.{name}', __name__)
+    
+    raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
+
 
 class DescentClient(utils.dataclasses.Extension):
     DISPLAY_NAME = 'Decision Descent'
@@ -44,13 +57,29 @@ class DescentClient(utils.dataclasses.Extension):
         # Super call
         super(DescentClient, self).__post_init__(parent=parent)
         
+        from PyQt5 import QtWidgets
+        from . import logic
+        from .logic import catchable
+        
         # Internal attributes
         self._arbiter = logic.Arbiter(self.bot, parent=self)
+        self._profile_action = QtWidgets.QAction('Profile Decision Descent', parent=self)
         
         # Internal calls
-        self._arbiter.pollCreated.connect(self.broadcast)
-        self.bot.aboutToStart.connect(self._arbiter._http.connect)
-        self.bot.aboutToStop.connect(self._arbiter._http.disconnect)
+        self._arbiter.pollCreated.connect(catchable.signal(self.broadcast))
+        self.bot.aboutToStart.connect(self._arbiter.start_watchdog)
+        self.bot.aboutToStart.connect(self._arbiter.start_shards)
+        self.bot.aboutToStop.connect(self._arbiter.shutdown)
+        
+        self._profile_action.setCheckable(True)
+        self._profile_action.setToolTip('Records where the client spends its time until unchecked.')
+        self._profile_action.toggled.connect(self._arbiter.set_profiling)
+        self._arbiter.profilerToggled.connect(self._profile_action.setChecked)
+    
+    # Action methods
+    def get_actions(self) -> typing.List['QtWidgets.QAction']:
+        """Returns the actions Decision Descent exposes to the bot's UI."""
+        return [self._profile_action]
     
     # Settings methods
     def register_settings(self):
@@ -80,7 +109,24 @@ class DescentClient(utils.dataclasses.Extension):
         """Stitches the settings' signals to their respective slots."""
     
     def validate_settings(self):
-        """Validates the extension's settings."""
+        """Validates the extension's settings.
+        
+        * Settings added since the user's settings were generated are added
+        with their defaults; existing values are left alone."""
+        existing = self.bot.settings['extensions'][self.NAME]
+        
+        for setting in self.generate_settings():
+            self.merge_setting(existing, setting)
+    
+    def merge_setting(self, parent: qsettings.Setting, setting: qsettings.Setting):
+        """Adds a generated setting to its parent if it's missing, or merges
+        its children into the existing one if it isn't."""
+        if setting.key not in parent:
+            self.LOGGER.info(f'Adding missing setting "{setting.key}" with its default...')
+            return parent.add_child(setting)
+        
+        for child in setting.children:
+            self.merge_setting(parent[setting.key], child)
     
     @staticmethod
     def generate_settings() -> typing.List[qsettings.Setting]:
@@ -90,21 +136,37 @@ class DescentClient(utils.dataclasses.Extension):
             'rng': qsettings.Setting('rng', display_name='RNG',
                                      tooltip='Settings related to the RNG aspect of the mod.'),
             'polls': qsettings.Setting('polls', tooltip='Settings related to the poll aspect of the mod.'),
-            'hud': qsettings.Setting('hud', tooltip='Settings related to the HUD of the mod.')
+            'http': qsettings.Setting('http', display_name='HTTP',
+                                      tooltip='Settings related to the connection with the mod.'),
+            'hud': qsettings.Setting('hud', tooltip='Settings related to the HUD of the mod.'),
+            'debug': qsettings.Setting('debug', tooltip='Settings related to diagnosing the extension.')
         }
         
         # rng.rooms
-        top['rng'].add_child(
+        top['rng'].add_children(
             qsettings.Setting('rooms', tooltip='Settings related to the room RNG aspect of the mod.'),
-            qsettings.Setting('items', tooltip='Settings related to the item RNG aspect of the mod.')
+            qsettings.Setting('items', tooltip='Settings related to the item RNG aspect of the mod.'),
+            qsettings.Setting('seed', 0,
+                              tooltip='The seed used when drawing poll choices on the client.\n\n'
+                                      'If this is 0, the seed of the current run is used instead.')
         )
         
         # polls.choices
         top['polls'].add_children(
             qsettings.Setting('choices', tooltip='Settings related to poll choices.'),
+            qsettings.Setting('conclusion', display_name='Early conclusion',
+                              tooltip='Settings related to concluding polls before their timer runs out.'),
+            qsettings.Setting('overload', tooltip='Settings related to tallying votes when chat is too busy.'),
             qsettings.Setting('duration', 35, tooltip='The number of seconds polls should run before being concluded.'),
             qsettings.Setting('chat', True, display_name='Output to chat',
-                              tooltip='Whether or not new polls will be posted in chat.')
+                              tooltip='Whether or not new polls will be posted in chat.'),
+            qsettings.Setting('framerate', 10, display_name='Frame rate',
+                              tooltip='The maximum number of times per second a poll will be repainted.'),
+            qsettings.Setting('budget', 50, display_name='Render budget',
+                              tooltip='The maximum number of milliseconds per second a poll may spend repainting.'),
+            qsettings.Setting('shards', 0, display_name='Vote shards',
+                              tooltip='The number of worker processes chat votes are split between.  '
+                                      '0 tallies votes on the client\'s own thread.')
         )
         
         # polls.choices settings
@@ -115,18 +177,71 @@ class DescentClient(utils.dataclasses.Extension):
                                       'are present, but standard choices will adhere to this setting.')
         )
         
+        # polls.conclusion settings
+        top['polls']['conclusion'].add_children(
+            qsettings.Setting('electorate', 0,
+                              tooltip='The number of viewers expected to vote in a poll.  0 means the '
+                                      'number of voters is unknown.'),
+            qsettings.Setting('lead', True, display_name='Decisive lead',
+                              tooltip="Whether or not polls conclude once the leading choice can't be "
+                                      "caught by the voters left in the electorate, or by voters "
+                                      "changing their vote.\n\n"
+                                      "This has no effect if the electorate is 0."),
+            qsettings.Setting('supermajority', 0,
+                              tooltip='The percentage of votes a single choice needs for its poll to '
+                                      'conclude.  0 disables this.'),
+            qsettings.Setting('minimum', 10, display_name='Supermajority minimum',
+                              tooltip='The number of votes that must be cast before a supermajority '
+                                      'can conclude a poll.'),
+            qsettings.Setting('quorum', 0,
+                              tooltip='The number of votes that conclude a poll.  0 disables this.')
+        )
+        
+        # polls.overload settings
+        top['polls']['overload'].add_children(
+            qsettings.Setting('rate', 1000,
+                              tooltip='The number of votes per second above which running polls tally '
+                                      'votes approximately, by sampling participants.  0 disables this.'),
+            qsettings.Setting('capacity', 100000,
+                              tooltip='The number of participants an approximately tallied poll is sized '
+                                      'for.  Each participant costs about two bytes.')
+        )
+        
+        # http settings
+        top['http'].add_children(
+            qsettings.Setting('port', 25565,
+                              tooltip='The port the client listens for the mod on.  This must match the '
+                                      'port in the mod\'s config.lua.'),
+            qsettings.Setting('transport', 'qt',
+                              tooltip='How the client talks to the mod; "qt" for Qt\'s sockets, or "asyncio" '
+                                      'for asyncio\'s streams on a thread of their own.  This is only read '
+                                      'when the bot starts.')
+        )
+        
         # hud settings
         top['hud'].add_children(
             qsettings.Setting('enabled', True,
                               tooltip='Whether or not the HUD is enabled.\n\n'
-                                      'The hud is a "small" overlay that displays information about the mod.')
+                                      'The hud is a "small" overlay that displays information about the mod.'),
+            qsettings.Setting('rate', 4, display_name='Update rate',
+                              tooltip='The maximum number of times per second the HUD is sent the '
+                                      'standings of running polls.')
+        )
+        
+        # debug settings
+        top['debug'].add_children(
+            qsettings.Setting('profiles', 'profiles', display_name='Profile directory',
+                              tooltip='The directory profiles are written to when the profiler is stopped.'),
+            qsettings.Setting('watchdog', 0, display_name='Stall threshold',
+                              tooltip='The number of milliseconds the event loop may be blocked for before '
+                                      'the stall is recorded.  0, the default, disables the watchdog.')
         )
         
         # Return values
         return list(top.values())
     
     # Platform methods
-    def broadcast(self, poll: descent_widgets.Poll):
+    def broadcast(self, poll: 'descent_widgets.Poll'):
         """Broadcasts a new poll to all available platforms."""
         if self.bot.settings['extensions']['descentisaac']['polls']['chat'].value:
             for ext in self.bot.extensions:
@@ -134,6 +249,21 @@ class DescentClient(utils.dataclasses.Extension):
                     for choice in poll.get_choices():
                         ext.send_message(f'[#{choice.id}] {choice.name}')
     
+    def listen(self):
+        """Connects every platform's incoming chat to the arbiter, so chat
+        messages can be counted as votes."""
+        for ext in self.bot.extensions:
+            if not isinstance(ext, utils.dataclasses.Platform):
+                continue
+            
+            signal = getattr(ext, 'onMessage', None)
+            
+            if signal is None:
+                self.LOGGER.warning(f"{ext.__class__.__name__} doesn't emit chat messages; its chat can't vote.")
+                continue
+            
+            signal.connect(self._arbiter.process_chat)
+    
     # Lifecycle methods
     def setup(self):
         """Sets up Decision Descent."""
@@ -147,11 +277,14 @@ class DescentClient(utils.dataclasses.Extension):
         
         self.LOGGER.info('Setting up bindings...')
         
-        self.LOGGER.debug('Binding ShovelBot.aboutToStart » HTTP.connect')
-        self.bot.aboutToStart.connect(self._http.connect)
+        self.LOGGER.debug('Binding Platform.onMessage » Arbiter.process_chat')
+        self.listen()
+        
+        self.LOGGER.debug('Binding ShovelBot.aboutToStart » Arbiter.start_transport')
+        self.bot.aboutToStart.connect(self._arbiter.start_transport)
         
-        self.LOGGER.debug('Binding ShovelBot.aboutToStop » HTTP.disconnect')
-        self.bot.aboutToStop.connect(self._http.disconnect)
+        self.LOGGER.debug('Binding ShovelBot.aboutToStop » Arbiter.stop_transport')
+        self.bot.aboutToStop.connect(self._arbiter.stop_transport)
         
         self.set_state(utils.enums.ExtensionStates.SET_UP)
         self.LOGGER.info(f'{self.DISPLAY_NAME} successfully set up!')
@@ -159,6 +292,6 @@ class DescentClient(utils.dataclasses.Extension):
     def teardown(self):
         """Tears down Decision Descent."""
         self.LOGGER.warning('Disconnecting from client...')
-        self._http.disconnect()
+        self._arbiter.stop_transport()
         
         super(DescentClient, self).teardown()
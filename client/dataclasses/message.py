@@ -29,6 +29,10 @@ import typing
 
 from ..logic import errors
 
+if typing.TYPE_CHECKING:
+    from ..logic.router import Router
+    from ..logic.schema import Schema
+
 __all__ = ['Message']
 
 bases = typing.Union[str, int, float, list, dict]
@@ -45,14 +49,44 @@ class Message:
     reply: str
     
     @classmethod
-    def from_json(cls, message: dict) -> 'Message':
-        """Converts a raw decoded message into a Message object."""
-        kwargs: typing.Dict[str, bases] = message.pop('kwargs', {})
+    def from_json(cls, message: dict, schemas: typing.Mapping[str, 'Schema'] = None) -> 'Message':
+        """Converts a raw decoded message into a Message object.
+        
+        :param message: The decoded message.
+        :param schemas: The argument schemas of registered intents.  Messages
+                        for intents with a schema have their arguments
+                        validated and coerced.
+        :raises MalformedMessageError: The message is missing its intent, or
+                                       its arguments don't match the intent's
+                                       schema."""
+        if not isinstance(message, dict):
+            raise errors.MalformedMessageError(f'Messages must be objects, not {type(message).__name__}')
+        
+        # Lua can't tell empty arrays and empty objects apart, so empty args
+        # and kwargs of either kind are accepted.
+        intent = message.get('intent')
+        args = message.get('args') or ()
+        kwargs = message.get('kwargs') or {}
+        reply = message.get('reply')
+        
+        if not isinstance(intent, str) or not intent:
+            raise errors.MalformedMessageError(f'Message is missing its intent!  ({message!r:.80})')
+        
+        if not isinstance(args, (list, tuple)):
+            raise errors.MalformedMessageError(f'{intent}: args must be a list, not {type(args).__name__}')
         
         if not isinstance(kwargs, dict):
-            kwargs = {}
+            raise errors.MalformedMessageError(f'{intent}: kwargs must be an object, not {type(kwargs).__name__}')
         
-        return cls(message.pop('intent'), message.get('args', tuple()), kwargs, message.get('reply'))
+        if reply is not None and not isinstance(reply, str):
+            raise errors.MalformedMessageError(f'{intent}: reply must be a string, not {type(reply).__name__}')
+        
+        schema = schemas.get(intent.lower()) if schemas else None
+        
+        if schema is not None:
+            args, kwargs = schema(intent, args, kwargs)
+        
+        return cls(intent, tuple(args), kwargs, reply)
     
     def to_dict(self) -> dict:
         """Converts a message instance into a dict."""
@@ -61,9 +95,11 @@ class Message:
     def __str__(self):
         return json.dumps(dataclasses.asdict(self))
     
-    def __call__(self, intents: typing.Dict[str, typing.Callable]):
-        """Runs the message's requested intent with the specified arguments."""
-        func = intents[self.intent]
+    def __call__(self, router: 'Router'):
+        """Runs the message's requested intent with the specified arguments.
+        
+        * Intents the router can't resolve raise an IntentNotFoundError."""
+        func = router.resolve(self.intent)
         
         if not callable(func):
             self.LOGGER.warning(f'Intent "{self.intent}" is not a callable!')
@@ -82,7 +118,7 @@ class Message:
     
     def __repr__(self):
         return (f'<{self.__class__.__name__} '
-                f'intent="{self.intent}" '
-                f'args=[{",".join(self.args)}] '
-                f'kwargs={{{json.dumps(self.kwargs)}}} '
-                f'reply="{self.reply}"')
+                f'intent={self.intent!r} '
+                f'args=[{", ".join(repr(a) for a in self.args)}] '
+                f'kwargs={self.kwargs!r} '
+                f'reply={self.reply!r}>')
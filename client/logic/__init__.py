@@ -22,9 +22,100 @@
 # GNU General Public License along with
 # Decision Descent.  If not,
 # see <https://www.gnu.org/licenses/>.
+import importlib
+import typing
+
 __all__ = ['HTTP']
 
-from .arbiter import Arbiter
-from .catchable import signal
-from .errors import DescentError, IntentExistsError, IntentNotFoundError
-from .http import HTTP
+# Subsystems are only imported once one of their members is first used, so
+# importing the extension doesn't pull in Qt networking or the poll widgets.
+_LAZY = {
+    'AsyncHTTP': '.aio',
+    'Emitter': '.aio',
+    'Arbiter': '.arbiter',
+    'Catalog': '.catalog',
+    'CatalogEntry': '.catalog',
+    'Clock': '.clock',
+    'MonotonicClock': '.clock',
+    'VirtualClock': '.clock',
+    'signal': '.catchable',
+    'DescentError': '.errors',
+    'IntentExistsError': '.errors',
+    'IntentNotFoundError': '.errors',
+    'MalformedMessageError': '.errors',
+    'ExecutionMode': '.executor',
+    'IntentExecutor': '.executor',
+    'HTTP': '.http',
+    'PollLifecycle': '.lifecycle',
+    'PollRecord': '.lifecycle',
+    'PollState': '.lifecycle',
+    'OutboundQueue': '.outbound',
+    'Priority': '.outbound',
+    'ConclusionPolicy': '.policies',
+    'Lead': '.policies',
+    'Quorum': '.policies',
+    'Standings': '.policies',
+    'Supermajority': '.policies',
+    'BloomFilter': '.prefilter',
+    'FilterStats': '.prefilter',
+    'PreFilter': '.prefilter',
+    'HandlerStats': '.profiler',
+    'Profiler': '.profiler',
+    'Recording': '.profiler',
+    'AliasTable': '.rng',
+    'RNG': '.rng',
+    'WeightedSampler': '.rng',
+    'Middleware': '.router',
+    'Router': '.router',
+    'ListOf': '.schema',
+    'MapOf': '.schema',
+    'Nullable': '.schema',
+    'Schema': '.schema',
+    'Handshake': '.session',
+    'Session': '.session',
+    'Shard': '.shards',
+    'ShardPool': '.shards',
+    'shard_of': '.shards',
+    'ApproximateTally': '.sketch',
+    'ErrorBounds': '.sketch',
+    'StandingsStream': '.standings',
+    'merge_standings': '.standings',
+    'Stall': '.watchdog',
+    'Watchdog': '.watchdog'
+}
+
+if typing.TYPE_CHECKING:
+    from .aio import AsyncHTTP, Emitter
+    from .arbiter import Arbiter
+    from .catalog import Catalog, CatalogEntry
+    from .clock import Clock, MonotonicClock, VirtualClock
+    from .catchable import signal
+    from .errors import DescentError, IntentExistsError, IntentNotFoundError, MalformedMessageError
+    from .executor import ExecutionMode, IntentExecutor
+    from .http import HTTP
+    from .lifecycle import PollLifecycle, PollRecord, PollState
+    from .outbound import OutboundQueue, Priority
+    from .policies import ConclusionPolicy, Lead, Quorum, Standings, Supermajority
+    from .prefilter import BloomFilter, FilterStats, PreFilter
+    from .profiler import HandlerStats, Profiler, Recording
+    from .rng import AliasTable, RNG, WeightedSampler
+    from .router import Middleware, Router
+    from .schema import ListOf, MapOf, Nullable, Schema
+    from .session import Handshake, Session
+    from .shards import Shard, ShardPool, shard_of
+    from .sketch import ApproximateTally, ErrorBounds
+    from .standings import StandingsStream, merge_standings
+    from .watchdog import Stall, Watchdog
+
+
+def __getattr__(name: str) -> typing.Any:
+    try:
+        module = importlib.import_module(_LAZY[name], __name__)
+    
+    except KeyError:
+        raise AttributeError(f'module {__name__!r} has no attribute {name!r}') from None
+    
+    value = getattr(module, name)
+    globals()[name] = value
+    
+    return value
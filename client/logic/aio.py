@@ -0,0 +1,322 @@
+# This file is part of Decision Descent.
+#
+# Decision Descent is free software:
+# you can redistribute it
+# and/or modify it under the
+# terms of the GNU General
+# Public License as published by
+# the Free Software Foundation,
+# either version 3 of the License,
+# or (at your option) any later
+# version.
+#
+# Decision Descent is distributed in
+# the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without
+# even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A
+# PARTICULAR PURPOSE.  See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the
+# GNU General Public License along with
+# Decision Descent.  If not,
+# see <https://www.gnu.org/licenses/>.
+import asyncio
+import logging
+import threading
+import typing
+
+from .outbound import Priority
+from .session import Handshake, Session
+from .. import dataclasses as descent_dataclasses
+
+if typing.TYPE_CHECKING:
+    from concurrent import futures
+    from .schema import Schema
+
+__all__ = ['AsyncHTTP', 'Emitter']
+
+
+class Emitter:
+    """A minimal stand-in for a Qt signal, for code that runs without Qt's
+    event loop.
+    
+    * Slots are called on whichever thread emits."""
+    
+    def __init__(self):
+        # Private attributes
+        self._slots: typing.List[typing.Callable] = []
+    
+    def connect(self, slot: typing.Callable):
+        self._slots.append(slot)
+    
+    def disconnect(self, slot: typing.Callable = None):
+        """Disconnects a slot, or every slot if one isn't passed."""
+        if slot is None:
+            return self._slots.clear()
+        
+        self._slots.remove(slot)
+    
+    def emit(self, *args: typing.Any):
+        for slot in list(self._slots):
+            slot(*args)
+
+
+class AsyncHTTP:
+    """Connects to the other half of the mod with asyncio's streams, rather
+    than Qt's sockets.
+    
+    The transport runs on an asyncio event loop; either the one passed in, or
+    one it starts on its own thread when `connect` is called.  Its signals
+    are emitted on that loop's thread, and every other method may be called
+    from any thread.
+    
+    Like `HTTP`, outgoing messages are only handed to the socket while its
+    write buffer is below `WATERMARK`, so urgent messages overtake bulk
+    traffic when the link is busy."""
+    LOGGER: logging.Logger = logging.getLogger("extensions.DescentClient.aio")
+    WATERMARK: int = 16 * 1024  # Bytes the socket may buffer before messages are held back
+    CHUNK: int = 64 * 1024  # Bytes read from the socket at a time
+    LIMIT: int = 4 * 1024 * 1024  # Bytes a single line may hold before it's discarded
+    
+    def __init__(self, replay: int = 256, loop: asyncio.AbstractEventLoop = None):
+        # Signals
+        self.onResponse: Emitter = Emitter()
+        self.onConnectionReceived: Emitter = Emitter()
+        self.onSessionResumed: Emitter = Emitter()
+        
+        # Internal attributes
+        self._loop: typing.Optional[asyncio.AbstractEventLoop] = loop
+        self._thread: typing.Optional[threading.Thread] = None  # Only set if the transport started its own loop
+        self._server: typing.Optional[asyncio.AbstractServer] = None
+        self._writer: typing.Optional[asyncio.StreamWriter] = None
+        self._session: Session = Session(replay)
+        
+        # Outbound attributes
+        self._lock: threading.Lock = threading.Lock()
+        self._inbox: typing.List[typing.Tuple] = []  # Messages queued since the last flush, from any thread
+        self._flush_pending: bool = False
+        
+        # Public attributes
+        self.schemas: typing.Dict[str, 'Schema'] = self._session.schemas  # Validates the arguments of messages
+    
+    # Connection methods
+    def connect(self, port: int, host: str = '127.0.0.1') -> 'futures.Future':
+        """Listens for the mod on the specified port.
+        
+        * If the transport wasn't given a loop, it starts its own on a
+        daemon thread."""
+        if self._loop is None:
+            self._loop = asyncio.new_event_loop()
+            self._thread = threading.Thread(target=self._loop.run_forever, name='descent-transport', daemon=True)
+            self._thread.start()
+        
+        return asyncio.run_coroutine_threadsafe(self.serve(port, host), self._loop)
+    
+    def disconnect(self):
+        """Stops listening for the mod, and stops the transport's own loop if
+        it started one."""
+        if self._loop is None:
+            return
+        
+        future = asyncio.run_coroutine_threadsafe(self.close(), self._loop)
+        
+        if self._thread is None:
+            return
+        
+        future.result()
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+        self._loop.close()
+        
+        self._loop = self._thread = None
+    
+    async def serve(self, port: int, host: str = '127.0.0.1'):
+        """Listens for the mod on the specified port."""
+        try:
+            self._server = await asyncio.start_server(self.process_new_client, host, port)
+        
+        except OSError as e:
+            self.LOGGER.critical(f'Could not create a server on port {port}')
+            return self.LOGGER.critical(f'Error message:  {e!s}')
+        
+        self.LOGGER.info(f'Client bound to port {port}')
+    
+    async def close(self):
+        """Stops listening for the mod, and drops its connection."""
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+        
+        if self._writer is not None:
+            self._writer.close()
+        
+        self._server = self._writer = None
+    
+    def send_message(self, message: descent_dataclasses.Message, priority: Priority = Priority.REPLY,
+                     key: str = None, merge: typing.Callable = None):
+        """Queues a message for the connected client.
+        
+        :param message: The message to send.
+        :param priority: The message's priority class.
+        :param key: Identifies queued messages this message supersedes.
+        :param merge: Combines a superseded message with this one.
+        
+        * Messages are sent on the loop's next pass, most urgent first.
+        Messages queued while no session is established are sent once one
+        is."""
+        with self._lock:
+            self._inbox.append((message, priority, key, merge))
+            
+            if self._flush_pending or self._loop is None:
+                return
+            
+            self._flush_pending = True
+        
+        self._loop.call_soon_threadsafe(self.flush)
+    
+    def send_batch(self, messages: typing.Iterable[descent_dataclasses.Message], atomic: bool = False,
+                   reply: str = None, priority: Priority = Priority.REPLY):
+        """Queues several messages to be sent in a single batch envelope.
+        
+        :param messages: The messages to send.
+        :param atomic: Whether the mod should reject the whole batch if any
+                       message can't be executed.
+        :param reply: The intent to invoke with every message's result.
+        :param priority: The batch's priority class."""
+        payloads = [m.to_dict() for m in messages]
+        
+        self.send_message(descent_dataclasses.Message('batch', payloads, {'atomic': atomic}, reply), priority)
+    
+    def flush(self):
+        """Writes queued messages until the queue is empty, or the socket's
+        write buffer reaches the watermark.
+        
+        * This must be called on the loop's thread."""
+        with self._lock:
+            inbox, self._inbox = self._inbox, []
+            self._flush_pending = False
+        
+        for args in inbox:
+            self._session.push(*args)
+        
+        if self._writer is None:
+            return
+        
+        transport = self._writer.transport
+        
+        while self._session.has_pending() and transport.get_write_buffer_size() < self.WATERMARK:
+            data = self._session.next()
+            
+            try:
+                self.write(data)
+            
+            except ConnectionError as e:
+                # The message is already in the replay buffer, so it'll be
+                # delivered if the client resumes.
+                return self.LOGGER.warning(f'Could not send message #{self._session.sent}!  {e!s}')
+        
+        if self._session.has_pending():
+            self._loop.create_task(self.drain(self._writer))
+    
+    async def drain(self, writer: asyncio.StreamWriter):
+        """Resumes flushing once the socket's write buffer has drained."""
+        try:
+            await writer.drain()
+        
+        except ConnectionError:
+            return
+        
+        if writer is self._writer:
+            self.flush()
+    
+    def write(self, data: bytes):
+        """Writes raw data to the connected client.
+        
+        * This must be called on the loop's thread."""
+        if self._writer is None or self._writer.is_closing():
+            raise ConnectionError('No client connected!')
+        
+        self._writer.write(data)
+    
+    # Session methods
+    def handshake(self, handshake: Handshake):
+        """Sends a client what its handshake requires, then everything queued
+        for it.
+        
+        * Clients that can't be written to are treated as disconnected.  The
+        mod sends its handshake again until it's answered."""
+        try:
+            for data in handshake.data:
+                self.write(data)
+        
+        except ConnectionError as e:
+            self._session.detach()
+            return self.LOGGER.warning(f'Could not complete handshake!  {e!s}')
+        
+        if handshake.resumed:
+            self.onSessionResumed.emit()
+        
+        else:
+            self.onConnectionReceived.emit()
+        
+        self.flush()
+    
+    # Slots
+    async def process_new_client(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        """Called whenever the server receives a new connection, and reads
+        from it until it closes.
+        
+        * The client isn't considered connected until it sends its session
+        handshake."""
+        self.LOGGER.info('New connection received!')
+        
+        if self._writer is not None:
+            self.LOGGER.warning('A client was already connected!')
+            self.LOGGER.warning('Disconnecting old client...')
+            self._writer.close()
+        
+        self._session.detach()
+        self._writer = writer
+        writer.transport.set_write_buffer_limits(high=self.WATERMARK)
+        
+        buffer = b''
+        
+        try:
+            while writer is self._writer:
+                chunk = await reader.read(self.CHUNK)
+                
+                if not chunk:
+                    break
+                
+                # Every complete line is handled at once, rather than awaiting
+                # the reader for each one.
+                *lines, buffer = (buffer + chunk).split(b'\n')
+                
+                for line in lines:
+                    self.process_message(line)
+                
+                if len(buffer) > self.LIMIT:
+                    self.LOGGER.warning(f'Discarded a message over {self.LIMIT} bytes long!')
+                    buffer = b''
+        
+        except ConnectionError as e:
+            self.LOGGER.warning(f'Connection lost!  {e!s}')
+        
+        finally:
+            if writer is self._writer:
+                self._writer = None
+            
+            writer.close()
+    
+    def process_message(self, line: bytes):
+        """Handles a single line received from the socket."""
+        event = self._session.receive(line)
+        
+        if isinstance(event, Handshake):
+            self.handshake(event)
+        
+        elif event is not None:
+            self.LOGGER.debug('Received payload from connected client!')
+            self.onResponse.emit(event)
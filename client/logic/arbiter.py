@@ -23,16 +23,36 @@
 # Decision Descent.  If not,
 # see <https://www.gnu.org/licenses/>.
 import logging
+import os
 import typing
+from concurrent import futures
 
 from PyQt5 import QtCore
 
 from . import catchable, errors
-from .http import HTTP
-from .. import dataclasses as dataklasses, widgets as widgetz
+from .clock import Clock, MonotonicClock
+from .executor import ExecutionMode, IntentExecutor
+from .lifecycle import PollLifecycle, PollRecord
+from .outbound import Priority
+from .prefilter import FilterStats, PreFilter
+from .rng import RNG
+from .router import Middleware, Router
+from .schema import ListOf, MapOf, Schema
+from .standings import StandingsStream, merge_standings
+from .. import dataclasses as dataklasses
 
+# Subsystems that aren't needed until they're enabled, or first used, are
+# imported where they're created, so they don't slow down the bot's startup.
 if typing.TYPE_CHECKING:
     from widgets import ShovelBot
+    from .aio import AsyncHTTP
+    from .catalog import Catalog
+    from .http import HTTP
+    from .policies import ConclusionPolicy
+    from .profiler import Profiler
+    from .shards import ShardPool
+    from .watchdog import Stall, Watchdog
+    from .. import widgets as widgetz
 
 __all__ = ['Arbiter']
 
@@ -42,14 +62,39 @@ class Arbiter(QtCore.QObject):
     LOGGER = logging.getLogger("extensions.DescentIsaac.arbiter")
     
     pollCreated = QtCore.pyqtSignal(object)
+    profilerToggled = QtCore.pyqtSignal(bool)
     
-    def __init__(self, client, parent: QtCore.QObject = None):
+    # Transports and threaded intents may emit off the Qt thread, so they're
+    # relayed through these, which queue onto it.
+    _response = QtCore.pyqtSignal(object)
+    _connection = QtCore.pyqtSignal()
+    _catalogUpdated = QtCore.pyqtSignal()
+    
+    def __init__(self, client, clock: Clock = None, parent: QtCore.QObject = None):
         # Super call
         super(Arbiter, self).__init__(parent=parent)
         
         # Private attributes
-        self._http: HTTP = HTTP(parent=self)
+        self._clock: Clock = clock if clock is not None else MonotonicClock(parent=self)
+        self._http: typing.Optional[typing.Union['HTTP', 'AsyncHTTP']] = None  # Created when it's started
         self._client: 'ShovelBot' = client
+        self._prefilter: PreFilter = PreFilter()
+        self._lifecycle: PollLifecycle = PollLifecycle(parent=self)
+        self._executor: IntentExecutor = IntentExecutor(parent=self)
+        self._rng: RNG = RNG()
+        self._profiler: typing.Optional['Profiler'] = None  # Created when it's first started
+        self._watchdog: typing.Optional['Watchdog'] = None  # Created when it's first enabled
+        self._shards: typing.Optional['ShardPool'] = None  # Created when it's first enabled
+        self._standings: StandingsStream = StandingsStream(
+            self._clock, self._lifecycle.get_live, self.send_standings, enabled=self.is_hud_enabled
+        )
+        self._catalog: typing.Optional['Catalog'] = None  # Opened when it's first used
+        
+        self._merging: bool = False
+        self._remerge: typing.Optional[typing.Dict[int, typing.Tuple[typing.Dict[str, int], int]]] = None
+        
+        self._vote_rate: float = 0.0  # Potential votes per second, as of the last window
+        self._window: typing.Tuple[float, int] = (self._clock.now(), 0)  # When the window started, and its votes
         
         self._layout = None
         self._level_master = None
@@ -57,38 +102,85 @@ class Arbiter(QtCore.QObject):
         self._babies = []
         self._players = []
         self._tear_effects = []
-        self._polls: typing.List[widgetz.Poll] = []
         
-        # Intent map
-        self._intents = {}
+        # Intent router
+        self._router: Router = Router()
+        self._schemas: typing.Dict[str, Schema] = {}
         
         # Internal calls
-        self.add_intent('polls.create', self.polls_create)
-        self.add_intent('polls.multi.create', self.polls_multi_create)
-        self.add_intent('polls.delete', self.polls_delete)
+        choices = Schema(varargs=str, extra=ListOf(str))
+        
+        self.add_intent('polls.create', self.polls_create, schema=choices)
+        self.add_intent('polls.multi.create', self.polls_multi_create, schema=choices)
+        self.add_intent('polls.delete', self.polls_delete, schema=Schema(str))
+        self.add_intent('polls.generate', self.polls_generate, schema=Schema(str, int, bool, required=1))
+        self.add_intent('rng.seed', self.rng_seed, schema=Schema((int, str)))
+        self.add_intent('rng.pool.update', self.rng_pool_update, schema=Schema(str, MapOf(float)))
+        self.add_intent('rng.items.remove', self.rng_items_remove, schema=Schema(varargs=str))
+        self.add_intent('rng.items.sample', self.rng_items_sample, schema=Schema(str, int))
+        self.add_intent('batch', self.batch, schema=Schema(varargs=dict, kwargs={'atomic': bool}))
+        self.add_intent('catalog.update', self.catalog_update, mode=ExecutionMode.THREAD, schema=Schema(varargs=list))
+        self.add_intent('debug.profile.start', self.debug_profile_start, schema=Schema())
+        self.add_intent('debug.profile.stop', self.debug_profile_stop, schema=Schema())
+        self.add_intent('debug.stalls', self.debug_stalls, schema=Schema())
+        
+        self._lifecycle.onLiveChanged.connect(self.rebuild_prefilter)
+        self._lifecycle.onLiveChanged.connect(self._standings.mark)
+        self._lifecycle.onLiveChanged.connect(self.sync_shards)
+        self._response.connect(self.process_message)
+        self._connection.connect(self.process_new_connection)
+        self._catalogUpdated.connect(self.fill_pools)
+        self._executor.onReply.connect(self.process_reply)
     
-    def add_intent(self, path: str, func: typing.Callable):
+    def add_intent(self, path: str, func: typing.Callable, middleware: typing.Iterable[Middleware] = (),
+                   mode: ExecutionMode = ExecutionMode.INLINE, schema: Schema = None):
         """Registers an intent.
         
         :param path: A dot separated series of segments used to identify this
                      intent.  For example, the path for creating polls is
-                     "polls.create".
+                     "polls.create".  Segments may be "*" to match any single
+                     segment, and the last segment may be "**" to match any
+                     number of segments.
         :param func: The callable that should be called when the intent is
                      invoked.  Any arguments the callable takes will be given
-                     to the callable as passed from the mod."""
+                     to the callable as passed from the mod.
+        :param middleware: Middleware that only applies to this intent.
+        :param mode: Where the intent's callable should run.  Callables that
+                     run off the Qt thread mustn't touch widgets, and their
+                     replies are still sent in the order their messages were
+                     received.
+        :param schema: The arguments the intent accepts.  Messages that don't
+                       match it are rejected as they're decoded, before they
+                       reach the callable.
+        
+        * Middleware always runs on the Qt thread, and is given a future for
+        intents that run off of it.
+        * Callables run in a process aren't wrapped in `catchable.signal`,
+        since the wrapper can't be pickled.  For the same reason, they can't
+        be bound methods."""
         path = path.lower()
         
+        if mode is ExecutionMode.PROCESS:
+            handler = self._executor.wrap(func, mode)
+        
+        else:
+            handler = self._executor.wrap(catchable.signal(func), mode)
+        
         try:
-            if path in self._intents:
-                raise errors.IntentExistsError
-            
-            self._intents[path] = catchable.signal(func)
+            self._router.add(path, handler, middleware)
         
         except errors.IntentExistsError:
             self.LOGGER.warning(f'Intent "{path}" was already registered!')
-            self.LOGGER.warning(f'Remapping {path} from {self._intents[path]!s} to {func!s}')
+            self.LOGGER.warning(f'Remapping {path} to {func!s}')
             
-            self._intents[path] = catchable.signal(func)
+            self._router.remove(path)
+            self._router.add(path, handler, middleware)
+        
+        if schema is not None:
+            self._schemas[path] = schema
+        
+        else:
+            self._schemas.pop(path, None)
     
     def remove_intent(self, path: str):
         """Unregisters an intent.
@@ -96,12 +188,13 @@ class Arbiter(QtCore.QObject):
         :param path: A dot separated series of segments used to identify this
                      intent.  For example, the path for creating polls is
                      "polls.create"."""
-        path = path.lower()
+        self._schemas.pop(path.lower(), None)
         
-        if path not in self._intents:
-            return self.LOGGER.warning(f"Intent \"{path}\" was't registered!")
+        try:
+            self._router.remove(path)
         
-        del self._intents[path]
+        except errors.IntentNotFoundError:
+            self.LOGGER.warning(f"Intent \"{path}\" was't registered!")
     
     def get_intent(self, path: str) -> typing.Callable:
         """Gets a registered intent.
@@ -109,19 +202,90 @@ class Arbiter(QtCore.QObject):
         :param path: A dot separated series of segments used to identify this
                      intent.  For example, the path for creating polls is
                      "polls.create"."""
-        try:
-            return self._intents[path]
+        return self._router.resolve(path)
+    
+    def add_middleware(self, middleware: Middleware):
+        """Adds middleware to the chain every intent runs through.
+        
+        :param middleware: A callable taking the intent's path, the next
+                           callable in the chain, and the intent's
+                           arguments.  It's responsible for calling the next
+                           callable and returning its result."""
+        self._router.use(middleware)
+    
+    # Transport methods
+    def start_transport(self):
+        """Starts listening for the mod, with the transport and port picked in
+        the settings."""
+        settings = self._client.settings['extensions']['descentisaac']['http']
+        
+        if settings['transport'].value == 'asyncio':
+            from .aio import AsyncHTTP
+            
+            if not isinstance(self._http, AsyncHTTP):
+                self.set_transport(AsyncHTTP())
+        
+        else:
+            from .http import HTTP
+            
+            if not isinstance(self._http, HTTP):
+                self.set_transport(HTTP(parent=self))
+        
+        self._http.connect(settings['port'].value)
+    
+    def stop_transport(self):
+        """Stops listening for the mod."""
+        if self._http is not None:
+            self._http.disconnect()
+    
+    def set_transport(self, transport: typing.Union['HTTP', 'AsyncHTTP']):
+        """Replaces the transport the mod is reached through.
+        
+        * The old transport is stopped, and messages still queued on it are
+        dropped."""
+        if self._http is not None:
+            self._http.disconnect()
+        
+        if isinstance(self._http, QtCore.QObject):
+            self._http.deleteLater()
         
-        except KeyError as e:
-            raise errors.IntentNotFoundError from e
+        transport.schemas.update(self._schemas)
+        transport.onResponse.connect(self._response.emit)
+        transport.onConnectionReceived.connect(self._connection.emit)
+        
+        self._http = transport
+        self._schemas = transport.schemas
+    
+    def send_message(self, message: dataklasses.Message, priority: Priority, **kwargs):
+        """Queues a message for the mod.
+        
+        * Messages sent before the transport is started are dropped, since
+        the mod can't have connected yet.
+        
+        :param kwargs: Passed along to the transport's `send_message`."""
+        if self._http is None:
+            return self.LOGGER.debug(f'Dropped a message sent before the transport was started: {message!s}')
+        
+        self._http.send_message(message, priority, **kwargs)
+    
+    def shutdown(self):
+        """Stops the pools running intents off the Qt thread, the vote
+        shards, and the event loop watchdog."""
+        self._executor.shutdown()
+        
+        if self._shards is not None:
+            self._shards.stop()
+        
+        if self._watchdog is not None:
+            self._watchdog.stop()
     
     # Intents
     def polls_create(self, callback: str, *choices: str, **aliases: typing.Dict[str, typing.List[str]]):
         """Requests the arbiter to create a new poll.
         
         :param callback: The intent to invoke when the poll conclude."""
-        p = self.create_poll(callback, *choices, **aliases)
-        p.start(self._client.settings['extensions']['descentisaac']['polls']['duration'].value)
+        p = self.add_poll(callback, *choices, **aliases)
+        self._lifecycle.start(p, self._client.settings['extensions']['descentisaac']['polls']['duration'].value)
         
         self.pollCreated.emit(p)
     
@@ -129,32 +293,171 @@ class Arbiter(QtCore.QObject):
         """Requests the arbiter to create a new multi poll.
         
         :param callback: The intent to invoke when the poll concludes."""
-        p = self.create_multi_poll(callback, *choices, **aliases)
-        p.start(self._client.settings['extensions']['descentisaac']['polls']['duration'].value)
+        p = self.add_multi_poll(callback, *choices, **aliases)
+        self._lifecycle.start(p, self._client.settings['extensions']['descentisaac']['polls']['duration'].value)
         
         self.pollCreated.emit(p)
     
-    def polls_delete(self, target: str):
-        if target == '*':
-            self.LOGGER.warning('Received a request to delete all polls!')
+    def polls_generate(self, callback: str, pool: str, amount: int = None, multi: bool = False):
+        """Requests the arbiter to create a new poll from choices drawn from
+        one of its pools.
+        
+        :param callback: The intent to invoke when the poll concludes.
+        :param pool: The name of the pool to draw the poll's choices from.
+        :param amount: The number of choices to draw.  Defaults to the
+                       maximum number of choices in the settings.
+        :param multi: Whether or not the poll should be a multi poll."""
+        if amount is None:
+            amount = self._client.settings['extensions']['descentisaac']['polls']['choices']['maximum'].value
+        
+        choices = self._rng.sample(pool, amount)
+        
+        if len(choices) <= 1:
+            return self.LOGGER.warning(f'Could not draw enough choices from pool "{pool}" for a poll!')
+        
+        if multi:
+            self.polls_multi_create(callback, *choices)
+        
+        else:
+            self.polls_create(callback, *choices)
+    
+    def rng_seed(self, _: str, seed: typing.Union[int, str]):
+        """Requests the arbiter to reseed its pools for a new run.
+        
+        * If the mod hasn't sent any pools, the default pools are filled from
+        the item catalog.
+        
+        :param seed: The run's seed.  It's ignored if a seed was set in the
+                     settings."""
+        override = self._client.settings['extensions']['descentisaac']['rng']['seed'].value
+        self._rng.reseed(override if override else seed)
+        
+        if not self._rng.get_pools():
+            self.fill_pools()
+    
+    def rng_pool_update(self, _: str, name: str, weights: typing.Dict[str, float]):
+        """Requests the arbiter to create or replace one of its pools.
+        
+        :param name: The name of the pool.
+        :param weights: The keys in the pool, and their relative weights."""
+        self._rng.set_pool(name, weights)
+    
+    def rng_items_remove(self, _: str, *items: str):
+        """Requests the arbiter to remove items from all of its pools.
+        
+        * This should be invoked whenever the mod removes an item from its
+        own item pools."""
+        for item in items:
+            self._rng.remove(str(item))
+    
+    def rng_items_sample(self, _: str, pool: str, amount: int) -> typing.List[str]:
+        """Requests the arbiter to draw distinct items from a pool."""
+        return self._rng.sample(pool, amount)
+    
+    def catalog_update(self, _: str, *entries: typing.List[typing.Any]) -> int:
+        """Requests the arbiter to replace its item catalog.
+        
+        * This runs on a worker thread; the catalog is only locked while its
+        file is swapped.
+        
+        :param entries: The catalog's entries, each being a list of the
+                        entry's kind, id, name, and optionally its aliases."""
+        from .catalog import CatalogEntry
+        
+        count = self.get_catalog().update(
+            CatalogEntry(str(e[0]), str(e[1]), str(e[2]), tuple(e[3]) if len(e) > 3 else ()) for e in entries
+        )
+        
+        self.LOGGER.info(f'Rebuilt the item catalog with {count} entries')
+        self._catalogUpdated.emit()
+        
+        return count
+    
+    def debug_profile_start(self, _: str):
+        """Requests the arbiter to start profiling the client."""
+        self.set_profiling(True)
+    
+    def debug_profile_stop(self, _: str) -> typing.Optional[futures.Future]:
+        """Requests the arbiter to stop profiling the client.
+        
+        * The profiler's stopped here, but its profile is written on a worker
+        thread.  The reply is sent once the profile's been written.
+        
+        :returns: A future for the path the profile was written to."""
+        return self.set_profiling(False)
+    
+    def debug_stalls(self, _: str) -> typing.List[typing.List[typing.Any]]:
+        """Requests the arbiter's worst event loop stalls.
+        
+        :returns: The latency in milliseconds, and the handler blamed, for
+                  each stall, worst first."""
+        return [[round(s.latency * 1000), s.handler] for s in self.get_stalls()]
+    
+    def batch(self, _: str, *payloads: dict, atomic: bool = False) -> typing.List[typing.Any]:
+        """Executes several messages from the mod in a single pass.
+        
+        Replies requested by the individual messages are ignored; the batch's
+        reply contains every message's result, in order, with None standing in
+        for messages that failed.
+        
+        :param payloads: The raw messages to execute.
+        :param atomic: Whether the batch should be rejected entirely if any
+                       message is malformed or targets an unknown intent.
+                       Execution also stops at the first failing message,
+                       but messages that already ran aren't undone."""
+        messages: typing.List[typing.Optional[dataklasses.Message]] = []
+        
+        for payload in payloads:
+            try:
+                m = dataklasses.Message.from_json(payload, self._schemas)
+                self._router.resolve(m.intent)
             
-            for poll in self._polls.copy():
-                poll.delete()
+            except (errors.MalformedMessageError, errors.IntentNotFoundError) as e:
+                if atomic:
+                    raise errors.DescentError(f'Atomic batch rejected!  Malformed message: {payload!r}') from e
+                
+                self.LOGGER.warning(f'Skipping malformed batch message: {payload!r}')
+                m = None
             
-            self._polls.clear()
-            return
+            messages.append(m)
+        
+        self.LOGGER.info(f'Executing a batch of {len(messages)} messages...')
+        results = []
+        
+        for m in messages:
+            if m is None:
+                results.append(None)
+                continue
+            
+            try:
+                results.append(m(self._router))
+            
+            except errors.DescentError as e:
+                if atomic:
+                    raise errors.DescentError(f'Atomic batch stopped at "{m.intent}"!') from e
+                
+                results.append(None)
+        
+        return self._executor.gather(results)
+    
+    def polls_delete(self, _: str, target: str):
+        """Requests the arbiter to delete a poll.
+        
+        :param target: A choice within the poll to delete, or "*" to delete
+                       every poll."""
+        if target == '*':
+            self.LOGGER.warning('Received a request to delete all polls!')
+            return self._lifecycle.clear()
         
         self.LOGGER.warning(f'Attempting to locate first active poll with identifier "{target}"....')
+        poll = self.get_poll(target)
         
-        for poll in self._polls.copy():
-            if poll.is_choice(target):
-                poll.stop()
-                del self._polls[self._polls.index(poll)]
-                break
+        if poll is not None:
+            self._lifecycle.discard(poll)
     
     # Poll methods
     @catchable.signal
-    def add_poll(self, callback: str, *choices: str, **aliases: typing.Dict[str, typing.List[str]]) -> widgetz.Poll:
+    def add_poll(self, callback: str, *choices: str, **aliases: typing.Dict[str, typing.List[str]]) -> 'widgetz.Poll':
         """Registers a poll with the arbiter.
         
         :param callback: The intent to invoke when the poll conclude."""
@@ -173,18 +476,35 @@ class Arbiter(QtCore.QObject):
         for c, a in aliases.items():
             self.LOGGER.info(f'    • {c} → {", ".join(a)}')
         
-        p = widgetz.Poll(parent=self)
+        from .. import widgets as widgetz
+        
+        p = widgetz.Poll(callback, clock=self._clock)
+        settings = self._client.settings['extensions']['descentisaac']['polls']
+        p.set_framerate(settings['framerate'].value, settings['budget'].value / 1000)
+        p.set_electorate(settings['conclusion']['electorate'].value)
+        p.set_policies(*self.get_conclusion_policies())
         
         for c in choices:
-            p.add_choice(c, *aliases.get(c, []))
+            entry = None if c in aliases else self.get_catalog().resolve(c)
+            
+            # Choices the mod didn't send aliases for are looked up in the
+            # catalog, which has its aliases normalized in advance.
+            if entry is not None:
+                p.add_choice(c, entry.name, *entry.get_aliases())
+            
+            else:
+                p.add_choice(c, *aliases.get(c, [c]))
         
-        self._polls.append(p)
         p.onConclude.connect(self.process_poll)
+        p.onChoicesChanged.connect(self.rebuild_prefilter)
+        p.onChoicesChanged.connect(self.sync_shards)
+        p.onActiveChanged.connect(self.process_active_changed)
+        self._lifecycle.register(p)
         
         return p
     
     def add_multi_poll(self, callback: str, *choices: str,
-                       **aliases: typing.Dict[str, typing.List[str]]) -> widgetz.Poll:
+                       **aliases: typing.Dict[str, typing.List[str]]) -> 'widgetz.Poll':
         """Registers a multi poll with the arbiter.
         
         :param callback: The intent to invoke when the poll conclude."""
@@ -193,45 +513,322 @@ class Arbiter(QtCore.QObject):
         
         return p
     
-    def remove_poll(self, poll: widgetz.Poll):
-        """Unregisters a poll from the arbiter."""
-        del self._polls[self._polls.index(poll)]
+    def remove_poll(self, poll: 'widgetz.Poll'):
+        """Unregisters a poll from the arbiter, releasing its resources."""
+        self._lifecycle.discard(poll)
     
-    def get_poll(self, target: str) -> widgetz.Poll:
+    def get_poll(self, target: str) -> 'widgetz.Poll':
         """Gets a poll from the arbiter's poll registry."""
-        for p in self._polls.copy():
+        for p in self._lifecycle.get_live():
             if p.is_choice(target):
                 return p
     
-    def get_polls(self) -> typing.List[widgetz.Poll]:
+    def get_polls(self) -> typing.List['widgetz.Poll']:
         """Gets a copy of the arbiter's poll registry."""
-        return self._polls.copy()
+        return self._lifecycle.get_live()
+    
+    def get_poll_history(self) -> typing.List[PollRecord]:
+        """Gets the results of the most recently archived polls."""
+        return self._lifecycle.get_history()
+    
+    def get_poll_counts(self) -> typing.Tuple[int, int]:
+        """Gets the number of live polls, and the number of polls archived
+        this session."""
+        return self._lifecycle.live_count(), self._lifecycle.archived_count()
+    
+    def get_conclusion_policies(self) -> typing.List['ConclusionPolicy']:
+        """Builds the policies new polls may conclude early with, from the
+        extension's settings."""
+        from .policies import Lead, Quorum, Supermajority
+        
+        settings = self._client.settings['extensions']['descentisaac']['polls']['conclusion']
+        policies = []
+        
+        if settings['lead'].value:
+            policies.append(Lead())
+        
+        if settings['supermajority'].value > 0:
+            policies.append(Supermajority(settings['supermajority'].value / 100, settings['minimum'].value))
+        
+        if settings['quorum'].value > 0:
+            policies.append(Quorum(settings['quorum'].value))
+        
+        return policies
+    
+    def get_clock(self) -> Clock:
+        """Gets the clock polls are timed against."""
+        return self._clock
+    
+    # Catalog methods
+    def get_catalog(self) -> 'Catalog':
+        """Returns the arbiter's item catalog, opening it on first use."""
+        if self._catalog is None:
+            from .catalog import Catalog
+            
+            self._catalog = Catalog(os.path.join(os.path.dirname(__file__), os.pardir, 'resources', 'catalog.dat'))
+            self._catalog.open()
+        
+        return self._catalog
+    
+    # RNG methods
+    def fill_pools(self):
+        """Fills the default "collectibles" pool from the item catalog.
+        
+        * The game doesn't expose the contents of its item pools, so every
+        collectible in the catalog is given the same weight.  The mod may
+        replace the pool, or add others, with "rng.pool.update"."""
+        weights = {e.id: 1.0 for e in self.get_catalog().get_entries() if e.kind == 'collectible'}
+        
+        if not weights:
+            return self.LOGGER.warning('The item catalog has no collectibles to fill the RNG\'s pools with!')
+        
+        self._rng.set_pool('collectibles', weights)
+        self.LOGGER.info(f'Filled the "collectibles" pool with {len(weights)} items')
+    
+    # Profiler methods
+    def set_profiling(self, value: bool) -> typing.Optional[futures.Future]:
+        """Starts or stops the profiler.
+        
+        * cProfile can only be stopped on the thread it's profiling, so only
+        writing the profile is done off of the Qt thread.
+        
+        :returns: A future for the path the profile was written to, if the
+                  profiler was stopped."""
+        if value == self.is_profiling():
+            return None
+        
+        future = None
+        
+        if self._profiler is None:
+            from .profiler import Profiler
+            
+            self._profiler = Profiler()
+            self.add_middleware(self._profiler.middleware)
+        
+        if value:
+            self._profiler.directory = self._client.settings['extensions']['descentisaac']['debug']['profiles'].value
+            self._profiler.start()
+        
+        else:
+            future = self._executor.wrap(self._profiler.write, ExecutionMode.THREAD)(self._profiler.stop())
+        
+        self.profilerToggled.emit(value)
+        return future
+    
+    def is_profiling(self) -> bool:
+        """Whether or not the profiler is currently running."""
+        return self._profiler is not None and self._profiler.is_running()
+    
+    # Watchdog methods
+    def start_watchdog(self):
+        """Starts the event loop watchdog, if it's enabled in the settings."""
+        threshold = self._client.settings['extensions']['descentisaac']['debug']['watchdog'].value
+        
+        if threshold <= 0:
+            return self._watchdog.stop() if self._watchdog is not None else None
+        
+        if self._watchdog is None:
+            from .watchdog import Watchdog
+            
+            self._watchdog = Watchdog(parent=self)
+        
+        self._watchdog.threshold = threshold / 1000
+        self._watchdog.start()
+    
+    def get_stalls(self) -> typing.List['Stall']:
+        """Returns the worst event loop stalls noticed, worst first."""
+        return self._watchdog.get_stalls() if self._watchdog is not None else []
+    
+    # Shard methods
+    def start_shards(self):
+        """Starts tallying votes in worker processes, if it's enabled in the
+        settings.
+        
+        * Shards only know the votes they were sent, so this does nothing
+        while polls are live."""
+        shards = self._client.settings['extensions']['descentisaac']['polls']['shards'].value
+        
+        if self._lifecycle.live_count():
+            return self.LOGGER.warning('Vote shards cannot be started while polls are live!')
+        
+        if shards <= 0:
+            return self._shards.stop() if self._shards is not None else None
+        
+        if self._shards is None:
+            from .shards import ShardPool
+            
+            self._shards = ShardPool(self._clock, received=self.collect_votes)
+        
+        self._shards.start(shards)
+    
+    def is_sharded(self) -> bool:
+        """Whether or not votes are being tallied by the vote shards."""
+        return self._shards is not None and self._shards.is_running()
+    
+    def sync_shards(self):
+        """Sends the vote shards the choices and state of every live poll."""
+        if self.is_sharded():
+            self._shards.sync([(p.uid, p.get_lookup(), p.is_active()) for p in self._lifecycle.get_live()])
+    
+    def collect_votes(self):
+        """Merges the latest tallies the vote shards pushed into the live
+        polls.
+        
+        * This doesn't wait on the shards; it's invoked whenever they push."""
+        self.merge_votes(self._shards.get_partials())
+    
+    def merge_votes(self, partials: typing.Dict[int, typing.Tuple[typing.Dict[str, int], int]]):
+        """Merges the vote shards' partial tallies into the live polls.
+        
+        * The HUD's standings are only updated while the HUD is enabled.
+        * Merging may conclude polls.  Tallies merged while a merge is
+        already running are merged once it's finished, rather than in the
+        middle of it."""
+        if self._merging:
+            self._remerge = partials
+            return
+        
+        hud = self.is_hud_enabled()
+        self._merging = True
+        
+        try:
+            while partials is not None:
+                for p in self._lifecycle.get_live():
+                    if p.uid in partials and p.merge_tally(*partials[p.uid]) and hud:
+                        self._standings.mark(p.uid)
+                
+                partials, self._remerge = self._remerge, None
+        
+        finally:
+            self._merging = False
+            self._remerge = None
+    
+    def release_poll(self, uid: int, partials: typing.Dict[int, typing.Tuple[typing.Dict[str, int], int]]):
+        """Merges the vote shards' exact tallies, then lets a held poll
+        conclude.
+        
+        * Polls that were deleted while they were held are left alone."""
+        self.merge_votes(partials)
+        
+        for p in self._lifecycle.get_live():
+            if p.uid == uid:
+                return p.release()
+    
+    # Overload methods
+    def get_vote_rate(self) -> float:
+        """Gets the number of potential votes received per second, as of the
+        last measurement."""
+        return self._vote_rate
+    
+    def measure_vote(self):
+        """Counts a potential vote towards the current vote rate, and switches
+        polls to approximate tallying once it gets too high."""
+        start, votes = self._window
+        now = self._clock.now()
+        
+        if now - start < 0.5:
+            self._window = (start, votes + 1)
+            return
+        
+        self._vote_rate = (votes + 1) / (now - start)
+        self._window = (now, 0)
+        
+        settings = self._client.settings['extensions']['descentisaac']['polls']['overload']
+        threshold = settings['rate'].value
+        
+        if threshold <= 0 or self._vote_rate <= threshold:
+            return
+        
+        for p in self._lifecycle.get_live():
+            if p.is_active() and not p.is_approximate():
+                # Only as many participants are sampled as the client can
+                # keep up with.
+                p.set_approximate(threshold / self._vote_rate, settings['capacity'].value)
+    
+    # Pre-filter methods
+    def rebuild_prefilter(self):
+        """Rebuilds the chat pre-filter from the tokens of every registered
+        poll."""
+        self._prefilter.rebuild(t for p in self._lifecycle.get_live() for t in p.get_tokens())
+    
+    def get_prefilter_stats(self) -> FilterStats:
+        """Returns the counters of the chat pre-filter."""
+        return self._prefilter.stats
+    
+    # HUD methods
+    def is_hud_enabled(self) -> bool:
+        """Whether or not the mod's HUD is enabled in the settings."""
+        return self._client.settings['extensions']['descentisaac']['hud']['enabled'].value
+    
+    def send_standings(self, entries: typing.List[typing.List[typing.Union[int, str]]]):
+        """Sends the mod's HUD the latest changes to the live polls' standings.
+        
+        * Standings the mod hasn't received yet are merged into newer ones,
+        rather than queued behind them.
+        * The standings stream doesn't send anything while the HUD is
+        disabled."""
+        self.send_message(dataklasses.Message('hud.standings', tuple(entries), {}, None),
+                          Priority.HUD, key='hud.standings', merge=merge_standings)
     
     # Slots
+    @catchable.signal
+    def process_chat(self, user: str, content: str):
+        """Processes a chat message from a platform, registering it as a vote
+        if it matches a choice in an active poll."""
+        token = self._prefilter.check(content)
+        
+        if token is None:
+            return
+        
+        # Sharded votes are merged into the polls once their shards push
+        # them.
+        if self.is_sharded():
+            return self._shards.submit(user.lower(), token)
+        
+        self.measure_vote()
+        
+        for p in self._lifecycle.get_live():
+            if p.is_active() and p.is_choice(token):
+                p.add_participant(user, token)
+                return self._standings.mark(p.uid)
+    
     @catchable.signal
     def process_message(self, message: dataklasses.Message):
         """Processes a message from the mod."""
         self.LOGGER.info(f'Received a message from the mod: {message!s}')
         
         try:
-            r = message(self._intents)
+            r = message(self._router)
         
         except errors.DescentError as e:
             self.LOGGER.warning(f'Message could not be executed!  ({e.__class__.__name__}({e!s}))')
         
         else:
-            if message.reply:
-                self.LOGGER.info('Mod requested a reply post-execution!')
-                
-                if isinstance(r, typing.Iterable):
-                    self._http.send_message(dataklasses.Message(message.reply, [i for i in r], {}))
-                
-                elif r is not None:
-                    self._http.send_message(dataklasses.Message(message.reply, [r], {}))
+            # Results are routed through the executor, even for inline
+            # intents, so replies can't overtake an earlier message's reply.
+            self._executor.track(message, r)
+    
+    @catchable.signal
+    def process_reply(self, message: dataklasses.Message, r: typing.Any):
+        """Sends the result of a message back to the mod, if it asked for one.
+        
+        * Only lists and tuples are sent as multiple arguments; every other
+        result, including strings and dicts, is sent as a single argument."""
+        if message.reply:
+            self.LOGGER.info('Mod requested a reply post-execution!')
+            
+            if isinstance(r, (list, tuple)):
+                self.send_message(dataklasses.Message(message.reply, list(r), {}, None), Priority.REPLY)
+            
+            elif r is not None:
+                self.send_message(dataklasses.Message(message.reply, [r], {}, None), Priority.REPLY)
     
     @catchable.signal
     def process_new_connection(self):
-        """Invoked when the HTTP listener receives a new connection."""
+        """Invoked when the HTTP listener starts a new session with the mod.
+        
+        * Clients that resume an existing session aren't sent the config
+        again; they're only sent the messages they missed."""
         self.LOGGER.info('Received a new client!')
         c = {}
         
@@ -240,18 +837,38 @@ class Arbiter(QtCore.QObject):
         
         c['http'] = {'host': '127.0.0.1', 'port': alias['http']['port'].value}
         c['hud'] = {'enabled': alias['hud']['enabled'].value}
+        
+        # The mod forgot every poll it was shown along with its session.
+        self._standings.rate = alias['hud']['rate'].value
+        self._standings.reset()
         c['polls'] = {
             'choices': {
-                'maximum': alias['polls']['choices']['maximum']
+                'maximum': alias['polls']['choices']['maximum'].value
             },
             
-            'duration': alias['polls']['duration']
+            'duration': alias['polls']['duration'].value
         }
         
-        self._http.send_message(dataklasses.Message.from_json({
+        self.send_message(dataklasses.Message.from_json({
             'intent': 'state.config.update',
             'args': [c]
-        }))
+        }), Priority.CONFIG, key='state.config.update')
+    
+    @catchable.signal
+    def process_active_changed(self, poll: 'widgetz.Poll'):
+        """Tells the vote shards a poll started or stopped accepting votes.
+        
+        * Concluding polls are held until the shards answer with their exact
+        tallies, rather than waiting on the shards."""
+        if not self.is_sharded():
+            return
+        
+        self._shards.activate(poll.uid, poll.is_active())
+        
+        if not poll.is_active() and poll.hold():
+            uid = poll.uid
+            self._shards.request(lambda partials: self.release_poll(uid, partials))
+    
     
     @catchable.signal
     def process_poll(self, id_: str):
@@ -264,8 +881,11 @@ class Arbiter(QtCore.QObject):
         try:
             i = self.get_intent(p.intent)
         
-        except errors.DescentError as e:
-            self.LOGGER.warning(f"Arbiter couldn't process poll {id_}.  {e.__class__.__name__}({e!s})")
+        except errors.IntentNotFoundError:
+            # Poll callbacks are usually intents on the mod's half.
+            self.LOGGER.info(f'Passing poll results to the mod\'s {p.intent}...')
+            
+            self.send_message(dataklasses.Message(p.intent, [id_], {}, None), Priority.CRITICAL)
         
         else:
             self.LOGGER.info(f'Passing poll results to {p.intent}...')
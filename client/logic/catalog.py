@@ -0,0 +1,304 @@
+# This file is part of Decision Descent.
+#
+# Decision Descent is free software:
+# you can redistribute it
+# and/or modify it under the
+# terms of the GNU General
+# Public License as published by
+# the Free Software Foundation,
+# either version 3 of the License,
+# or (at your option) any later
+# version.
+#
+# Decision Descent is distributed in
+# the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without
+# even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A
+# PARTICULAR PURPOSE.  See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the
+# GNU General Public License along with
+# Decision Descent.  If not,
+# see <https://www.gnu.org/licenses/>.
+import dataclasses
+import json
+import logging
+import mmap
+import os
+import re
+import struct
+import threading
+import typing
+
+__all__ = ['Catalog', 'CatalogEntry', 'normalize']
+
+_MAGIC = b'DDCATLG1'
+_HEADER = struct.Struct('<8sII')  # Magic, entry count, token count
+_ENTRY = struct.Struct('<II')  # Record offset, record length
+_TOKEN = struct.Struct('<III')  # Token offset, token length, entry index
+
+_WHITESPACE = re.compile(r'\s+')
+_PUNCTUATION = re.compile(r"[^\w\s]")
+
+
+def normalize(text: str) -> str:
+    """Normalizes a name or alias for lookups.
+    
+    * Text is case-folded, and runs of whitespace are collapsed."""
+    return _WHITESPACE.sub(' ', text.casefold()).strip()
+
+
+@dataclasses.dataclass(frozen=True)
+class CatalogEntry:
+    """A single collectible, trinket, or pickup in the catalog."""
+    kind: str  # "collectible", "trinket", or "pickup"
+    id: str
+    name: str
+    aliases: typing.Tuple[str, ...] = ()
+    
+    @property
+    def key(self) -> str:
+        """The entry's unique key, like "trinket:12"."""
+        return f'{self.kind}:{self.id}'
+    
+    def get_aliases(self) -> typing.List[str]:
+        """Returns the entry's name and aliases, normalized.
+        
+        * Every name and alias is also included with its punctuation removed,
+        so "mom's knife" and "moms knife" both match."""
+        aliases = []
+        
+        for text in (self.name,) + self.aliases:
+            text = normalize(text)
+            
+            for variant in (text, normalize(_PUNCTUATION.sub('', text))):
+                if variant and variant not in aliases:
+                    aliases.append(variant)
+        
+        return aliases
+    
+    def get_tokens(self) -> typing.Set[str]:
+        """Returns every normalized token that resolves to this entry."""
+        tokens = {self.key, *self.get_aliases()}
+        
+        # Bare ids are reserved for collectibles, since those are what polls
+        # are usually made of.
+        if self.kind == 'collectible':
+            tokens.add(self.id)
+        
+        return tokens
+
+
+class Catalog:
+    """A read-only index of the game's items.
+    
+    The catalog is stored as a single file holding a sorted token table and
+    the entries it points to.  The file is memory-mapped rather than read, and
+    lookups binary search the token table in place, so opening a catalog
+    doesn't parse anything up front.
+    
+    * Lookups and updates may happen on different threads; the file is only
+    locked while it's being swapped."""
+    LOGGER = logging.getLogger("extensions.DescentIsaac.catalog")
+    
+    def __init__(self, path: str):
+        # Private attributes
+        self._path: str = path
+        self._file: typing.Optional[typing.BinaryIO] = None
+        self._map: typing.Optional[mmap.mmap] = None
+        self._entries: int = 0
+        self._tokens: int = 0
+        self._cache: typing.Dict[int, CatalogEntry] = {}
+        self._lock: threading.RLock = threading.RLock()
+    
+    # Properties
+    @property
+    def path(self) -> str:
+        """The path of the catalog's file."""
+        return self._path
+    
+    def is_open(self) -> bool:
+        """Whether or not the catalog's file is currently mapped."""
+        return self._map is not None
+    
+    def __len__(self) -> int:
+        return self._entries
+    
+    # File methods
+    @classmethod
+    def build(cls, path: str, entries: typing.Iterable[CatalogEntry]) -> int:
+        """Writes a catalog file.
+        
+        * The file is written next to the destination, then moved over it, so
+        mapped catalogs never see a partially written file.
+        
+        :returns: The number of entries written."""
+        entries = list(entries)
+        records = [json.dumps([e.kind, e.id, e.name, list(e.aliases)]).encode() for e in entries]
+        tokens: typing.Dict[bytes, int] = {}
+        
+        for index, entry in enumerate(entries):
+            for token in entry.get_tokens():
+                # Earlier entries win when tokens collide.
+                tokens.setdefault(token.encode(), index)
+        
+        ordered = sorted(tokens.items())
+        heap = bytearray()
+        entry_table = bytearray()
+        token_table = bytearray()
+        base = _HEADER.size + _ENTRY.size * len(records) + _TOKEN.size * len(ordered)
+        
+        for record in records:
+            entry_table += _ENTRY.pack(base + len(heap), len(record))
+            heap += record
+        
+        for token, index in ordered:
+            token_table += _TOKEN.pack(base + len(heap), len(token), index)
+            heap += token
+        
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        
+        with open(path + '.tmp', 'wb') as f:
+            f.write(_HEADER.pack(_MAGIC, len(records), len(ordered)))
+            f.write(entry_table)
+            f.write(token_table)
+            f.write(heap)
+        
+        os.replace(path + '.tmp', path)
+        return len(records)
+    
+    def open(self) -> bool:
+        """Maps the catalog's file.
+        
+        :returns: Whether or not the file exists and is a valid catalog."""
+        with self._lock:
+            self.close()
+            
+            try:
+                self._file = open(self._path, 'rb')
+                self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+            
+            except (OSError, ValueError):
+                # Empty files can't be mapped.
+                self.close()
+                return False
+            
+            try:
+                magic, self._entries, self._tokens = _HEADER.unpack_from(self._map, 0)
+            
+            except struct.error:
+                # Files shorter than the header were truncated while they
+                # were being written.
+                magic = None
+            
+            if magic != _MAGIC or not self._is_complete():
+                self.LOGGER.warning(f'{self._path} is not a catalog file, or is truncated!')
+                self.close()
+                return False
+            
+            self.LOGGER.info(f'Mapped catalog with {self._entries} entries and {self._tokens} tokens')
+            return True
+    
+    def close(self):
+        """Unmaps the catalog's file."""
+        with self._lock:
+            if self._map is not None:
+                self._map.close()
+            
+            if self._file is not None:
+                self._file.close()
+            
+            self._map = self._file = None
+            self._entries = self._tokens = 0
+            self._cache.clear()
+    
+    def update(self, entries: typing.Iterable[CatalogEntry]) -> int:
+        """Rebuilds the catalog's file from a new set of entries, and maps it.
+        
+        * The new file is built next to the old one, so lookups only wait
+        while the files are swapped.
+        
+        :returns: The number of entries in the new catalog."""
+        count = self.build(self._path + '.new', entries)
+        
+        with self._lock:
+            # Mapped files can't be replaced on Windows.
+            self.close()
+            os.replace(self._path + '.new', self._path)
+            self.open()
+        
+        return count
+    
+    def _is_complete(self) -> bool:
+        """Whether or not the mapped file is as long as its tables say it
+        should be."""
+        tables = _HEADER.size + _ENTRY.size * self._entries + _TOKEN.size * self._tokens
+        
+        if len(self._map) < tables:
+            return False
+        
+        if not self._tokens:
+            return True
+        
+        # The last token is the last thing written to the file.
+        offset, length, _ = _TOKEN.unpack_from(self._map, tables - _TOKEN.size)
+        return len(self._map) >= offset + length
+    
+    # Lookup methods
+    def _entry(self, index: int) -> CatalogEntry:
+        entry = self._cache.get(index)
+        
+        if entry is None:
+            offset, length = _ENTRY.unpack_from(self._map, _HEADER.size + _ENTRY.size * index)
+            kind, id_, name, aliases = json.loads(self._map[offset:offset + length])
+            
+            entry = self._cache[index] = CatalogEntry(kind, id_, name, tuple(aliases))
+        
+        return entry
+    
+    def _token(self, index: int) -> typing.Tuple[bytes, int]:
+        offset, length, entry = _TOKEN.unpack_from(
+            self._map, _HEADER.size + _ENTRY.size * self._entries + _TOKEN.size * index
+        )
+        
+        return self._map[offset:offset + length], entry
+    
+    def resolve(self, text: str) -> typing.Optional[CatalogEntry]:
+        """Resolves a key, id, name, or alias to its entry.
+        
+        * Bare ids resolve to collectibles."""
+        target = normalize(text).encode()
+        
+        with self._lock:
+            low, high = 0, self._tokens
+            
+            while low < high:
+                middle = (low + high) // 2
+                token, entry = self._token(middle)
+                
+                if token < target:
+                    low = middle + 1
+                
+                elif token > target:
+                    high = middle
+                
+                else:
+                    return self._entry(entry)
+        
+        return None
+    
+    def get_entries(self) -> typing.Iterator[CatalogEntry]:
+        """Yields every entry in the catalog."""
+        index = 0
+        
+        while True:
+            with self._lock:
+                if index >= self._entries:
+                    return
+                
+                entry = self._entry(index)
+            
+            yield entry
+            index += 1
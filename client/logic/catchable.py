@@ -22,29 +22,92 @@
 # GNU General Public License along with
 # Decision Descent.  If not,
 # see <https://www.gnu.org/licenses/>.
-import inspect
+import functools
 import logging
+import time
 import typing
 
 from . import errors
 
-__all__ = ['signal']
+__all__ = ['add_hook', 'remove_hook', 'signal']
+
+_CO_VARARGS = 0x04
+
+# Hooks are told whenever a wrapped callable starts and finishes running.
+# They must implement `enter(name)` and `exit(name, elapsed)`, and may be
+# called from any thread running a wrapped callable.
+_hooks: typing.List[typing.Any] = []
+
+
+def add_hook(hook: typing.Any):
+    """Registers a hook to be told about every wrapped call."""
+    if hook not in _hooks:
+        _hooks.append(hook)
+
+
+def remove_hook(hook: typing.Any):
+    """Unregisters a hook."""
+    if hook in _hooks:
+        _hooks.remove(hook)
+
+
+def _positional_limit(func: typing.Callable) -> typing.Optional[int]:
+    """Returns the number of positional arguments a callable accepts, or None
+    if it accepts any number of them."""
+    code = getattr(getattr(func, '__func__', func), '__code__', None)
+    
+    if code is None:
+        import inspect
+        
+        parameters = inspect.signature(func).parameters.values()
+        
+        if any(p.kind is p.VAR_POSITIONAL for p in parameters):
+            return None
+        
+        return sum(1 for p in parameters if p.kind in (p.POSITIONAL_ONLY, p.POSITIONAL_OR_KEYWORD))
+    
+    if code.co_flags & _CO_VARARGS:
+        return None
+    
+    return code.co_argcount - (1 if hasattr(func, '__func__') else 0)
 
 
 def signal(func: typing.Callable) -> typing.Callable:
-    """A custom decorator to catch exception that may originate from Qt signals."""
+    """A custom decorator to catch exception that may originate from Qt signals.
+    
+    * The callable's signature is resolved on the first call, rather than on
+    every call.
+    * Calls are only timed while hooks are registered."""
+    limit = []
+    name = getattr(func, '__qualname__', None) or repr(func)
     
+    @functools.wraps(func)
     def decorator(*args, **kwargs) -> typing.Any:
         try:
-            sig = inspect.signature(func)
+            if not limit:
+                limit.append(_positional_limit(func))
             
-            if sig.parameters:
-                args = args[:len(sig.parameters)]
-                
+            if limit[0] is not None:
+                args = args[:limit[0]]
+            
+            if not _hooks:
                 return func(*args, **kwargs)
             
-            else:
-                return func()
+            hooks = _hooks.copy()
+            
+            for hook in hooks:
+                hook.enter(name)
+            
+            start = time.perf_counter()
+            
+            try:
+                return func(*args, **kwargs)
+            
+            finally:
+                elapsed = time.perf_counter() - start
+                
+                for hook in reversed(hooks):
+                    hook.exit(name, elapsed)
         
         except errors.DescentError as e:
             logging.getLogger("extensions.DescentIsaac.signal_catcher").exception(
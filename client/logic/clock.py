@@ -0,0 +1,237 @@
+# This file is part of Decision Descent.
+#
+# Decision Descent is free software:
+# you can redistribute it
+# and/or modify it under the
+# terms of the GNU General
+# Public License as published by
+# the Free Software Foundation,
+# either version 3 of the License,
+# or (at your option) any later
+# version.
+#
+# Decision Descent is distributed in
+# the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without
+# even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A
+# PARTICULAR PURPOSE.  See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the
+# GNU General Public License along with
+# Decision Descent.  If not,
+# see <https://www.gnu.org/licenses/>.
+import abc
+import heapq
+import itertools
+import logging
+import math
+import time
+import typing
+
+from PyQt5 import QtCore
+
+__all__ = ['Clock', 'MonotonicClock', 'VirtualClock']
+
+
+class Clock(abc.ABC):
+    """Schedules callbacks against a source of time.
+    
+    Callbacks are kept in a single queue ordered by their deadline, so any
+    number of polls can share a clock without each needing their own timer.
+    Subclasses decide what time it is, and how they're woken up when the
+    earliest deadline changes."""
+    LOGGER = logging.getLogger("extensions.DescentIsaac.clock")
+    
+    def __init__(self):
+        # Private attributes
+        self._queue: typing.List[typing.Tuple[float, int]] = []  # A min-heap of deadlines and handles
+        self._pending: typing.Dict[int, typing.Callable[[], typing.Any]] = {}
+        self._handles: typing.Iterator[int] = itertools.count(1)
+    
+    # Properties
+    @abc.abstractmethod
+    def now(self) -> float:
+        """The current time, in seconds.
+        
+        * Only differences between two readings are meaningful."""
+    
+    def next_deadline(self) -> typing.Optional[float]:
+        """The time the next pending callback is due, if any."""
+        self._prune()
+        
+        return self._queue[0][0] if self._queue else None
+    
+    def __len__(self) -> int:
+        return len(self._pending)
+    
+    # Scheduling methods
+    def call_at(self, deadline: float, callback: typing.Callable[[], typing.Any]) -> int:
+        """Schedules a callback for when the clock reaches a deadline.
+        
+        * Callbacks sharing a deadline are invoked in the order they were
+        scheduled.
+        
+        :returns: A handle that can be passed to `cancel`."""
+        handle = next(self._handles)
+        
+        self._pending[handle] = callback
+        heapq.heappush(self._queue, (deadline, handle))
+        
+        if self._queue[0][1] == handle:
+            self._wake()
+        
+        return handle
+    
+    def call_later(self, delay: float, callback: typing.Callable[[], typing.Any]) -> int:
+        """Schedules a callback for `delay` seconds from now.
+        
+        :returns: A handle that can be passed to `cancel`."""
+        return self.call_at(self.now() + delay, callback)
+    
+    def cancel(self, handle: int) -> bool:
+        """Cancels a pending callback.
+        
+        :returns: Whether or not the callback was still pending."""
+        if self._pending.pop(handle, None) is None:
+            return False
+        
+        # Cancelled entries are left in the queue until they surface, unless
+        # they start to outnumber the live ones.
+        if len(self._queue) > 2 * len(self._pending) + 64:
+            self._queue = [e for e in self._queue if e[1] in self._pending]
+            heapq.heapify(self._queue)
+        
+        return True
+    
+    # Internal methods
+    def _prune(self):
+        while self._queue and self._queue[0][1] not in self._pending:
+            heapq.heappop(self._queue)
+    
+    def _pop(self, now: float) -> typing.Optional[typing.Tuple[float, typing.Callable[[], typing.Any]]]:
+        """Removes the earliest callback due by `now`, if there is one.
+        
+        :returns: The callback's deadline, and the callback itself."""
+        self._prune()
+        
+        if not self._queue or self._queue[0][0] > now:
+            return None
+        
+        deadline, handle = heapq.heappop(self._queue)
+        return deadline, self._pending.pop(handle)
+    
+    def _invoke(self, callback: typing.Callable[[], typing.Any]):
+        try:
+            callback()
+        
+        except Exception as e:
+            self.LOGGER.warning(f'Scheduled callback {callback!r} raised {e.__class__.__name__}: {e}')
+    
+    def _wake(self):
+        """Called whenever the earliest deadline moves closer."""
+        pass
+
+
+class MonotonicClock(Clock):
+    """A clock backed by the system's monotonic clock.
+    
+    A single precise Qt timer is armed for the earliest deadline, so callbacks
+    are invoked on the Qt thread."""
+    
+    def __init__(self, parent: QtCore.QObject = None):
+        # Super call
+        super(MonotonicClock, self).__init__()
+        
+        # Private attributes
+        self._timer: QtCore.QTimer = QtCore.QTimer(parent=parent)
+        
+        # Internal calls
+        self._timer.setSingleShot(True)
+        self._timer.setTimerType(QtCore.Qt.PreciseTimer)
+        self._timer.timeout.connect(self.process_timeout)
+    
+    def now(self) -> float:
+        return time.monotonic()
+    
+    # Slots
+    def process_timeout(self):
+        """Invokes every callback that's due, then rearms the timer."""
+        now = self.now()
+        due = self._pop(now)
+        
+        while due is not None:
+            self._invoke(due[1])
+            due = self._pop(now)
+        
+        self._wake()
+    
+    # Internal methods
+    def _wake(self):
+        deadline = self.next_deadline()
+        
+        if deadline is None:
+            return self._timer.stop()
+        
+        self._timer.start(max(0, math.ceil((deadline - self.now()) * 1000)))
+
+
+class VirtualClock(Clock):
+    """A clock that only moves when it's told to.
+    
+    Advancing the clock invokes every callback due along the way
+    immediately, in deadline order, so hours of timers can be simulated in
+    a fraction of a second."""
+    
+    def __init__(self, start: float = 0.0):
+        # Super call
+        super(VirtualClock, self).__init__()
+        
+        # Private attributes
+        self._now: float = start
+    
+    def now(self) -> float:
+        return self._now
+    
+    # Control methods
+    def advance(self, seconds: float) -> int:
+        """Moves the clock forward, invoking the callbacks due on the way.
+        
+        * Callbacks scheduled by other callbacks are invoked too, as long as
+        they're due before the clock's new time.
+        
+        :returns: The number of callbacks invoked."""
+        if seconds < 0:
+            raise ValueError('Clocks cannot move backwards!')
+        
+        target = self._now + seconds
+        invoked = self._drain(target)
+        self._now = target
+        
+        return invoked
+    
+    def run(self, limit: int = None) -> int:
+        """Advances the clock until no callbacks are pending.
+        
+        :param limit: The maximum number of callbacks to invoke, for timers
+                      that reschedule themselves forever.
+        :returns: The number of callbacks invoked."""
+        return self._drain(math.inf, limit)
+    
+    # Internal methods
+    def _drain(self, target: float, limit: int = None) -> int:
+        invoked = 0
+        
+        while limit is None or invoked < limit:
+            due = self._pop(target)
+            
+            if due is None:
+                break
+            
+            # Callbacks see the time they were due at.
+            self._now = max(self._now, due[0])
+            self._invoke(due[1])
+            invoked += 1
+        
+        return invoked
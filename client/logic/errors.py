@@ -28,11 +28,16 @@ class DescentError(Exception):
     """The base class for all Decision Descent exceptions."""
 
 
-class IntentNotFoundError(KeyError):
+class MalformedMessageError(DescentError):
+    """The message received was missing required fields, or its arguments
+    didn't match the intent's schema."""
+
+
+class IntentNotFoundError(DescentError, KeyError):
     """The intent requested was not registered with the arbiter."""
 
 
-class IntentExistsError(KeyError):
+class IntentExistsError(DescentError, KeyError):
     """The intent requested was already registered to the arbiter.
     
     Overriding intents should only be done if you know what you're doing."""
@@ -0,0 +1,183 @@
+# This file is part of Decision Descent.
+#
+# Decision Descent is free software:
+# you can redistribute it
+# and/or modify it under the
+# terms of the GNU General
+# Public License as published by
+# the Free Software Foundation,
+# either version 3 of the License,
+# or (at your option) any later
+# version.
+#
+# Decision Descent is distributed in
+# the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without
+# even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A
+# PARTICULAR PURPOSE.  See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the
+# GNU General Public License along with
+# Decision Descent.  If not,
+# see <https://www.gnu.org/licenses/>.
+import collections
+import enum
+import functools
+import inspect
+import itertools
+import logging
+import threading
+import typing
+from concurrent import futures
+
+from PyQt5 import QtCore
+
+if typing.TYPE_CHECKING:
+    from ..dataclasses import Message
+
+__all__ = ['ExecutionMode', 'IntentExecutor']
+
+
+class ExecutionMode(enum.Enum):
+    """Where an intent's handler runs."""
+    INLINE = 0  # On the Qt thread, as the message is processed
+    THREAD = 1  # On a worker thread
+    PROCESS = 2  # In a worker process; the handler and its arguments must be picklable
+
+
+class IntentExecutor(QtCore.QObject):
+    """Runs intent handlers off the Qt thread, and marshals their results back
+    to it.
+    
+    Off-thread handlers return a future when invoked.  Results are emitted
+    through `onReply` on the Qt thread, in the order their messages were
+    received, regardless of the order their handlers finish in."""
+    LOGGER = logging.getLogger("extensions.DescentIsaac.executor")
+    
+    onReply = QtCore.pyqtSignal(object, object)
+    _finished = QtCore.pyqtSignal()
+    
+    def __init__(self, threads: int = 4, processes: int = 2, parent: QtCore.QObject = None):
+        # Super call
+        super(IntentExecutor, self).__init__(parent=parent)
+        
+        # Private attributes
+        self._workers: typing.Dict[ExecutionMode, int] = {ExecutionMode.THREAD: threads,
+                                                           ExecutionMode.PROCESS: processes}
+        self._pools: typing.Dict[ExecutionMode, futures.Executor] = {}
+        self._tickets: typing.Iterator[int] = itertools.count()
+        self._pending: typing.MutableMapping[int, typing.List] = collections.OrderedDict()
+        
+        # Internal calls
+        self._finished.connect(self.release)
+    
+    # Pool methods
+    def _pool(self, mode: ExecutionMode) -> futures.Executor:
+        """Returns the pool for an execution mode, creating it on first use."""
+        if mode not in self._pools:
+            if mode is ExecutionMode.THREAD:
+                self._pools[mode] = futures.ThreadPoolExecutor(self._workers[mode], 'descent-intent')
+            
+            else:
+                self._pools[mode] = futures.ProcessPoolExecutor(self._workers[mode])
+        
+        return self._pools[mode]
+    
+    def wrap(self, func: typing.Callable, mode: ExecutionMode) -> typing.Callable:
+        """Wraps a handler so invoking it submits it to the mode's pool.
+        
+        * Inline handlers are returned as-is.
+        
+        :raises ValueError: The handler is a bound method, and the mode is
+                            `PROCESS`.  Pickling a bound method pickles its
+                            instance, which for Qt objects is impossible."""
+        if mode is ExecutionMode.INLINE:
+            return func
+        
+        if mode is ExecutionMode.PROCESS and inspect.ismethod(func):
+            raise ValueError(f'{func!s} is a bound method, and can\'t be run in a process!')
+        
+        @functools.wraps(func)
+        def submit(*args, **kwargs) -> futures.Future:
+            return self._pool(mode).submit(func, *args, **kwargs)
+        
+        return submit
+    
+    def shutdown(self):
+        """Stops every pool, without waiting for running handlers."""
+        for pool in self._pools.values():
+            pool.shutdown(wait=False)
+        
+        self._pools.clear()
+    
+    # Result methods
+    @staticmethod
+    def gather(results: typing.List[typing.Any]) -> typing.Union[typing.List[typing.Any], futures.Future]:
+        """Combines a list of results, some of which may be futures, into a
+        single future.
+        
+        * If none of the results are futures, the list is returned as-is."""
+        pending = [r for r in results if isinstance(r, futures.Future)]
+        
+        if not pending:
+            return results
+        
+        combined = futures.Future()
+        remaining = [len(pending)]
+        lock = threading.Lock()
+        
+        def done(_: futures.Future):
+            with lock:
+                remaining[0] -= 1
+                
+                if remaining[0]:
+                    return
+            
+            combined.set_result([
+                (r.result() if r.exception() is None else None) if isinstance(r, futures.Future) else r
+                for r in results
+            ])
+        
+        for future in pending:
+            future.add_done_callback(done)
+        
+        return combined
+    
+    def track(self, message: 'Message', result: typing.Any):
+        """Queues a message's result for release.
+        
+        :param message: The message that was executed.
+        :param result: The handler's result, or a future if the handler runs
+                       off the Qt thread."""
+        self._pending[next(self._tickets)] = [message, result]
+        
+        if isinstance(result, futures.Future):
+            # Emitting from the worker thread queues the release onto the Qt
+            # thread.
+            result.add_done_callback(lambda _: self._finished.emit())
+        
+        else:
+            self.release()
+    
+    def release(self):
+        """Emits every result that's ready, stopping at the first message
+        whose handler is still running."""
+        while self._pending:
+            ticket = next(iter(self._pending))
+            message, result = self._pending[ticket]
+            
+            if isinstance(result, futures.Future):
+                if not result.done():
+                    return
+                
+                try:
+                    result = result.result()
+                
+                except Exception as e:
+                    self.LOGGER.warning(f'Intent "{message.intent}" failed off-thread!  {e.__class__.__name__}({e!s})')
+                    result = None
+            
+            del self._pending[ticket]
+            self.onReply.emit(message, result)
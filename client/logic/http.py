@@ -22,17 +22,17 @@
 # GNU General Public License along with
 # Decision Descent.  If not,
 # see <https://www.gnu.org/licenses/>.
-import inspect
-import json
 import logging
 import typing
 
 from PyQt5 import QtCore, QtNetwork
 
+from .outbound import Priority
+from .session import Handshake, Session
 from .. import dataclasses as descent_dataclasses
 
 if typing.TYPE_CHECKING:
-    from core.utils import custom
+    from .schema import Schema
 
 __all__ = ['HTTP']
 
@@ -41,25 +41,33 @@ class HTTP(QtCore.QObject):
     """Connects to the other half of the mod.
     
     This class is responsible for ensuring the mod's logic is processed, then
-    returned to the mod for displaying."""
+    returned to the mod for displaying.  The wire protocol itself, including
+    resuming sessions, is implemented by `Session`.
+    
+    Outgoing messages are queued by priority class, and only handed to the
+    socket while its write buffer is below `WATERMARK`, so urgent messages
+    overtake bulk traffic when the link is busy."""
     # Signals
     onResponse = QtCore.pyqtSignal(object)
     onConnectionReceived = QtCore.pyqtSignal()
+    onSessionResumed = QtCore.pyqtSignal()
     
     # Class variables
     LOGGER: logging.Logger = logging.getLogger("extensions.DescentClient.http")
+    WATERMARK: int = 16 * 1024  # Bytes the socket may buffer before messages are held back
     
-    def __init__(self, parent: QtCore.QObject = None):
+    def __init__(self, replay: int = 256, parent: QtCore.QObject = None):
         # Super call
         super(HTTP, self).__init__(parent=parent)
         
         # Internal attributes
         self._socket: QtNetwork.QTcpServer = QtNetwork.QTcpServer(parent=self)
         self._client: typing.Optional[QtNetwork.QTcpSocket] = None
+        self._session: Session = Session(replay)
+        self._flush_pending: bool = False
         
-        # Aliases
-        qt_disconnect = super(HTTP, self).disconnect
-        qt_connect = super(HTTP, self).connect
+        # Public attributes
+        self.schemas: typing.Dict[str, 'Schema'] = self._session.schemas  # Validates the arguments of messages
         
         # Internal calls
         self._socket.newConnection.connect(self.process_new_client)
@@ -67,12 +75,8 @@ class HTTP(QtCore.QObject):
         self._socket.setMaxPendingConnections(2)
     
     # Connection methods
-    def connect(self):
-        """Connects the socket to the specified host and port.  If host and port
-        are omitted, the most recent host:port will be used."""
-        app: custom.QApplication = custom.QApplication.instance()
-        port = app.client.settings['extensions']['descentisaac']['http']['port'].value
-
+    def connect(self, port: int):
+        """Listens for the mod on the specified port."""
         if not self._socket.listen(QtNetwork.QHostAddress.LocalHost, port):
             self.LOGGER.critical(f'Could not create a server on port {port}')
             return self.LOGGER.critical(f'Error message:  {self._socket.errorString()}')
@@ -81,22 +85,69 @@ class HTTP(QtCore.QObject):
         self.LOGGER.debug(f'Full connection address: {self._socket.serverAddress()}:{self._socket.serverPort()}')
 
     def disconnect(self):
-        """Disconnects the socket."""
-        self._socket.disconnect()
+        """Stops listening for the mod."""
+        self._socket.close()
+    
+    def send_message(self, message: descent_dataclasses.Message, priority: Priority = Priority.REPLY,
+                     key: str = None, merge: typing.Callable = None):
+        """Queues a message for the connected client.
+        
+        :param message: The message to send.
+        :param priority: The message's priority class.
+        :param key: Identifies queued messages this message supersedes.
+        :param merge: Combines a superseded message with this one.
+        
+        * Messages are sent on the next pass of the event loop, most urgent
+        first.  Messages queued while no session is established are sent once
+        one is."""
+        self._session.push(message, priority, key, merge)
+        
+        if not self._flush_pending:
+            self._flush_pending = True
+            QtCore.QTimer.singleShot(0, self.flush)
     
-    def send_message(self, message: descent_dataclasses.Message):
-        """Sends a message to any connected clients."""
+    def send_batch(self, messages: typing.Iterable[descent_dataclasses.Message], atomic: bool = False,
+                   reply: str = None, priority: Priority = Priority.REPLY):
+        """Queues several messages to be sent in a single batch envelope.
+        
+        :param messages: The messages to send.
+        :param atomic: Whether the mod should reject the whole batch if any
+                       message can't be executed.
+        :param reply: The intent to invoke with every message's result.
+        :param priority: The batch's priority class."""
+        payloads = [m.to_dict() for m in messages]
+        
+        self.send_message(descent_dataclasses.Message('batch', payloads, {'atomic': atomic}, reply), priority)
+    
+    def flush(self):
+        """Writes queued messages until the queue is empty, or the socket's
+        write buffer reaches the watermark."""
+        self._flush_pending = False
+        
+        if self._client is None:
+            return
+        
+        while self._session.has_pending() and self._client.bytesToWrite() < self.WATERMARK:
+            data = self._session.next()
+            
+            try:
+                self.write(data)
+            
+            except ConnectionError as e:
+                # The message is already in the replay buffer, so it'll be
+                # delivered if the client resumes.
+                return self.LOGGER.warning(f'Could not send message #{self._session.sent}!  {e!s}')
+    
+    def write(self, data: bytes):
+        """Writes raw data to the connected client."""
         if self._client is None or self._client.state() != self._client.ConnectedState:
             raise ConnectionError('No client connected!')
         
         if not self._client.isWritable():
             raise ConnectionError('Cannot write to client!')
         
-        self.LOGGER.info('Transforming message to sendable message...')
-        payload = f'{message!s}\r\n'
-        
         self.LOGGER.info('Sending message to the other side...')
-        sent = self._client.write(payload.encode())
+        sent = self._client.write(data)
         
         if sent == -1:
             return self.LOGGER.warning(f"Couldn't send message!  "
@@ -104,28 +155,48 @@ class HTTP(QtCore.QObject):
         
         self.LOGGER.info(f'{sent} bytes sent!')
     
-    # Slots
-    def process_message(self):
-        """Handles all messages received from the socket."""
-        if not self._client.canReadLine():
-            return self.LOGGER.info('Client has data available, but not open for reading!')
-        
-        self.LOGGER.debug('Message received from socket!')
-        d = self._client.readLine().decode()
+    # Session methods
+    def handshake(self, handshake: Handshake):
+        """Sends a client what its handshake requires, then everything queued
+        for it.
         
+        * Clients that can't be written to are treated as disconnected.  The
+        mod sends its handshake again until it's answered."""
         try:
-            data = json.loads(d)
+            for data in handshake.data:
+                self.write(data)
         
-        except ValueError as e:
-            self.LOGGER.warning(f'Received invalid JSON response from connected client!  {e!s}')
-            self.LOGGER.warning(f'Received "{d}"')
+        except ConnectionError as e:
+            self._session.detach()
+            return self.LOGGER.warning(f'Could not complete handshake!  {e!s}')
+        
+        if handshake.resumed:
+            self.onSessionResumed.emit()
         
         else:
-            self.LOGGER.debug('Received payload from connected client!')
-            self.onResponse.emit(descent_dataclasses.Message.from_json(data))
+            self.onConnectionReceived.emit()
+        
+        self.flush()
+    
+    # Slots
+    def process_message(self):
+        """Handles all messages received from the socket."""
+        while self._client.canReadLine():
+            self.LOGGER.debug('Message received from socket!')
+            event = self._session.receive(bytes(self._client.readLine()))
+            
+            if isinstance(event, Handshake):
+                self.handshake(event)
+            
+            elif event is not None:
+                self.LOGGER.debug('Received payload from connected client!')
+                self.onResponse.emit(event)
     
     def process_new_client(self):
-        """Called whenever the server receives a new connection!"""
+        """Called whenever the server receives a new connection!
+        
+        * The client isn't considered connected until it sends its session
+        handshake."""
         self.LOGGER.info('New connection received!')
         
         if self._client is not None:
@@ -135,14 +206,18 @@ class HTTP(QtCore.QObject):
             
             self.LOGGER.info('Disconnecting signals...')
             self._client.readyRead.disconnect()
+            self._client.bytesWritten.disconnect()
             self._client.deleteLater()
         
+        self._session.detach()
         self._client = self._socket.nextPendingConnection()
         self._client.readyRead.connect(self.process_message)
-        self.onConnectionReceived.emit()
+        self._client.bytesWritten.connect(self.flush)
     
     def process_connection_error(self, error: int):
         """Called whenever an incoming connection results in an error."""
+        import inspect
+        
         self.LOGGER.warning('Connection failed!')
         
         for member, inst in inspect.getmembers(QtNetwork.QAbstractSocket):
@@ -0,0 +1,174 @@
+# This file is part of Decision Descent.
+#
+# Decision Descent is free software:
+# you can redistribute it
+# and/or modify it under the
+# terms of the GNU General
+# Public License as published by
+# the Free Software Foundation,
+# either version 3 of the License,
+# or (at your option) any later
+# version.
+#
+# Decision Descent is distributed in
+# the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without
+# even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A
+# PARTICULAR PURPOSE.  See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the
+# GNU General Public License along with
+# Decision Descent.  If not,
+# see <https://www.gnu.org/licenses/>.
+import collections
+import dataclasses
+import enum
+import itertools
+import logging
+import time
+import typing
+
+from PyQt5 import QtCore
+
+if typing.TYPE_CHECKING:
+    from .sketch import ErrorBounds
+    from ..widgets import Poll
+
+__all__ = ['PollLifecycle', 'PollRecord', 'PollState']
+
+
+class PollState(enum.Enum):
+    """The various states a poll moves through."""
+    CREATED = 0
+    RUNNING = 1
+    CONCLUDED = 2
+    ARCHIVED = 3
+
+
+@dataclasses.dataclass(frozen=True)
+class PollRecord:
+    """A compact record of a concluded poll's results."""
+    uid: int
+    intent: str
+    multi: bool
+    tally: typing.Tuple[typing.Tuple[str, int], ...]
+    winners: typing.Tuple[str, ...]
+    participants: int
+    concluded: float
+    bounds: typing.Optional['ErrorBounds'] = None  # Only set for polls tallied approximately
+
+
+class PollLifecycle(QtCore.QObject):
+    """Tracks polls from their creation until they're archived.
+    
+    Concluded polls have their Qt resources released, and are replaced by a
+    compact `PollRecord` in a bounded history."""
+    LOGGER = logging.getLogger("extensions.DescentIsaac.lifecycle")
+    
+    onLiveChanged = QtCore.pyqtSignal()
+    onArchived = QtCore.pyqtSignal(object)
+    
+    def __init__(self, history: int = 50, parent: QtCore.QObject = None):
+        # Super call
+        super(PollLifecycle, self).__init__(parent=parent)
+        
+        # Private attributes
+        self._ids: typing.Iterator[int] = itertools.count(1)
+        self._live: typing.Dict[int, 'Poll'] = {}
+        self._states: typing.Dict[int, PollState] = {}
+        self._history: typing.Deque[PollRecord] = collections.deque(maxlen=history)
+        self._archived: int = 0
+    
+    # Registry methods
+    def register(self, poll: 'Poll') -> int:
+        """Registers a newly created poll.
+        
+        :returns: The unique id assigned to the poll."""
+        poll.uid = next(self._ids)
+        
+        self._live[poll.uid] = poll
+        self._states[poll.uid] = PollState.CREATED
+        poll.onFinish.connect(self.process_finish)
+        
+        self.onLiveChanged.emit()
+        return poll.uid
+    
+    def start(self, poll: 'Poll', seconds: int = None):
+        """Starts a registered poll's timer."""
+        poll.start(seconds)
+        self._states[poll.uid] = PollState.RUNNING
+    
+    def discard(self, poll: 'Poll'):
+        """Releases a live poll without recording its results."""
+        if self._live.pop(poll.uid, None) is None:
+            return
+        
+        del self._states[poll.uid]
+        poll.delete()
+        self.onLiveChanged.emit()
+    
+    def clear(self):
+        """Releases every live poll without recording their results."""
+        for poll in list(self._live.values()):
+            poll.delete()
+        
+        self._live.clear()
+        self._states.clear()
+        self.onLiveChanged.emit()
+    
+    def get_state(self, uid: int) -> PollState:
+        """Returns the state of a poll.
+        
+        * Polls no longer tracked are considered archived."""
+        return self._states.get(uid, PollState.ARCHIVED)
+    
+    def get_live(self) -> typing.List['Poll']:
+        """Returns the polls that haven't been archived yet."""
+        return list(self._live.values())
+    
+    def get_history(self) -> typing.List[PollRecord]:
+        """Returns the records of the most recently archived polls."""
+        return list(self._history)
+    
+    def live_count(self) -> int:
+        """The number of polls currently holding resources."""
+        return len(self._live)
+    
+    def archived_count(self) -> int:
+        """The number of polls archived this session."""
+        return self._archived
+    
+    # Slots
+    def process_finish(self, poll: 'Poll'):
+        """Archives a poll once it has emitted all of its winners."""
+        if poll.uid not in self._live:
+            return
+        
+        self._states[poll.uid] = PollState.CONCLUDED
+        
+        tally = poll.tally()
+        record = PollRecord(
+            poll.uid,
+            poll.intent,
+            poll.is_multi(),
+            tuple(tally.items()),
+            tuple(poll.get_winners()),
+            sum(tally.values()),
+            time.time(),
+            poll.get_error_bounds()
+        )
+        
+        # Release the poll's timer and widgets
+        poll.onFinish.disconnect(self.process_finish)
+        poll.delete()
+        
+        del self._live[poll.uid]
+        del self._states[poll.uid]
+        self._history.append(record)
+        self._archived += 1
+        
+        self.LOGGER.debug(f'Archived poll #{record.uid}  ({self.live_count()} live, {self._archived} archived)')
+        self.onArchived.emit(record)
+        self.onLiveChanged.emit()
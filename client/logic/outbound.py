@@ -0,0 +1,141 @@
+# This file is part of Decision Descent.
+#
+# Decision Descent is free software:
+# you can redistribute it
+# and/or modify it under the
+# terms of the GNU General
+# Public License as published by
+# the Free Software Foundation,
+# either version 3 of the License,
+# or (at your option) any later
+# version.
+#
+# Decision Descent is distributed in
+# the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without
+# even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A
+# PARTICULAR PURPOSE.  See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the
+# GNU General Public License along with
+# Decision Descent.  If not,
+# see <https://www.gnu.org/licenses/>.
+import collections
+import dataclasses
+import enum
+import logging
+import typing
+
+if typing.TYPE_CHECKING:
+    from ..dataclasses import Message
+
+__all__ = ['OutboundQueue', 'Priority']
+
+
+class Priority(enum.IntEnum):
+    """The priority classes of outgoing messages.  Lower values are sent
+    first."""
+    CRITICAL = 0  # Poll conclusions
+    REPLY = 1  # Replies to the mod's intents
+    CONFIG = 2  # Config pushes
+    HUD = 3  # HUD updates
+    TELEMETRY = 4  # Anything the game doesn't need promptly
+
+
+# The maximum number of queued messages per class.  None means the class is
+# never dropped from.
+LIMITS: typing.Dict[Priority, typing.Optional[int]] = {
+    Priority.CRITICAL: None,
+    Priority.REPLY: None,
+    Priority.CONFIG: 16,
+    Priority.HUD: 8,
+    Priority.TELEMETRY: 32
+}
+
+
+@dataclasses.dataclass()
+class _Entry:
+    message: 'Message'
+    key: typing.Optional[str]
+
+
+class OutboundQueue:
+    """Orders outgoing messages by priority class.
+    
+    Messages pushed with a key supersede any queued message in the same class
+    with the same key, either by replacing it or by being merged into it.
+    Full classes drop their oldest message."""
+    LOGGER = logging.getLogger("extensions.DescentIsaac.outbound")
+    
+    def __init__(self, limits: typing.Dict[Priority, typing.Optional[int]] = None):
+        # Public attributes
+        self.dropped: typing.Dict[Priority, int] = {p: 0 for p in Priority}
+        self.merged: typing.Dict[Priority, int] = {p: 0 for p in Priority}
+        
+        # Private attributes
+        self._limits = dict(LIMITS)
+        self._limits.update(limits or {})
+        self._queues: typing.Dict[Priority, typing.Deque[_Entry]] = {p: collections.deque() for p in Priority}
+        self._keyed: typing.Dict[Priority, typing.Dict[str, _Entry]] = {p: {} for p in Priority}
+    
+    def push(self, message: 'Message', priority: Priority = Priority.REPLY, key: str = None,
+             merge: typing.Callable[['Message', 'Message'], 'Message'] = None):
+        """Queues a message.
+        
+        :param message: The message to queue.
+        :param priority: The message's priority class.
+        :param key: Identifies messages that supersede each other.  A queued
+                    message with the same key is replaced in place.
+        :param merge: Combines a superseded message with its replacement.  If
+                      omitted, the older message is simply discarded."""
+        if key is not None and key in self._keyed[priority]:
+            entry = self._keyed[priority][key]
+            entry.message = merge(entry.message, message) if merge is not None else message
+            
+            self.merged[priority] += 1
+            return
+        
+        queue = self._queues[priority]
+        limit = self._limits[priority]
+        
+        if limit is not None and len(queue) >= limit:
+            stale = queue.popleft()
+            self.dropped[priority] += 1
+            
+            if stale.key is not None:
+                del self._keyed[priority][stale.key]
+            
+            self.LOGGER.debug(f'Dropped stale {priority.name} message "{stale.message.intent}"')
+        
+        entry = _Entry(message, key)
+        queue.append(entry)
+        
+        if key is not None:
+            self._keyed[priority][key] = entry
+    
+    def pop(self) -> typing.Optional['Message']:
+        """Removes and returns the most urgent queued message."""
+        for priority, queue in self._queues.items():
+            if queue:
+                entry = queue.popleft()
+                
+                if entry.key is not None:
+                    del self._keyed[priority][entry.key]
+                
+                return entry.message
+        
+        return None
+    
+    def clear(self):
+        """Discards every queued message."""
+        for priority in Priority:
+            self._queues[priority].clear()
+            self._keyed[priority].clear()
+    
+    def __len__(self) -> int:
+        return sum(len(q) for q in self._queues.values())
+    
+    def __bool__(self) -> bool:
+        return any(self._queues.values())
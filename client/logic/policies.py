@@ -0,0 +1,110 @@
+# This file is part of Decision Descent.
+#
+# Decision Descent is free software:
+# you can redistribute it
+# and/or modify it under the
+# terms of the GNU General
+# Public License as published by
+# the Free Software Foundation,
+# either version 3 of the License,
+# or (at your option) any later
+# version.
+#
+# Decision Descent is distributed in
+# the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without
+# even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A
+# PARTICULAR PURPOSE.  See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the
+# GNU General Public License along with
+# Decision Descent.  If not,
+# see <https://www.gnu.org/licenses/>.
+import abc
+import dataclasses
+import typing
+
+__all__ = ['ConclusionPolicy', 'Lead', 'Quorum', 'Standings', 'Supermajority']
+
+
+@dataclasses.dataclass(frozen=True)
+class Standings:
+    """A snapshot of a poll's tally, as seen by conclusion policies."""
+    leader: int  # Votes held by the leading choice
+    runner_up: int  # Votes held by the second choice, or 0 if there isn't one
+    votes: int  # Votes cast in total
+    electorate: int = 0  # The number of eligible voters, or 0 if it isn't known
+    switchable: int = 0  # The number of voters that may still change their vote
+    
+    @property
+    def remaining(self) -> typing.Optional[int]:
+        """The number of eligible voters that haven't voted yet, if the
+        electorate is known."""
+        return max(0, self.electorate - self.votes) if self.electorate else None
+
+
+class ConclusionPolicy(abc.ABC):
+    """Decides whether a poll can be concluded before its timer runs out.
+    
+    Policies are evaluated after every vote, so they should only look at the
+    standings they're given."""
+    
+    @abc.abstractmethod
+    def check(self, standings: Standings) -> bool:
+        """Whether or not the poll should be concluded now."""
+    
+    def __repr__(self):
+        fields = ', '.join(f'{k}={v!r}' for k, v in vars(self).items())
+        return f'{self.__class__.__name__}({fields})'
+
+
+class Lead(ConclusionPolicy):
+    """Concludes a poll once its leader can't be caught.
+    
+    * The leader is only safe once it can't be caught even if every voter
+    left votes for the runner-up, and every voter that can change their vote
+    switches to it.  Each switch away from the leader closes the gap twice.
+    Polls without a known electorate are never concluded by this policy."""
+    
+    def check(self, standings: Standings) -> bool:
+        remaining = standings.remaining
+        
+        if remaining is None:
+            return False
+        
+        swing = remaining + standings.switchable + min(standings.switchable, standings.leader)
+        return standings.leader - standings.runner_up > swing
+
+
+class Supermajority(ConclusionPolicy):
+    """Concludes a poll once a single choice holds a large enough share of
+    the votes cast.
+    
+    :param fraction: The share of the votes the leader needs, from 0 to 1.
+    :param minimum: The number of votes that must be cast before the share
+                    is trusted."""
+    
+    def __init__(self, fraction: float, minimum: int = 1):
+        self.fraction: float = fraction
+        self.minimum: int = max(1, minimum)
+    
+    def check(self, standings: Standings) -> bool:
+        return standings.votes >= self.minimum and standings.leader >= self.fraction * standings.votes
+
+
+class Quorum(ConclusionPolicy):
+    """Concludes a poll once enough votes have been cast.
+    
+    :param votes: The number of votes required.  If this is 0, every eligible
+                  voter must vote, which requires a known electorate."""
+    
+    def __init__(self, votes: int = 0):
+        self.votes: int = votes
+    
+    def check(self, standings: Standings) -> bool:
+        if self.votes > 0:
+            return standings.votes >= self.votes
+        
+        return standings.remaining == 0
@@ -0,0 +1,197 @@
+# This file is part of Decision Descent.
+#
+# Decision Descent is free software:
+# you can redistribute it
+# and/or modify it under the
+# terms of the GNU General
+# Public License as published by
+# the Free Software Foundation,
+# either version 3 of the License,
+# or (at your option) any later
+# version.
+#
+# Decision Descent is distributed in
+# the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without
+# even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A
+# PARTICULAR PURPOSE.  See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the
+# GNU General Public License along with
+# Decision Descent.  If not,
+# see <https://www.gnu.org/licenses/>.
+import dataclasses
+import logging
+import math
+import typing
+
+__all__ = ['BloomFilter', 'FilterStats', 'PreFilter']
+
+
+class BloomFilter:
+    """A fixed size probabilistic set.
+    
+    Lookups may return false positives at roughly the requested error rate,
+    but never false negatives.
+    
+    :param hashes: The number of bits each item sets.  By default, this is
+                   the number that needs the fewest bits for the error rate;
+                   fewer hashes make each lookup cheaper, in exchange for a
+                   larger filter."""
+    
+    def __init__(self, capacity: int = 64, error_rate: float = 0.01, hashes: int = None):
+        capacity = max(1, capacity)
+        
+        if hashes is None:
+            size = math.ceil(-capacity * math.log(error_rate) / (math.log(2) ** 2))
+        
+        else:
+            size = math.ceil(-hashes * capacity / math.log(1 - error_rate ** (1 / hashes)))
+        
+        # Internal attributes
+        self._size: int = max(8, size)
+        self._hashes: int = hashes or max(1, round(self._size / capacity * math.log(2)))
+        self._bits: bytearray = bytearray((self._size + 7) // 8)
+    
+    def _positions(self, item: str) -> typing.Iterator[int]:
+        """Yields the bit positions the item maps to.
+        
+        * Positions are derived from a single hash via double hashing."""
+        h = hash(item)
+        h1 = h & 0xFFFFFFFF
+        h2 = ((h >> 32) & 0xFFFFFFFF) | 1
+        
+        for i in range(self._hashes):
+            yield (h1 + i * h2) % self._size
+    
+    def get_error_rate(self, items: int) -> float:
+        """Returns the false positive rate once a number of items have been
+        added."""
+        return (1 - math.exp(-self._hashes * items / self._size)) ** self._hashes
+    
+    def add(self, item: str) -> bool:
+        """Adds an item to the filter.
+        
+        :returns: Whether or not the item wasn't already in the filter, as if
+                  it were checked with `in` first."""
+        bits, size = self._bits, self._size
+        h = hash(item)
+        h1, h2 = h & 0xFFFFFFFF, ((h >> 32) & 0xFFFFFFFF) | 1
+        added = False
+        
+        # The positions are derived like `_positions` derives them; the loop
+        # is inlined since approximate tallies add every vote they sample.
+        for _ in range(self._hashes):
+            p = h1 % size
+            bit = 1 << (p & 7)
+            
+            if not bits[p >> 3] & bit:
+                bits[p >> 3] |= bit
+                added = True
+            
+            h1 += h2
+        
+        return added
+    
+    def __contains__(self, item: str) -> bool:
+        for p in self._positions(item):
+            if not self._bits[p >> 3] & (1 << (p & 7)):
+                return False
+        
+        return True
+
+
+@dataclasses.dataclass()
+class FilterStats:
+    """Counters describing how much chat the pre-filter discarded."""
+    seen: int = 0
+    rejected_shape: int = 0
+    rejected_length: int = 0
+    rejected_bloom: int = 0
+    passed: int = 0
+    
+    @property
+    def rejected(self) -> int:
+        """The total number of messages discarded."""
+        return self.rejected_shape + self.rejected_length + self.rejected_bloom
+    
+    def reset(self):
+        """Resets all counters to zero."""
+        self.seen = self.rejected_shape = self.rejected_length = self.rejected_bloom = self.passed = 0
+
+
+class PreFilter:
+    """Discards chat messages that cannot possibly be votes before they reach
+    the arbiter's poll matching.
+    
+    The filter should be rebuilt whenever the set of active poll tokens
+    changes."""
+    LOGGER = logging.getLogger("extensions.DescentIsaac.prefilter")
+    
+    def __init__(self, error_rate: float = 0.01):
+        # Public attributes
+        self.stats: FilterStats = FilterStats()
+        
+        # Private attributes
+        self._error_rate: float = error_rate
+        self._bloom: typing.Optional[BloomFilter] = None
+        self._minimum: int = 0  # Shortest active token
+        self._maximum: int = 0  # Longest active token
+        self._words: int = 0  # Most words in an active token
+    
+    def rebuild(self, tokens: typing.Iterable[str]):
+        """Rebuilds the filter from the currently active poll tokens.
+        
+        :param tokens: Every id, alias, and name of every active poll."""
+        tokens = {t.lower() for t in tokens if t}
+        
+        if not tokens:
+            self._bloom = None
+            self._minimum = self._maximum = self._words = 0
+            
+            return self.LOGGER.debug('Pre-filter emptied; all chat will be rejected.')
+        
+        self._bloom = BloomFilter(len(tokens), self._error_rate)
+        self._minimum = min(len(t) for t in tokens)
+        self._maximum = max(len(t) for t in tokens)
+        self._words = max(t.count(' ') for t in tokens) + 1
+        
+        for t in tokens:
+            self._bloom.add(t)
+        
+        self.LOGGER.debug(f'Pre-filter rebuilt with {len(tokens)} tokens '
+                          f'(lengths {self._minimum}-{self._maximum}, up to {self._words} words)')
+    
+    def check(self, content: str) -> typing.Optional[str]:
+        """Checks whether a chat message could be a vote.
+        
+        :param content: The raw chat message.
+        :returns: The normalized token if the message may be a vote, or None
+                  if it definitely isn't."""
+        self.stats.seen += 1
+        token = content.strip()
+        
+        # Length is checked first since it's the cheapest rejection, and
+        # covers the case where no polls are running.  The extra character
+        # accounts for the optional "#" prefix.
+        if self._bloom is None or not self._minimum <= len(token) <= self._maximum + 1:
+            self.stats.rejected_length += 1
+            return None
+        
+        if token.startswith('#'):
+            token = token[1:]
+        
+        if not token or token.count(' ') >= self._words or not self._minimum <= len(token) <= self._maximum:
+            self.stats.rejected_shape += 1
+            return None
+        
+        token = token.lower()
+        
+        if token not in self._bloom:
+            self.stats.rejected_bloom += 1
+            return None
+        
+        self.stats.passed += 1
+        return token
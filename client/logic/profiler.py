@@ -0,0 +1,202 @@
+# This file is part of Decision Descent.
+#
+# Decision Descent is free software:
+# you can redistribute it
+# and/or modify it under the
+# terms of the GNU General
+# Public License as published by
+# the Free Software Foundation,
+# either version 3 of the License,
+# or (at your option) any later
+# version.
+#
+# Decision Descent is distributed in
+# the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without
+# even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A
+# PARTICULAR PURPOSE.  See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the
+# GNU General Public License along with
+# Decision Descent.  If not,
+# see <https://www.gnu.org/licenses/>.
+import cProfile
+import dataclasses
+import io
+import logging
+import os
+import pstats
+import threading
+import time
+import typing
+
+from . import catchable
+
+__all__ = ['HandlerStats', 'Profiler', 'Recording']
+
+
+@dataclasses.dataclass()
+class HandlerStats:
+    """Aggregated timings for a single slot or intent."""
+    calls: int = 0
+    total: float = 0.0
+    worst: float = 0.0
+    
+    @property
+    def mean(self) -> float:
+        """The average time spent per call."""
+        return self.total / self.calls if self.calls else 0.0
+    
+    def add(self, elapsed: float):
+        """Records a single call."""
+        self.calls += 1
+        self.total += elapsed
+        self.worst = max(self.worst, elapsed)
+
+
+@dataclasses.dataclass()
+class Recording:
+    """The results of a stopped profiler, waiting to be written."""
+    profile: cProfile.Profile
+    handlers: typing.Dict[str, HandlerStats]
+    duration: float
+
+
+class Profiler:
+    """An on-demand profiler for the Qt thread.
+    
+    While running, every function call on the thread that started it is
+    profiled with cProfile, and every slot or intent wrapped by
+    `catchable.signal` has its wall time aggregated by name.  Stopping the
+    profiler returns both as a recording, which can be written to a directory
+    for offline analysis."""
+    LOGGER = logging.getLogger("extensions.DescentIsaac.profiler")
+    
+    def __init__(self, directory: str = 'profiles'):
+        # Public attributes
+        self.directory: str = directory
+        
+        # Private attributes
+        self._profile: typing.Optional[cProfile.Profile] = None
+        self._handlers: typing.Dict[str, HandlerStats] = {}
+        self._lock: threading.Lock = threading.Lock()
+        self._started: float = 0.0
+    
+    # Properties
+    def is_running(self) -> bool:
+        """Whether or not the profiler is currently recording."""
+        return self._profile is not None
+    
+    def get_handlers(self) -> typing.Dict[str, HandlerStats]:
+        """Returns the aggregated timings recorded so far."""
+        with self._lock:
+            return {n: dataclasses.replace(s) for n, s in self._handlers.items()}
+    
+    # Control methods
+    def start(self):
+        """Starts recording.
+        
+        * cProfile only profiles the thread it's started on, so this should be
+        called from the Qt thread."""
+        if self._profile is not None:
+            return self.LOGGER.warning('The profiler is already running!')
+        
+        with self._lock:
+            self._handlers.clear()
+        
+        self._started = time.perf_counter()
+        self._profile = cProfile.Profile()
+        
+        catchable.add_hook(self)
+        self._profile.enable()
+        
+        self.LOGGER.info('Profiler started')
+    
+    def stop(self) -> typing.Optional[Recording]:
+        """Stops recording.
+        
+        * Like `start`, this should be called from the Qt thread, since
+        cProfile can only be disabled from the thread it's profiling.
+        
+        :returns: The results recorded, or None if the profiler wasn't
+                  running."""
+        if self._profile is None:
+            self.LOGGER.warning('The profiler is not running!')
+            return None
+        
+        self._profile.disable()
+        catchable.remove_hook(self)
+        
+        profile, self._profile = self._profile, None
+        recording = Recording(profile, self.get_handlers(), time.perf_counter() - self._started)
+        
+        self.LOGGER.info(f'Profiler stopped after {recording.duration:.1f}s')
+        return recording
+    
+    def write(self, recording: Recording) -> typing.Optional[str]:
+        """Writes a recording to the profiler's directory.
+        
+        * Recordings don't reference the profiler, so this may be called from
+        any thread.
+        
+        :returns: The path of the raw profile, or None if it couldn't be
+                  written.  A readable summary is written alongside it."""
+        path = os.path.join(self.directory, time.strftime('descent-%Y%m%d-%H%M%S.prof'))
+        
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            recording.profile.dump_stats(path)
+            
+            with open(os.path.splitext(path)[0] + '.txt', 'w', encoding='utf-8') as f:
+                f.write(self.summarize(recording))
+        
+        except OSError as e:
+            self.LOGGER.warning(f'Could not write profile to {path}!  {e!s}')
+            return None
+        
+        self.LOGGER.info(f'Wrote profile to {path}')
+        return path
+    
+    @staticmethod
+    def summarize(recording: Recording, limit: int = 40) -> str:
+        """Formats the aggregated timings, followed by the profile's most
+        expensive functions."""
+        out = io.StringIO()
+        out.write(f'Profiled {recording.duration:.3f}s of the Qt thread\n\n')
+        out.write(f'{"calls":>8} {"total ms":>10} {"mean ms":>9} {"worst ms":>9}  handler\n')
+        
+        for name, s in sorted(recording.handlers.items(), key=lambda i: i[1].total, reverse=True):
+            out.write(f'{s.calls:>8} {s.total * 1000:>10.2f} {s.mean * 1000:>9.3f} {s.worst * 1000:>9.3f}  {name}\n')
+        
+        out.write('\n')
+        pstats.Stats(recording.profile, stream=out).sort_stats('cumulative').print_stats(limit)
+        
+        return out.getvalue()
+    
+    # Hook methods
+    def enter(self, name: str):
+        pass
+    
+    def exit(self, name: str, elapsed: float):
+        with self._lock:
+            stats = self._handlers.get(name)
+            
+            if stats is None:
+                stats = self._handlers[name] = HandlerStats()
+            
+            stats.add(elapsed)
+    
+    def middleware(self, path: str, nxt: typing.Callable, *args, **kwargs) -> typing.Any:
+        """Router middleware that aggregates intents by their path."""
+        if self._profile is None:
+            return nxt(*args, **kwargs)
+        
+        start = time.perf_counter()
+        
+        try:
+            return nxt(*args, **kwargs)
+        
+        finally:
+            self.exit(f'intent:{path}', time.perf_counter() - start)
@@ -0,0 +1,269 @@
+# This file is part of Decision Descent.
+#
+# Decision Descent is free software:
+# you can redistribute it
+# and/or modify it under the
+# terms of the GNU General
+# Public License as published by
+# the Free Software Foundation,
+# either version 3 of the License,
+# or (at your option) any later
+# version.
+#
+# Decision Descent is distributed in
+# the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without
+# even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A
+# PARTICULAR PURPOSE.  See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the
+# GNU General Public License along with
+# Decision Descent.  If not,
+# see <https://www.gnu.org/licenses/>.
+import logging
+import random
+import typing
+
+__all__ = ['AliasTable', 'RNG', 'WeightedSampler']
+
+
+class AliasTable:
+    """A table for drawing indexes in proportion to their weights.
+    
+    Building the table is O(n), and every draw afterwards is O(1)."""
+    
+    def __init__(self, weights: typing.Sequence[float]):
+        total = sum(weights)
+        size = len(weights)
+        
+        if not size or total <= 0:
+            raise ValueError('Alias tables require at least one positive weight.')
+        
+        scaled = [w * size / total for w in weights]
+        small = [i for i, p in enumerate(scaled) if p < 1.0]
+        large = [i for i, p in enumerate(scaled) if p >= 1.0]
+        
+        # Internal attributes
+        self._size: int = size
+        self._probability: typing.List[float] = [1.0] * size
+        self._alias: typing.List[int] = list(range(size))
+        
+        while small and large:
+            s, l = small.pop(), large.pop()
+            
+            self._probability[s] = scaled[s]
+            self._alias[s] = l
+            
+            scaled[l] += scaled[s] - 1.0
+            (small if scaled[l] < 1.0 else large).append(l)
+        
+        # Anything left over is only short of 1.0 due to rounding errors, and
+        # keeps its default probability of 1.0.
+    
+    def __len__(self) -> int:
+        return self._size
+    
+    def draw(self, rng: random.Random) -> int:
+        """Draws a single index."""
+        u = rng.random() * self._size
+        i = int(u)
+        
+        return i if u - i < self._probability[i] else self._alias[i]
+
+
+class WeightedSampler:
+    """Draws keys from a pool in proportion to their weights.
+    
+    Removed keys aren't dropped from the alias table immediately; draws that
+    land on them are rejected instead.  The table is only rebuilt once the
+    removed keys account for more than `rebuild` of the pool's weight, which
+    keeps the expected number of rejections per draw bounded."""
+    
+    def __init__(self, weights: typing.Mapping[str, float], rng: random.Random, rebuild: float = 0.25):
+        # Private attributes
+        self._rng: random.Random = rng
+        self._rebuild: float = rebuild
+        self._weights: typing.Dict[str, float] = {k: float(w) for k, w in weights.items() if w > 0}
+        self._keys: typing.List[str] = []
+        self._table: typing.Optional[AliasTable] = None
+        self._removed: typing.Set[str] = set()
+        self._removed_weight: float = 0.0
+        self._total: float = 0.0
+    
+    def __len__(self) -> int:
+        return len(self._weights) - len(self._removed)
+    
+    def __contains__(self, key: str) -> bool:
+        return key in self._weights and key not in self._removed
+    
+    def get_weights(self) -> typing.Dict[str, float]:
+        """Returns the weight of every key still in the pool."""
+        return {k: w for k, w in self._weights.items() if k not in self._removed}
+    
+    # Pool methods
+    def remove(self, key: str):
+        """Removes a key from the pool.
+        
+        * This mirrors `ItemPool:RemoveCollectible` on the mod's half."""
+        if key not in self._weights or key in self._removed:
+            return
+        
+        self._removed.add(key)
+        self._removed_weight += self._weights[key]
+        
+        if self._table is not None and self._removed_weight > self._total * self._rebuild:
+            self._table = None
+    
+    def reweight(self, key: str, weight: float):
+        """Changes the weight of a key, adding it to the pool if necessary.
+        
+        * Weights of zero or less remove the key."""
+        if weight <= 0:
+            return self.remove(key)
+        
+        if key in self._removed:
+            self._removed.discard(key)
+            self._removed_weight -= self._weights[key]
+        
+        self._weights[key] = float(weight)
+        self._table = None
+    
+    def _build(self):
+        keys = [k for k in self._weights if k not in self._removed]
+        
+        if not keys:
+            self._keys, self._table, self._total = [], None, 0.0
+            return
+        
+        weights = [self._weights[k] for k in keys]
+        
+        # Removed keys are dropped from the weights for good once the table
+        # no longer refers to them.
+        for k in self._removed:
+            del self._weights[k]
+        
+        self._removed.clear()
+        self._removed_weight = 0.0
+        
+        self._keys = keys
+        self._table = AliasTable(weights)
+        self._total = sum(weights)
+    
+    # Draw methods
+    def draw(self) -> typing.Optional[str]:
+        """Draws a single key, or None if the pool is empty."""
+        if self._table is None:
+            self._build()
+        
+        if self._table is None:
+            return None
+        
+        while True:
+            key = self._keys[self._table.draw(self._rng)]
+            
+            if key not in self._removed:
+                return key
+    
+    def sample(self, amount: int) -> typing.List[str]:
+        """Draws up to `amount` distinct keys without removing them from the
+        pool."""
+        amount = min(amount, len(self))
+        picked: typing.List[str] = []
+        
+        if amount <= 0:
+            return picked
+        
+        if self._table is None:
+            self._build()
+        
+        table, keys = self._table, self._keys
+        rejected = 0
+        
+        while len(picked) < amount:
+            key = keys[table.draw(self._rng)]
+            
+            if key in self._removed or key in picked:
+                rejected += 1
+                
+                # Large samples from small pools would otherwise spend most
+                # of their time rejecting keys they already picked.
+                if rejected >= 8:
+                    remaining = [k for k in keys if k not in self._removed and k not in picked]
+                    table = AliasTable([self._weights[k] for k in remaining])
+                    keys, rejected = remaining, 0
+                
+                continue
+            
+            picked.append(key)
+            rejected = 0
+        
+        return picked
+
+
+class RNG:
+    """The client's source of randomness for generating poll choices.
+    
+    Every pool gets its own random stream derived from the seed and the
+    pool's name, so runs with the same seed draw the same choices regardless
+    of the order pools are drawn from."""
+    LOGGER = logging.getLogger("extensions.DescentIsaac.rng")
+    
+    def __init__(self, seed: typing.Union[int, str] = None, rebuild: float = 0.25):
+        # Private attributes
+        self._seed: typing.Union[int, str] = random.randrange(2 ** 32) if seed is None else seed
+        self._rebuild: float = rebuild
+        self._weights: typing.Dict[str, typing.Dict[str, float]] = {}
+        self._pools: typing.Dict[str, WeightedSampler] = {}
+    
+    # Properties
+    @property
+    def seed(self) -> typing.Union[int, str]:
+        """The seed the pools' streams are derived from."""
+        return self._seed
+    
+    def reseed(self, seed: typing.Union[int, str]):
+        """Reseeds every pool, restoring any keys removed during the previous
+        run."""
+        self._seed = seed
+        self._pools = {n: self._create(n, w) for n, w in self._weights.items()}
+        
+        self.LOGGER.info(f'Reseeded {len(self._pools)} pools with seed {seed!r}')
+    
+    # Pool methods
+    def _create(self, name: str, weights: typing.Mapping[str, float]) -> WeightedSampler:
+        return WeightedSampler(weights, random.Random(f'{self._seed}:{name}'), self._rebuild)
+    
+    def set_pool(self, name: str, weights: typing.Mapping[str, float]):
+        """Creates or replaces a pool.
+        
+        :param name: The name of the pool, like "treasure" or "devil".
+        :param weights: The keys in the pool, and their relative weights."""
+        self._weights[name] = dict(weights)
+        self._pools[name] = self._create(name, weights)
+    
+    def get_pool(self, name: str) -> typing.Optional[WeightedSampler]:
+        """Returns a pool by name."""
+        return self._pools.get(name)
+    
+    def get_pools(self) -> typing.List[str]:
+        """Returns the names of every pool."""
+        return list(self._pools)
+    
+    def remove(self, key: str):
+        """Removes a key from every pool it's in."""
+        for pool in self._pools.values():
+            pool.remove(key)
+    
+    def sample(self, name: str, amount: int) -> typing.List[str]:
+        """Draws up to `amount` distinct keys from a pool.
+        
+        * Unknown pools return no keys."""
+        pool = self._pools.get(name)
+        
+        if pool is None:
+            self.LOGGER.warning(f'Attempted to sample from unknown pool "{name}"!')
+            return []
+        
+        return pool.sample(amount)
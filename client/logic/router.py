@@ -0,0 +1,183 @@
+# This file is part of Decision Descent.
+#
+# Decision Descent is free software:
+# you can redistribute it
+# and/or modify it under the
+# terms of the GNU General
+# Public License as published by
+# the Free Software Foundation,
+# either version 3 of the License,
+# or (at your option) any later
+# version.
+#
+# Decision Descent is distributed in
+# the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without
+# even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A
+# PARTICULAR PURPOSE.  See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the
+# GNU General Public License along with
+# Decision Descent.  If not,
+# see <https://www.gnu.org/licenses/>.
+import functools
+import logging
+import typing
+
+from . import errors
+
+__all__ = ['Middleware', 'Router']
+
+# Middleware is called with the intent's path, the next callable in the
+# chain, and the intent's arguments.  It's responsible for calling the next
+# callable, and returning its result.
+Middleware = typing.Callable[..., typing.Any]
+
+
+class _Table(dict):
+    """A flat dispatch table.
+    
+    Paths without an exact route are resolved against the router's wildcard
+    routes once, then cached."""
+    
+    def __init__(self, router: 'Router'):
+        super(_Table, self).__init__()
+        
+        self._router = router
+    
+    def __missing__(self, path: str) -> typing.Callable:
+        handler = self._router.compile_wildcard(path)
+        
+        if handler is None:
+            raise KeyError(path)
+        
+        self[path] = handler
+        return handler
+
+
+class Router:
+    """Routes dotted intent paths to their handlers.
+    
+    Paths may contain "*" segments, which match any single segment, and may
+    end with a "**" segment, which matches any number of trailing segments.
+    Exact routes take precedence over wildcard routes, and wildcard routes
+    with more literal segments take precedence over ones with fewer.
+    
+    Routes are compiled, along with the middleware chain, into a flat table
+    whenever they're registered, so dispatching is a single lookup."""
+    LOGGER = logging.getLogger("extensions.DescentIsaac.router")
+    
+    def __init__(self):
+        # Private attributes
+        self._routes: typing.Dict[str, typing.Callable] = {}
+        self._local: typing.Dict[str, typing.List[Middleware]] = {}
+        self._wildcards: typing.List[typing.Tuple[typing.Tuple[str, ...], str]] = []
+        self._middleware: typing.List[Middleware] = []
+        self._table: _Table = _Table(self)
+    
+    # Properties
+    @property
+    def table(self) -> typing.Dict[str, typing.Callable]:
+        """The compiled dispatch table."""
+        return self._table
+    
+    # Registration methods
+    def add(self, path: str, func: typing.Callable, middleware: typing.Iterable[Middleware] = ()):
+        """Registers a route.
+        
+        :param path: A dot separated series of segments, optionally
+                     containing wildcards.
+        :param func: The callable to invoke when the route is dispatched.
+        :param middleware: Middleware that only applies to this route.  It's
+                           run after the router's global middleware."""
+        path = path.lower()
+        
+        if path in self._routes:
+            raise errors.IntentExistsError(path)
+        
+        self._routes[path] = func
+        self._local[path] = list(middleware)
+        self.compile()
+    
+    def remove(self, path: str):
+        """Unregisters a route."""
+        path = path.lower()
+        
+        if path not in self._routes:
+            raise errors.IntentNotFoundError(path)
+        
+        del self._routes[path]
+        del self._local[path]
+        self.compile()
+    
+    def use(self, middleware: Middleware):
+        """Appends middleware to the chain every route runs through."""
+        self._middleware.append(middleware)
+        self.compile()
+    
+    def resolve(self, path: str) -> typing.Callable:
+        """Returns the compiled handler for a path."""
+        try:
+            return self._table[path.lower()]
+        
+        except KeyError as e:
+            raise errors.IntentNotFoundError(path) from e
+    
+    def get_routes(self) -> typing.List[str]:
+        """Returns every registered route."""
+        return list(self._routes)
+    
+    def __contains__(self, path: str) -> bool:
+        return path.lower() in self._routes
+    
+    # Compilation methods
+    def compile(self):
+        """Rebuilds the dispatch table from the registered routes."""
+        self._table.clear()
+        self._wildcards.clear()
+        
+        for path in self._routes:
+            segments = tuple(path.split('.'))
+            
+            if '*' in segments or segments[-1] == '**':
+                self._wildcards.append((segments, path))
+            
+            else:
+                self._table[path] = self._chain(path)
+        
+        # The most specific wildcards are checked first.
+        self._wildcards.sort(key=lambda w: (-sum(s not in ('*', '**') for s in w[0]), '**' in w[0]))
+    
+    def compile_wildcard(self, path: str) -> typing.Optional[typing.Callable]:
+        """Compiles the handler for a path only matched by wildcard routes."""
+        segments = path.split('.')
+        
+        for pattern, route in self._wildcards:
+            if self._matches(pattern, segments):
+                return self._chain(route, path)
+        
+        return None
+    
+    @staticmethod
+    def _matches(pattern: typing.Tuple[str, ...], segments: typing.List[str]) -> bool:
+        if pattern[-1] == '**':
+            pattern = pattern[:-1]
+            
+            if len(segments) < len(pattern):
+                return False
+        
+        elif len(segments) != len(pattern):
+            return False
+        
+        return all(p == '*' or p == s for p, s in zip(pattern, segments))
+    
+    def _chain(self, route: str, path: str = None) -> typing.Callable:
+        """Wraps a route's callable in its middleware chain."""
+        handler = self._routes[route]
+        
+        for middleware in reversed(self._middleware + self._local[route]):
+            handler = functools.partial(middleware, path or route, handler)
+        
+        return handler
@@ -0,0 +1,459 @@
+# This file is part of Decision Descent.
+#
+# Decision Descent is free software:
+# you can redistribute it
+# and/or modify it under the
+# terms of the GNU General
+# Public License as published by
+# the Free Software Foundation,
+# either version 3 of the License,
+# or (at your option) any later
+# version.
+#
+# Decision Descent is distributed in
+# the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without
+# even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A
+# PARTICULAR PURPOSE.  See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the
+# GNU General Public License along with
+# Decision Descent.  If not,
+# see <https://www.gnu.org/licenses/>.
+import typing
+
+from .errors import MalformedMessageError
+
+__all__ = ['ListOf', 'MapOf', 'Nullable', 'Schema', 'compile_spec', 'exact_types']
+
+# A coercer takes a value and a description of where it came from, and
+# returns the value converted to the expected type.  It raises a
+# MalformedMessageError if the value can't be converted.
+#
+# Descriptions of where nested values came from aren't formatted unless a
+# value is rejected; the failing container is coerced a second time with
+# precise descriptions instead.
+Coercer = typing.Callable[[typing.Any, str], typing.Any]
+
+
+class ListOf:
+    """A spec for a list whose items all match a spec."""
+    
+    def __init__(self, spec: typing.Any):
+        self.spec = spec
+
+
+class MapOf:
+    """A spec for an object whose values all match a spec."""
+    
+    def __init__(self, spec: typing.Any):
+        self.spec = spec
+
+
+class Nullable:
+    """A spec for a value that may also be null."""
+    
+    def __init__(self, spec: typing.Any):
+        self.spec = spec
+
+
+def _describe(spec: typing.Any) -> str:
+    if isinstance(spec, tuple):
+        return ' or '.join(_describe(s) for s in spec)
+    
+    if isinstance(spec, ListOf):
+        return f'list of {_describe(spec.spec)}'
+    
+    if isinstance(spec, MapOf):
+        return f'object of {_describe(spec.spec)}'
+    
+    if isinstance(spec, Nullable):
+        return f'{_describe(spec.spec)} or null'
+    
+    return getattr(spec, '__name__', repr(spec))
+
+
+def _reject(spec: typing.Any, value: typing.Any, where: str) -> typing.NoReturn:
+    raise MalformedMessageError(f'{where}: expected {_describe(spec)}, got {type(value).__name__} {value!r:.40}')
+
+
+def _str(value: typing.Any, where: str) -> str:
+    if type(value) is str:
+        return value
+    
+    # Ids are usually strings, but Lua happily sends them as numbers.
+    if type(value) is int:
+        return str(value)
+    
+    if type(value) is float:
+        return str(int(value)) if value.is_integer() else str(value)
+    
+    _reject(str, value, where)
+
+
+def _int(value: typing.Any, where: str) -> int:
+    if type(value) is int:
+        return value
+    
+    if type(value) is float and value.is_integer():
+        return int(value)
+    
+    if type(value) is str:
+        try:
+            return int(value)
+        
+        except ValueError:
+            pass
+    
+    _reject(int, value, where)
+
+
+def _float(value: typing.Any, where: str) -> float:
+    # Integers are accepted as-is, since they behave like floats anyway.
+    if type(value) is float or type(value) is int:
+        return value
+    
+    if type(value) is str:
+        try:
+            return float(value)
+        
+        except ValueError:
+            pass
+    
+    _reject(float, value, where)
+
+
+def _bool(value: typing.Any, where: str) -> bool:
+    if type(value) is bool:
+        return value
+    
+    _reject(bool, value, where)
+
+
+def _list(value: typing.Any, where: str) -> list:
+    if type(value) is list:
+        return value
+    
+    # Lua can't tell empty arrays and empty objects apart.
+    if type(value) is dict and not value:
+        return []
+    
+    _reject(list, value, where)
+
+
+def _dict(value: typing.Any, where: str) -> dict:
+    if type(value) is dict:
+        return value
+    
+    if type(value) is list and not value:
+        return {}
+    
+    _reject(dict, value, where)
+
+
+def _any(value: typing.Any, _: str) -> typing.Any:
+    return value
+
+
+_PRIMITIVES: typing.Dict[typing.Any, Coercer] = {
+    str: _str,
+    int: _int,
+    float: _float,
+    bool: _bool,
+    list: _list,
+    dict: _dict,
+    object: _any
+}
+
+# The types each primitive accepts without any conversion.  Values of these
+# types skip their coercer entirely.
+_EXACT: typing.Dict[typing.Any, typing.Tuple[type, ...]] = {
+    str: (str,),
+    int: (int,),
+    float: (float, int),
+    bool: (bool,),
+    list: (list,),
+    dict: (dict,)
+}
+
+
+def exact_types(spec: typing.Any) -> typing.Optional[typing.Tuple[type, ...]]:
+    """Returns the types a spec accepts without any conversion.
+    
+    * None is returned for specs that accept anything as-is."""
+    if spec is object:
+        return None
+    
+    if isinstance(spec, tuple):
+        types = ()
+        
+        for s in spec:
+            t = exact_types(s)
+            
+            if t is None:
+                return None
+            
+            types += tuple(i for i in t if i not in types)
+        
+        return types
+    
+    if isinstance(spec, Nullable):
+        t = exact_types(spec.spec)
+        return None if t is None else t + (type(None),)
+    
+    return _EXACT.get(spec, ())
+
+
+def compile_spec(spec: typing.Any) -> Coercer:
+    """Compiles a spec into a coercer.
+    
+    Specs may be one of the JSON types (`str`, `int`, `float`, `bool`, `list`,
+    `dict`), `object` for anything, a tuple of specs for values that may match
+    any of them, or a `ListOf`, `MapOf`, or `Nullable` wrapping another spec."""
+    if spec in _PRIMITIVES:
+        return _PRIMITIVES[spec]
+    
+    if isinstance(spec, Nullable):
+        inner = compile_spec(spec.spec)
+        
+        def nullable(value: typing.Any, where: str) -> typing.Any:
+            return None if value is None else inner(value, where)
+        
+        return nullable
+    
+    if isinstance(spec, (ListOf, MapOf)):
+        item = compile_spec(spec.spec)
+        exact = exact_types(spec.spec)
+        
+        if isinstance(spec, ListOf):
+            def container(value: typing.Any, where: str) -> list:
+                value = _list(value, where)
+                
+                # Containers whose items already have the right types are
+                # passed through without being copied.
+                if exact is None:
+                    return value
+                
+                for v in value:
+                    if type(v) not in exact:
+                        break
+                
+                else:
+                    return value
+                
+                try:
+                    return [item(v, where) for v in value]
+                
+                except MalformedMessageError:
+                    for i, v in enumerate(value):
+                        item(v, f'{where}[{i}]')
+                    
+                    raise
+        
+        else:
+            def container(value: typing.Any, where: str) -> dict:
+                value = _dict(value, where)
+                
+                if exact is None:
+                    return value
+                
+                for v in value.values():
+                    if type(v) not in exact:
+                        break
+                
+                else:
+                    return value
+                
+                try:
+                    return {k: item(v, where) for k, v in value.items()}
+                
+                except MalformedMessageError:
+                    for k, v in value.items():
+                        item(v, f'{where}.{k}')
+                    
+                    raise
+        
+        return container
+    
+    if isinstance(spec, tuple):
+        options = [compile_spec(s) for s in spec]
+        exact = exact_types(spec)
+        
+        def union(value: typing.Any, where: str) -> typing.Any:
+            # Values that already have one of the expected types are passed
+            # through before any conversions are attempted.
+            if exact is None or type(value) in exact:
+                return value
+            
+            for option in options:
+                try:
+                    return option(value, where)
+                
+                except MalformedMessageError:
+                    pass
+            
+            _reject(spec, value, where)
+        
+        return union
+    
+    raise TypeError(f'{spec!r} is not a valid spec')
+
+
+def _check(name: str, exact: typing.Optional[typing.Tuple[type, ...]], index: int) -> typing.Optional[str]:
+    """Returns the source of a condition that's true when a value needs to
+    go through its coercer, or None if it never does."""
+    if exact is None:
+        return None
+    
+    if not exact:
+        return 'True'
+    
+    return ' and '.join(f'type({name}) is not _t{index}_{i}' for i in range(len(exact)))
+
+
+class Schema:
+    """The arguments an intent accepts.
+    
+    Schemas are compiled when they're created, and validate messages as
+    they're decoded, so handlers only ever see well-formed arguments.
+    
+    :param args: The specs of the intent's positional arguments, excluding
+                 the reply every intent is given.
+    :param required: The number of positional arguments that must be
+                     present.  Defaults to every argument in `args`.
+    :param varargs: The spec of any positional arguments past `args`.  If
+                    omitted, extra positional arguments are rejected.
+    :param kwargs: The specs of the intent's keyword arguments, which are
+                   always optional.
+    :param extra: The spec of any keyword arguments not in `kwargs`.  If
+                  omitted, unknown keyword arguments are rejected."""
+    
+    def __init__(self, *args: typing.Any, required: int = None, varargs: typing.Any = None,
+                 kwargs: typing.Dict[str, typing.Any] = None, extra: typing.Any = None):
+        # Public attributes
+        self.required: int = len(args) if required is None else required
+        
+        # Private attributes
+        self._specs: typing.Tuple[typing.Any, ...] = args
+        self._varargs: typing.Any = varargs
+        self._kwargs: typing.Dict[str, Coercer] = {k: compile_spec(s) for k, s in (kwargs or {}).items()}
+        self._extra: typing.Optional[Coercer] = None if extra is None else compile_spec(extra)
+        self._validate: typing.Callable = self._generate()
+    
+    def __call__(self, intent: str, args: typing.Sequence[typing.Any],
+                 kwargs: typing.Dict[str, typing.Any]) -> typing.Tuple[tuple, dict]:
+        """Validates and coerces a message's arguments.
+        
+        :returns: The coerced positional and keyword arguments."""
+        try:
+            return self._validate(args, kwargs)
+        
+        except MalformedMessageError as e:
+            raise MalformedMessageError(f'{intent}: {e!s}') from None
+    
+    # Compilation methods
+    def _generate(self) -> typing.Callable:
+        """Generates a validator specialized to this schema.
+        
+        Arguments whose values already have the expected type are checked
+        with inline type comparisons, and only go through their coercer if
+        they need converting."""
+        specs, required = self._specs, self.required
+        namespace = {'_arity': self._arity, '_keywords': self._keywords}
+        lines = ['def validate(args, kwargs):', '    count = len(args)']
+        
+        bounds = [f'count < {required}'] if required else []
+        
+        if self._varargs is None:
+            bounds.append(f'count > {len(specs)}')
+        
+        if bounds:
+            lines.append(f'    if {" or ".join(bounds)}: _arity(count)')
+        
+        for index, spec in enumerate(specs):
+            exact = exact_types(spec)
+            indent = '    ' if index < required else '        '
+            check = _check(f'a{index}', exact, index)
+            
+            namespace[f'_c{index}'] = compile_spec(spec)
+            namespace.update({f'_t{index}_{i}': t for i, t in enumerate(exact or ())})
+            
+            if index >= required:
+                lines.append(f'    a{index} = None')
+                lines.append(f'    if count > {index}:')
+            
+            lines.append(f'{indent}a{index} = args[{index}]')
+            
+            if check is not None:
+                lines.append(f'{indent}if {check}: a{index} = _c{index}(a{index}, "args[{index}]")')
+        
+        values = ''.join(f'a{i}, ' for i in range(required))
+        lines.append(f'    out = ({values})')
+        
+        # Missing optional arguments are left out, so handlers fall back to
+        # their own defaults.
+        for index in range(required, len(specs)):
+            lines.append(f'    if count > {index}: out += (a{index},)')
+        
+        if self._varargs is not None:
+            namespace['_varargs'] = self._compile_varargs(len(specs))
+            lines.append(f'    if count > {len(specs)}: out += _varargs(args)')
+        
+        lines.append('    return out, (_keywords(kwargs) if kwargs else kwargs)')
+        
+        exec(compile('\n'.join(lines), f'<schema {specs!r}>', 'exec'), namespace)
+        return namespace['validate']
+    
+    def _compile_varargs(self, offset: int) -> typing.Callable[[typing.Sequence[typing.Any]], tuple]:
+        item = compile_spec(self._varargs)
+        exact = exact_types(self._varargs)
+        
+        def varargs(args: typing.Sequence[typing.Any]) -> tuple:
+            values = tuple(args[offset:])
+            
+            if exact is None:
+                return values
+            
+            for v in values:
+                if type(v) not in exact:
+                    break
+            
+            else:
+                return values
+            
+            try:
+                return tuple(item(v, 'args') for v in values)
+            
+            except MalformedMessageError:
+                for i, v in enumerate(values, offset):
+                    item(v, f'args[{i}]')
+                
+                raise
+        
+        return varargs
+    
+    def _arity(self, count: int) -> typing.NoReturn:
+        if count < self.required:
+            raise MalformedMessageError(f'expected at least {self.required} arguments, got {count}')
+        
+        raise MalformedMessageError(f'expected at most {len(self._specs)} arguments, got {count}')
+    
+    def _keywords(self, kwargs: typing.Dict[str, typing.Any]) -> typing.Dict[str, typing.Any]:
+        coerced = {}
+        
+        for key, value in kwargs.items():
+            coercer = self._kwargs.get(key, self._extra)
+            
+            if coercer is None:
+                raise MalformedMessageError(f'unexpected keyword argument "{key}"')
+            
+            try:
+                coerced[key] = coercer(value, 'kwargs')
+            
+            except MalformedMessageError:
+                coercer(value, f'kwargs.{key}')
+                raise
+        
+        return coerced
@@ -0,0 +1,216 @@
+# This file is part of Decision Descent.
+#
+# Decision Descent is free software:
+# you can redistribute it
+# and/or modify it under the
+# terms of the GNU General
+# Public License as published by
+# the Free Software Foundation,
+# either version 3 of the License,
+# or (at your option) any later
+# version.
+#
+# Decision Descent is distributed in
+# the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without
+# even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A
+# PARTICULAR PURPOSE.  See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the
+# GNU General Public License along with
+# Decision Descent.  If not,
+# see <https://www.gnu.org/licenses/>.
+import collections
+import dataclasses
+import json
+import logging
+import typing
+import uuid
+
+from . import errors
+from .outbound import OutboundQueue, Priority
+from .. import dataclasses as descent_dataclasses
+
+if typing.TYPE_CHECKING:
+    from .schema import Schema
+
+__all__ = ['Handshake', 'Session']
+
+
+@dataclasses.dataclass(frozen=True)
+class Handshake:
+    """A client's completed session handshake."""
+    resumed: bool  # Whether the client resumed the session it belonged to
+    data: typing.Tuple[bytes, ...]  # What the client should be sent before anything else, in order
+
+
+class Session:
+    """The client's half of the mod's wire protocol, independent of any
+    socket.
+    
+    Every message sent is numbered and kept in a bounded replay buffer until
+    the mod acknowledges it.  When the mod reconnects, it presents the session
+    it belonged to and the last sequence number it received; if the session
+    is still known, only the messages it missed are resent.
+    
+    Transports feed the session every line they read, and write whatever it
+    hands back."""
+    LOGGER: logging.Logger = logging.getLogger("extensions.DescentIsaac.session")
+    
+    def __init__(self, replay: int = 256):
+        # Public attributes
+        self.schemas: typing.Dict[str, 'Schema'] = {}  # Argument schemas messages are validated against
+        self.established: bool = False  # Whether the current client completed its handshake
+        
+        # Private attributes
+        self._id: str = uuid.uuid4().hex
+        self._sent: int = 0  # The last sequence number sent
+        self._received: int = 0  # The last sequence number received
+        self._replay: typing.Deque[typing.Tuple[int, bytes]] = collections.deque(maxlen=replay)
+        self._outbound: OutboundQueue = OutboundQueue()
+    
+    # Properties
+    @property
+    def sent(self) -> int:
+        """The last sequence number sent."""
+        return self._sent
+    
+    def has_pending(self) -> bool:
+        """Whether or not there are messages the established client hasn't
+        been sent yet."""
+        return self.established and bool(self._outbound)
+    
+    # Outbound methods
+    def push(self, message: descent_dataclasses.Message, priority: Priority = Priority.REPLY,
+             key: str = None, merge: typing.Callable = None):
+        """Queues a message for the client.
+        
+        :param message: The message to send.
+        :param priority: The message's priority class.
+        :param key: Identifies queued messages this message supersedes.
+        :param merge: Combines a superseded message with this one."""
+        self._outbound.push(message, priority, key, merge)
+    
+    def next(self) -> bytes:
+        """Numbers the most urgent queued message, and encodes it for the
+        wire.
+        
+        * The message is kept for replay from here on, so it's delivered if
+        the client resumes, even if writing it fails."""
+        message = self._outbound.pop()
+        self._sent += 1
+        
+        payload = message.to_dict()
+        payload['seq'] = self._sent
+        payload['ack'] = self._received
+        
+        data = f'{json.dumps(payload)}\r\n'.encode()
+        self._replay.append((self._sent, data))
+        
+        return data
+    
+    # Session methods
+    def detach(self):
+        """Forgets the current client's handshake.
+        
+        * This should be called whenever a new client connects.  The session
+        itself is kept, so the client can resume it."""
+        self.established = False
+    
+    def acknowledge(self, seq: int):
+        """Drops every buffered message the client has acknowledged."""
+        while self._replay and self._replay[0][0] <= seq:
+            self._replay.popleft()
+    
+    def resume(self, session: typing.Optional[str], last: int) -> Handshake:
+        """Completes a client's handshake.
+        
+        :param session: The session the client belonged to, if any.
+        :param last: The last sequence number the client received."""
+        oldest = self._replay[0][0] if self._replay else self._sent + 1
+        resumed = bool(session) and session == self._id and last + 1 >= oldest
+        
+        if not resumed:
+            self.LOGGER.info('Starting a new session...')
+            self._id = uuid.uuid4().hex
+            self._sent = self._received = 0
+            self._replay.clear()
+        
+        self.established = True
+        established = {"intent": "session.established", "args": [self._id, self._received, resumed]}
+        data = [f'{json.dumps(established)}\r\n'.encode()]
+        
+        if resumed:
+            self.acknowledge(last)
+            self.LOGGER.info(f'Session resumed!  Replaying {len(self._replay)} missed messages...')
+            
+            data.extend(d for _, d in self._replay)
+        
+        return Handshake(resumed, tuple(data))
+    
+    # Inbound methods
+    @staticmethod
+    def _is_sequence(value: typing.Any, optional: bool = False) -> bool:
+        """Whether or not a value is a valid sequence number."""
+        if value is None:
+            return optional
+        
+        return isinstance(value, int) and not isinstance(value, bool)
+    
+    def receive(self, line: bytes) -> typing.Union[descent_dataclasses.Message, Handshake, None]:
+        """Decodes a single line read from the client.
+        
+        :returns: The message the line held, the handshake it completed, or
+                  None if it was invalid or a replay."""
+        d = line.decode(errors='replace')
+        
+        try:
+            data = json.loads(d)
+        
+        except ValueError as e:
+            self.LOGGER.warning(f'Received invalid JSON response from connected client!  {e!s}')
+            self.LOGGER.warning(f'Received "{d}"')
+            return None
+        
+        if not isinstance(data, dict):
+            self.LOGGER.warning(f'Rejected malformed message from connected client!  Expected an object, got "{d}"')
+            return None
+        
+        if data.get('intent') == 'session.resume':
+            args = data.get('args') or [None, 0]
+            
+            try:
+                session, last = args[0], int(args[1])
+            
+            except (TypeError, ValueError, IndexError, KeyError):
+                self.LOGGER.warning(f'Rejected malformed session handshake from connected client!  Received "{d}"')
+                return None
+            
+            return self.resume(session, last)
+        
+        seq = data.pop('seq', None)
+        ack = data.pop('ack', 0) or 0
+        
+        # Booleans are ints too, but never valid sequence numbers.
+        if not self._is_sequence(seq, optional=True) or not self._is_sequence(ack):
+            self.LOGGER.warning(f'Rejected message with invalid sequence numbers from connected client!  '
+                                f'(seq={seq!r}, ack={ack!r})')
+            return None
+        
+        self.acknowledge(ack)
+        
+        if seq is not None:
+            if seq <= self._received:
+                self.LOGGER.debug(f'Ignoring replayed message #{seq}')
+                return None
+            
+            self._received = seq
+        
+        try:
+            return descent_dataclasses.Message.from_json(data, self.schemas)
+        
+        except errors.MalformedMessageError as e:
+            self.LOGGER.warning(f'Rejected malformed message from connected client!  {e!s}')
+            return None
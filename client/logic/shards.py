@@ -0,0 +1,457 @@
+# This file is part of Decision Descent.
+#
+# Decision Descent is free software:
+# you can redistribute it
+# and/or modify it under the
+# terms of the GNU General
+# Public License as published by
+# the Free Software Foundation,
+# either version 3 of the License,
+# or (at your option) any later
+# version.
+#
+# Decision Descent is distributed in
+# the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without
+# even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A
+# PARTICULAR PURPOSE.  See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the
+# GNU General Public License along with
+# Decision Descent.  If not,
+# see <https://www.gnu.org/licenses/>.
+import dataclasses
+import itertools
+import logging
+import multiprocessing
+import time
+import typing
+import zlib
+
+if typing.TYPE_CHECKING:
+    from multiprocessing.connection import Connection
+    from .clock import Clock
+
+__all__ = ['Shard', 'ShardPool', 'shard_of']
+
+# The partial tally of a single poll, as sent back by a shard:
+#   (votes by choice id, participants)
+Partial = typing.Tuple[typing.Dict[str, int], int]
+Answered = typing.Callable[[typing.Dict[int, Partial]], typing.Any]
+
+
+def shard_of(name: str, shards: int) -> int:
+    """Returns the shard a participant's votes are tallied by.
+    
+    * The hash is stable across processes, unlike `hash`."""
+    return zlib.crc32(name.encode()) % shards
+
+
+@dataclasses.dataclass()
+class _Tally:
+    """A single poll, as seen by a shard."""
+    lookup: typing.Dict[str, str]  # Every token the poll can be voted with, mapped to its choice's id
+    active: bool = False
+    counts: typing.Dict[str, int] = dataclasses.field(default_factory=dict)
+    participants: typing.Dict[str, str] = dataclasses.field(default_factory=dict)
+
+
+class Shard:
+    """The partial tallies of the participants hashed to a single shard.
+    
+    Votes are counted exactly as a poll counts them; since every participant
+    is only ever hashed to one shard, summing every shard's partial tallies
+    gives the same result as tallying every vote in one place."""
+    
+    def __init__(self):
+        # Private attributes
+        self._polls: typing.Dict[int, _Tally] = {}  # In the order the arbiter lists its live polls
+    
+    def sync(self, polls: typing.List[typing.Tuple[int, typing.Dict[str, str], bool]]):
+        """Replaces the shard's polls, keeping the partial tallies of polls
+        that are still live.
+        
+        :param polls: The uid, lookup table, and active flag of every live
+                      poll, in order."""
+        synced = {}
+        
+        for uid, lookup, active in polls:
+            tally = self._polls.get(uid)
+            
+            if tally is None:
+                tally = _Tally(lookup)
+            
+            # Removed choices lose their votes, like they do in the poll.
+            tally.lookup, tally.active = lookup, active
+            tally.counts = {c: tally.counts.get(c, 0) for c in lookup.values()}
+            synced[uid] = tally
+        
+        self._polls = synced
+    
+    def activate(self, uid: int, active: bool):
+        """Updates whether or not a poll is accepting votes."""
+        tally = self._polls.get(uid)
+        
+        if tally is not None:
+            tally.active = active
+    
+    def add_votes(self, votes: typing.List[typing.Tuple[str, str]]):
+        """Counts a batch of votes, in order.
+        
+        * Like the arbiter, a vote goes to the first active poll it's a
+        choice in, and replaces the participant's previous vote."""
+        polls = list(self._polls.values())
+        
+        for name, token in votes:
+            for tally in polls:
+                choice = tally.lookup.get(token) if tally.active else None
+                
+                if choice is None:
+                    continue
+                
+                previous = tally.participants.get(name)
+                
+                if previous is not None and previous in tally.counts:
+                    tally.counts[previous] -= 1
+                
+                tally.participants[name] = choice
+                tally.counts[choice] = tally.counts.get(choice, 0) + 1
+                break
+    
+    def collect(self) -> typing.Dict[int, Partial]:
+        """Returns the shard's partial tally of every poll."""
+        return {uid: (dict(t.counts), len(t.participants)) for uid, t in self._polls.items()}
+
+
+def _serve(connection: 'Connection', interval: float):
+    """Runs a single shard in a worker process, until its pool stops it.
+    
+    * Whenever the shard's tallies change, they're pushed to the pool at most
+    once every `interval` seconds, so the pool never has to ask for them."""
+    shard = Shard()
+    handlers = {'sync': shard.sync, 'activate': shard.activate, 'votes': shard.add_votes}
+    changed, pushed = False, -float('inf')
+    
+    while True:
+        try:
+            if changed and time.monotonic() >= pushed + interval:
+                connection.send((None, shard.collect()))
+                changed, pushed = False, time.monotonic()
+            
+            # Unpushed changes are pushed once the interval is up, even if
+            # the pool has nothing more to send.
+            if not connection.poll(pushed + interval - time.monotonic() if changed else None):
+                continue
+            
+            command, *args = connection.recv()
+        
+        except (EOFError, OSError):
+            return  # The pool went away without stopping the shard
+        
+        if command == 'stop':
+            return
+        
+        if command == 'collect':
+            connection.send((args[0], shard.collect()))
+            changed, pushed = False, time.monotonic()
+        
+        else:
+            handlers[command](*args)
+            changed = True
+
+
+def _merge(partials: typing.Iterable[typing.Dict[int, Partial]]) -> typing.Dict[int, Partial]:
+    """Sums the partial tallies of several shards."""
+    merged: typing.Dict[int, Partial] = {}
+    
+    for shard in partials:
+        for uid, (counts, participants) in shard.items():
+            total, voters = merged.get(uid, ({}, 0))
+            
+            for choice, count in counts.items():
+                total[choice] = total.get(choice, 0) + count
+            
+            merged[uid] = (total, voters + participants)
+    
+    return merged
+
+
+class ShardPool:
+    """Tallies chat votes across worker processes.
+    
+    Votes are partitioned by participant, and sent to their shard in
+    batches.  Every command shares its shard's pipe with the votes sent
+    before it, so shards always see polls change at the same point in the
+    chat as the arbiter did.
+    
+    Shards push their partial tallies as they change, and the pool picks
+    them up without waiting, every `interval` seconds.  Exact tallies are
+    requested the same way; the pool never waits on a shard.
+    
+    * Shards whose workers die are dropped, along with the votes of the
+    participants hashed to them."""
+    LOGGER = logging.getLogger("extensions.DescentIsaac.shards")
+    
+    def __init__(self, clock: 'Clock', received: typing.Callable[[], typing.Any] = None, batch: int = 256,
+                 latency: float = 0.01, interval: float = 0.1, timeout: float = 5.0):
+        # Public attributes
+        self.timeout: float = timeout  # Seconds to wait for shards to answer a request
+        
+        # Private attributes
+        self._clock: 'Clock' = clock
+        self._received: typing.Optional[typing.Callable[[], typing.Any]] = received
+        self._batch: int = batch
+        self._latency: float = latency
+        self._interval: float = interval
+        self._workers: typing.List[typing.Tuple[multiprocessing.Process, 'Connection']] = []
+        self._partials: typing.List[typing.Dict[int, Partial]] = []  # The latest tallies pushed, by shard
+        self._lost: typing.Set[int] = set()  # Shards whose workers went away
+        self._pending: typing.List[typing.List[typing.Tuple[str, str]]] = []
+        self._buffered: int = 0
+        self._handle: typing.Optional[int] = None
+        self._receiver: typing.Optional[int] = None
+        self._requests: typing.Iterator[int] = itertools.count()
+        self._awaiting: typing.Dict[int, typing.List] = {}  # The shards left to answer, callback, and timeout
+    
+    # Properties
+    def is_running(self) -> bool:
+        """Whether or not the pool's workers are running."""
+        return bool(self._workers)
+    
+    def __len__(self) -> int:
+        return len(self._workers)
+    
+    # Control methods
+    def start(self, shards: int):
+        """Starts the pool's workers, replacing any that were running."""
+        self.stop()
+        
+        # Workers are spawned rather than forked, since forking a process
+        # that's running Qt's threads isn't safe.
+        context = multiprocessing.get_context('spawn')
+        
+        for index in range(shards):
+            ours, theirs = context.Pipe()
+            process = context.Process(target=_serve, args=(theirs, self._interval), name=f'descent-shard-{index}',
+                                      daemon=True)
+            
+            process.start()
+            theirs.close()
+            
+            self._workers.append((process, ours))
+        
+        self._pending = [[] for _ in self._workers]
+        self._partials = [{} for _ in self._workers]
+        self._receiver = self._clock.call_later(self._interval, self.receive)
+        self.LOGGER.info(f'Started {shards} vote shards')
+    
+    def stop(self):
+        """Stops the pool's workers, discarding their tallies.
+        
+        * Requests that are still waiting are answered with the latest
+        pushed tallies first."""
+        for request in list(self._awaiting):
+            self._answer(request)
+        
+        if self._handle is not None:
+            self._clock.cancel(self._handle)
+            self._handle = None
+        
+        if self._receiver is not None:
+            self._clock.cancel(self._receiver)
+            self._receiver = None
+        
+        for _, connection in self._workers:
+            try:
+                connection.send(('stop',))
+            
+            except OSError:
+                pass
+        
+        for process, connection in self._workers:
+            process.join(self.timeout)
+            connection.close()
+            
+            if process.is_alive():
+                process.terminate()
+        
+        self._workers.clear()
+        self._partials.clear()
+        self._lost.clear()
+        self._pending.clear()
+        self._buffered = 0
+    
+    # Vote methods
+    def submit(self, name: str, token: str):
+        """Queues a vote for the participant's shard.
+        
+        * Votes are sent once a batch fills up, or shortly after the first
+        vote in it was queued."""
+        # This runs for every vote, so `shard_of` is inlined.
+        self._pending[zlib.crc32(name.encode()) % len(self._pending)].append((name, token))
+        self._buffered += 1
+        
+        if self._buffered >= self._batch:
+            self.flush()
+        
+        elif self._handle is None:
+            self._handle = self._clock.call_later(self._latency, self.flush)
+    
+    def flush(self):
+        """Sends every queued vote to its shard.
+        
+        * This blocks if a shard has fallen far enough behind to fill its
+        pipe, rather than queueing votes without bound.  Pushed tallies are
+        picked up first, so a shard is never left waiting to push while the
+        pool waits on it."""
+        if self._handle is not None:
+            self._clock.cancel(self._handle)
+            self._handle = None
+        
+        if not self._buffered:
+            return
+        
+        self._drain()
+        pending, self._pending = self._pending, [[] for _ in self._workers]
+        self._buffered = 0
+        
+        for index, votes in enumerate(pending):
+            if votes:
+                self._send(index, 'votes', votes)
+    
+    def _send(self, index: int, *command: typing.Any):
+        """Sends a command to a shard, dropping the shard if its worker
+        went away."""
+        if index in self._lost:
+            return
+        
+        try:
+            self._workers[index][1].send(command)
+        
+        except OSError:
+            self._lose(index)
+    
+    def _broadcast(self, *command: typing.Any):
+        """Sends a command to every shard, after the votes queued before it."""
+        self.flush()
+        
+        for index in range(len(self._workers)):
+            self._send(index, *command)
+    
+    def _lose(self, index: int):
+        """Drops a shard whose worker went away."""
+        self._lost.add(index)
+        self.LOGGER.error(f'Shard #{index} went away; its latest pushed votes are all that will be counted!')
+        
+        for waiting, _, _ in self._awaiting.values():
+            waiting.discard(index)
+    
+    def sync(self, polls: typing.List[typing.Tuple[int, typing.Dict[str, str], bool]]):
+        """Replaces the polls every shard tallies votes for.
+        
+        :param polls: The uid, lookup table, and active flag of every live
+                      poll, in the order votes should be matched against
+                      them."""
+        self._broadcast('sync', polls)
+    
+    def activate(self, uid: int, active: bool):
+        """Updates whether or not a poll is accepting votes."""
+        self._broadcast('activate', uid, active)
+    
+    # Tally methods
+    def get_partials(self) -> typing.Dict[int, Partial]:
+        """Sums the latest partial tallies every shard pushed.
+        
+        * This doesn't wait on the shards, so votes they haven't pushed yet
+        are left out."""
+        return _merge(self._partials)
+    
+    def receive(self) -> bool:
+        """Picks up the partial tallies the shards pushed since the last call,
+        without waiting on them.
+        
+        * The pool's `received` callback is invoked if any were.
+        
+        :returns: Whether or not any tallies were pushed."""
+        if self._receiver is not None:
+            self._clock.cancel(self._receiver)
+        
+        # Answers are waited on no longer than votes are.
+        self._receiver = self._clock.call_later(self._latency if self._awaiting else self._interval, self.receive)
+        
+        drained = self._drain()
+        
+        if drained and self._received is not None:
+            self._received()
+        
+        # Requests may also have been answered by their last shards going away.
+        for request in [r for r, (waiting, _, _) in self._awaiting.items() if not waiting]:
+            self._answer(request)
+        
+        return drained
+    
+    def _drain(self) -> bool:
+        """Stores every partial tally that's waiting in the shards' pipes.
+        
+        :returns: Whether or not any were waiting."""
+        drained = False
+        
+        for index, (_, connection) in enumerate(self._workers):
+            if index in self._lost:
+                continue
+            
+            try:
+                while connection.poll(0):
+                    reply, self._partials[index] = connection.recv()
+                    drained = True
+                    
+                    if reply in self._awaiting:
+                        self._awaiting[reply][0].discard(index)
+            
+            except (EOFError, OSError):
+                self._lose(index)
+                drained = True
+        
+        return drained
+    
+    def request(self, answered: Answered) -> int:
+        """Asks every shard for its partial tallies, once it's counted every
+        vote sent to it.
+        
+        * This doesn't wait on the shards.  Answers are picked up like pushed
+        tallies are, and `answered` is invoked with the sum once every shard
+        has answered.  Shards that don't answer within `timeout` seconds are
+        logged, and their latest pushed tallies are used instead.
+        
+        :returns: The request's id."""
+        request = next(self._requests)
+        self._broadcast('collect', request)
+        
+        waiting = {i for i in range(len(self._workers)) if i not in self._lost}
+        handle = self._clock.call_later(self.timeout, lambda: self._answer(request))
+        self._awaiting[request] = [waiting, answered, handle]
+        
+        # The answers are picked up sooner than pushed tallies are.
+        if self._receiver is not None:
+            self._clock.cancel(self._receiver)
+        
+        self._receiver = self._clock.call_later(self._latency, self.receive)
+        return request
+    
+    def _answer(self, request: int):
+        """Invokes a request's callback with the latest tallies, whether or
+        not every shard answered it."""
+        entry = self._awaiting.pop(request, None)
+        
+        if entry is None:
+            return
+        
+        waiting, answered, handle = entry
+        self._clock.cancel(handle)
+        
+        for index in sorted(waiting):
+            self.LOGGER.error(f'Shard #{index} did not answer request #{request}; its latest pushed votes were used!')
+        
+        answered(self.get_partials())
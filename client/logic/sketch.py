@@ -0,0 +1,168 @@
+# This file is part of Decision Descent.
+#
+# Decision Descent is free software:
+# you can redistribute it
+# and/or modify it under the
+# terms of the GNU General
+# Public License as published by
+# the Free Software Foundation,
+# either version 3 of the License,
+# or (at your option) any later
+# version.
+#
+# Decision Descent is distributed in
+# the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without
+# even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A
+# PARTICULAR PURPOSE.  See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the
+# GNU General Public License along with
+# Decision Descent.  If not,
+# see <https://www.gnu.org/licenses/>.
+import dataclasses
+import math
+import typing
+
+from .prefilter import BloomFilter
+
+__all__ = ['ApproximateTally', 'ErrorBounds']
+
+_MASK = (1 << 64) - 1
+_GOLDEN = 0x9E3779B97F4A7C15
+
+
+def _mix(item: str) -> int:
+    """Returns a well mixed 64 bit hash of an item.
+    
+    * String hashes are salted per process, so these are only comparable
+    within a session."""
+    return (hash(item) * _GOLDEN) & _MASK
+
+
+@dataclasses.dataclass(frozen=True)
+class ErrorBounds:
+    """The error an approximate tally may carry."""
+    sample_rate: float  # The share of participants whose votes are counted
+    duplicate_rate: float  # The chance a participant's first vote is mistaken for a repeat
+    participants: float  # The relative standard error of the participant estimate
+    confidence: float  # The probability the current leader is also the leader of the full vote
+
+
+class ApproximateTally:
+    """Tallies votes in fixed memory and fixed time per vote.
+    
+    Participants are sampled by a hash of their name, so a participant is
+    either always counted or never counted, and the counts are scaled back
+    up by the sample rate.  Sampling is the first thing done with a vote, so
+    a vote that isn't sampled only costs its hash.  Sampled participants are
+    deduplicated with a bloom filter, whose members are scaled back up the
+    same way to estimate the number of participants.
+    
+    * Only a participant's first vote is counted; changing votes requires
+    remembering every vote, which is what this avoids.
+    * Votes cast before a poll switched to approximate tallying can be
+    absorbed, and are counted exactly.
+    
+    :param sample_rate: The share of participants whose votes are counted.
+    :param capacity: The number of sampled participants the deduplication
+                     filter is sized for.
+    :param error_rate: The duplicate filter's false positive rate at capacity."""
+    
+    def __init__(self, choices: typing.Iterable[str], sample_rate: float = 1.0, capacity: int = 100000,
+                 error_rate: float = 0.001):
+        # Public attributes
+        self.sample_rate: float = min(1.0, max(sample_rate, 1e-6))
+        
+        # Private attributes
+        self._counts: typing.Dict[str, int] = {c: 0 for c in choices}  # Sampled votes
+        self._base: typing.Dict[str, int] = {c: 0 for c in self._counts}  # Absorbed votes
+        self._seen: BloomFilter = BloomFilter(capacity, error_rate, hashes=3)  # Fewer probes per vote
+        self._threshold: int = int(self.sample_rate * (1 << 32))
+        self._members: int = 0  # Participants added to the duplicate filter
+        self._absorbed: int = 0  # Participants counted exactly
+    
+    # Vote methods
+    def add(self, name: str, choice: str) -> bool:
+        """Records a participant's vote.
+        
+        :returns: Whether or not the vote was counted."""
+        if not self.is_sampled(name) or not self._seen.add(name):
+            return False
+        
+        self._counts[choice] = self._counts.get(choice, 0) + 1
+        self._members += 1
+        
+        return True
+    
+    def absorb(self, votes: typing.Mapping[str, str]):
+        """Counts votes that were tallied exactly, by participant.
+        
+        * Absorbed participants can't vote again."""
+        for name, choice in votes.items():
+            self._seen.add(name)
+            self._members += 1
+            self._absorbed += 1
+            self._base[choice] = self._base.get(choice, 0) + 1
+            self._counts.setdefault(choice, 0)
+    
+    def add_choice(self, choice: str):
+        """Starts counting votes for a new choice."""
+        self._counts.setdefault(choice, 0)
+        self._base.setdefault(choice, 0)
+    
+    def remove_choice(self, choice: str):
+        """Stops counting votes for a choice."""
+        self._counts.pop(choice, None)
+        self._base.pop(choice, None)
+    
+    def is_sampled(self, name: str) -> bool:
+        """Whether or not a participant's votes are counted."""
+        return _mix(name) >> 32 < self._threshold
+    
+    def has_voted(self, name: str) -> bool:
+        """Whether or not a sampled participant has voted.
+        
+        * Unsampled participants are never considered to have voted."""
+        return name in self._seen
+    
+    # Estimate methods
+    def tally(self) -> typing.Dict[str, int]:
+        """Returns the estimated number of votes each choice has."""
+        return {c: self._base.get(c, 0) + round(n / self.sample_rate) for c, n in self._counts.items()}
+    
+    def participants(self) -> int:
+        """Returns the estimated number of distinct participants."""
+        return self._absorbed + round((self._members - self._absorbed) / self.sample_rate)
+    
+    def get_bounds(self) -> ErrorBounds:
+        """Returns the error the current estimates may carry."""
+        p = self.sample_rate
+        ranked = sorted(((self._base.get(c, 0) + n / p, n) for c, n in self._counts.items()), reverse=True)
+        (leader, sampled_leader), (runner_up, sampled_runner_up) = (ranked + [(0.0, 0), (0.0, 0)])[:2]
+        
+        # The margin between the top two estimates, against the spread
+        # sampling alone would give it.
+        spread = math.sqrt((sampled_leader + sampled_runner_up) * (1 - p)) / p
+        
+        if leader == runner_up:
+            confidence = 0.5
+        
+        elif spread == 0:
+            confidence = 1.0
+        
+        else:
+            confidence = 0.5 * (1 + math.erf((leader - runner_up) / spread / math.sqrt(2)))
+        
+        # The number of participants sampled is binomial, so the estimate
+        # scaled up from it scatters with the square root of the sample.
+        sampled = max(1, self._members - self._absorbed)
+        
+        return ErrorBounds(
+            self.sample_rate,
+            self._seen.get_error_rate(self._members),
+            math.sqrt((1 - p) / sampled),
+            confidence
+        )
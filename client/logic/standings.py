@@ -0,0 +1,182 @@
+# This file is part of Decision Descent.
+#
+# Decision Descent is free software:
+# you can redistribute it
+# and/or modify it under the
+# terms of the GNU General
+# Public License as published by
+# the Free Software Foundation,
+# either version 3 of the License,
+# or (at your option) any later
+# version.
+#
+# Decision Descent is distributed in
+# the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without
+# even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A
+# PARTICULAR PURPOSE.  See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the
+# GNU General Public License along with
+# Decision Descent.  If not,
+# see <https://www.gnu.org/licenses/>.
+import dataclasses
+import logging
+import typing
+
+from .clock import Clock
+
+if typing.TYPE_CHECKING:
+    from ..dataclasses import Message
+    from ..widgets import Poll
+
+__all__ = ['StandingsStream', 'merge_standings']
+
+# A single poll's update, flattened so the mod can decode it with one loop:
+#   [uid, seconds remaining, votes cast, choice, count, choice, count, ...]
+# Only choices whose counts changed are included.  An update holding nothing
+# but the uid means the poll is gone.
+Entry = typing.List[typing.Union[int, str]]
+
+
+def merge_standings(old: 'Message', new: 'Message') -> 'Message':
+    """Folds a queued standings message into its replacement, so updates the
+    mod hasn't received yet aren't lost when a newer one supersedes them."""
+    merged: typing.Dict[int, typing.List[Entry]] = {}
+    
+    for entry in list(old.args) + list(new.args):
+        chain = merged.pop(entry[0], [])
+        merged[entry[0]] = chain
+        
+        # Removals replace whatever came before them.
+        if len(entry) == 1:
+            chain[:] = [list(entry)]
+            continue
+        
+        # Updates following a removal are kept alongside it, so the mod
+        # still drops the counts it had before starting over.
+        if not chain or len(chain[-1]) == 1:
+            chain.append(list(entry))
+            continue
+        
+        previous = chain[-1]
+        counts = dict(zip(previous[3::2], previous[4::2]))
+        counts.update(zip(entry[3::2], entry[4::2]))
+        
+        chain[-1] = [*entry[:3], *(i for pair in counts.items() for i in pair)]
+    
+    return dataclasses.replace(new, args=tuple(e for chain in merged.values() for e in chain))
+
+
+class StandingsStream:
+    """Streams the live standings of polls to the mod's HUD.
+    
+    Polls are marked as votes come in, and the standings of every marked poll
+    are sent together at most `rate` times per second.  Only the counts that
+    changed since the previous update are sent; polls the mod hasn't seen yet
+    are sent in full, and polls that are no longer live are removed.
+    
+    * While the stream is disabled, nothing is sent, and the stream keeps
+    what the mod was last sent.  Once it's enabled again, every poll is
+    compared against that."""
+    LOGGER = logging.getLogger("extensions.DescentIsaac.standings")
+    
+    def __init__(self, clock: Clock, live: typing.Callable[[], typing.List['Poll']],
+                 send: typing.Callable[[typing.List[Entry]], typing.Any], rate: float = 4.0,
+                 enabled: typing.Callable[[], bool] = None):
+        # Public attributes
+        self.rate: float = rate
+        
+        # Private attributes
+        self._clock: Clock = clock
+        self._live: typing.Callable[[], typing.List['Poll']] = live
+        self._send: typing.Callable[[typing.List[Entry]], typing.Any] = send
+        self._enabled: typing.Callable[[], bool] = enabled if enabled is not None else lambda: True
+        self._paused: bool = False
+        self._sent: typing.Dict[int, typing.Dict[str, int]] = {}  # The counts the mod was last sent, by poll
+        self._dirty: typing.Set[int] = set()
+        self._handle: typing.Optional[int] = None
+        self._last: float = -float('inf')
+    
+    # Control methods
+    def mark(self, uid: int = None):
+        """Schedules an update.
+        
+        :param uid: The id of a poll whose counts changed.  If omitted, the
+                    update only accounts for polls being created or removed."""
+        if uid is not None:
+            self._dirty.add(uid)
+        
+        if self._handle is None:
+            delay = max(0.0, self._last + 1 / max(self.rate, 0.001) - self._clock.now())
+            self._handle = self._clock.call_later(delay, self.flush)
+    
+    def reset(self):
+        """Forgets what the mod was sent, so every live poll is sent in full
+        with the next update.
+        
+        * This should be called whenever the mod starts a new session."""
+        self._sent.clear()
+        self._dirty.clear()
+        self.mark()
+    
+    def flush(self):
+        """Sends the changes since the previous update."""
+        if self._handle is not None:
+            self._clock.cancel(self._handle)
+        
+        self._handle = None
+        self._last = self._clock.now()
+        
+        if not self._enabled():
+            self._paused = True
+            return
+        
+        # Counts may have changed without being marked while the stream was
+        # disabled.
+        if self._paused:
+            self._dirty.update(self._sent)
+            self._paused = False
+        
+        entries = []
+        live = {p.uid: p for p in self._live()}
+        
+        for uid in [u for u in self._sent if u not in live]:
+            del self._sent[uid]
+            entries.append([uid])
+        
+        for uid, poll in live.items():
+            if uid in self._sent and uid not in self._dirty:
+                continue
+            
+            entries.extend(self.encode(poll))
+        
+        self._dirty.clear()
+        
+        if entries:
+            self._send(entries)
+    
+    def encode(self, poll: 'Poll') -> typing.List[Entry]:
+        """Encodes a poll's changes since it was last sent, and records them
+        as sent."""
+        tally = poll.tally()
+        sent = self._sent.get(poll.uid)
+        entries = []
+        
+        # Choices were added or removed, so the mod starts over.
+        if sent is not None and sent.keys() != tally.keys():
+            entries.append([poll.uid])
+            sent = None
+        
+        entry = [poll.uid, poll.get_remaining() or 0, sum(tally.values())]
+        
+        for choice, count in tally.items():
+            if sent is None or sent[choice] != count:
+                entry.extend((choice, count))
+        
+        self._sent[poll.uid] = tally
+        entries.append(entry)
+        
+        return entries
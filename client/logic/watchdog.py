@@ -0,0 +1,155 @@
+# This file is part of Decision Descent.
+#
+# Decision Descent is free software:
+# you can redistribute it
+# and/or modify it under the
+# terms of the GNU General
+# Public License as published by
+# the Free Software Foundation,
+# either version 3 of the License,
+# or (at your option) any later
+# version.
+#
+# Decision Descent is distributed in
+# the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without
+# even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A
+# PARTICULAR PURPOSE.  See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the
+# GNU General Public License along with
+# Decision Descent.  If not,
+# see <https://www.gnu.org/licenses/>.
+import dataclasses
+import heapq
+import itertools
+import logging
+import threading
+import time
+import typing
+
+from PyQt5 import QtCore
+
+from . import catchable
+
+__all__ = ['Stall', 'Watchdog']
+
+
+@dataclasses.dataclass(frozen=True)
+class Stall:
+    """A single period the Qt event loop was blocked for."""
+    latency: float  # Seconds the heartbeat was late by
+    handler: typing.Optional[str]  # The slowest wrapped slot or intent that ran during the stall
+    elapsed: float  # Seconds that handler ran for
+    active: typing.Tuple[str, ...]  # Wrapped callables still running when the stall was noticed
+    at: float  # When the stall was noticed, as a unix timestamp
+
+
+class Watchdog(QtCore.QObject):
+    """Measures the Qt event loop's latency with a heartbeat timer.
+    
+    Whenever the heartbeat fires later than `threshold` seconds past its
+    interval, the stall is blamed on the slowest `catchable.signal` wrapped
+    callable that ran on the Qt thread since the previous heartbeat.  Only
+    the `capacity` worst stalls are kept."""
+    LOGGER = logging.getLogger("extensions.DescentIsaac.watchdog")
+    
+    onStall = QtCore.pyqtSignal(object)
+    
+    def __init__(self, interval: int = 50, threshold: float = 0.2, capacity: int = 20,
+                 parent: QtCore.QObject = None):
+        # Super call
+        super(Watchdog, self).__init__(parent=parent)
+        
+        # Public attributes
+        self.threshold: float = threshold
+        self.stalls: int = 0  # Every stall noticed, including ones no longer kept
+        
+        # Private attributes
+        self._timer: QtCore.QTimer = QtCore.QTimer(parent=self)
+        self._interval: float = interval / 1000
+        self._capacity: int = capacity
+        self._worst: typing.List[typing.Tuple[float, int, Stall]] = []  # A min-heap of the worst stalls
+        self._order: typing.Iterator[int] = itertools.count()
+        self._thread: typing.Optional[int] = None
+        self._last: float = 0.0
+        self._active: typing.List[str] = []
+        self._slowest: typing.Optional[typing.Tuple[str, float]] = None
+        
+        # Internal calls
+        self._timer.setInterval(interval)
+        self._timer.timeout.connect(self.beat)
+    
+    # Control methods
+    def start(self):
+        """Starts the heartbeat.
+        
+        * This should be called from the Qt thread, since only that thread's
+        handlers are tracked."""
+        self._thread = threading.get_ident()
+        self._last = time.perf_counter()
+        self._active.clear()
+        self._slowest = None
+        
+        catchable.add_hook(self)
+        self._timer.start()
+    
+    def stop(self):
+        """Stops the heartbeat."""
+        self._timer.stop()
+        catchable.remove_hook(self)
+    
+    def is_running(self) -> bool:
+        """Whether or not the heartbeat is currently running."""
+        return self._timer.isActive()
+    
+    def get_stalls(self) -> typing.List[Stall]:
+        """Returns the worst stalls noticed, worst first."""
+        return [s for _, _, s in sorted(self._worst, reverse=True)]
+    
+    def clear(self):
+        """Forgets every stall noticed so far."""
+        self._worst.clear()
+        self.stalls = 0
+    
+    # Slots
+    def beat(self):
+        """Measures how late the heartbeat fired."""
+        now = time.perf_counter()
+        latency = now - self._last - self._interval
+        self._last = now
+        
+        slowest, self._slowest = self._slowest, None
+        
+        if latency < self.threshold:
+            return
+        
+        handler, elapsed = slowest if slowest is not None else (None, 0.0)
+        stall = Stall(latency, handler, elapsed, tuple(self._active), time.time())
+        
+        self.stalls += 1
+        heapq.heappush(self._worst, (latency, next(self._order), stall))
+        
+        if len(self._worst) > self._capacity:
+            heapq.heappop(self._worst)
+        
+        self.LOGGER.warning(f'Event loop stalled for {latency * 1000:.0f}ms'
+                            f' (slowest handler: {handler or "unknown"}, {elapsed * 1000:.0f}ms)')
+        self.onStall.emit(stall)
+    
+    # Hook methods
+    def enter(self, name: str):
+        if threading.get_ident() == self._thread:
+            self._active.append(name)
+    
+    def exit(self, name: str, elapsed: float):
+        if threading.get_ident() != self._thread:
+            return
+        
+        if self._active:
+            self._active.pop()
+        
+        if self._slowest is None or elapsed > self._slowest[1]:
+            self._slowest = (name, elapsed)
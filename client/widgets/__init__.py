@@ -22,4 +22,30 @@
 # GNU General Public License along with
 # Decision Descent.  If not,
 # see <https://www.gnu.org/licenses/>.
-from .poll import Poll
+import importlib
+import typing
+
+# Widget modules import QtWidgets, so they're only loaded on first use.
+_LAZY = {
+    'Poll': '.poll',
+    'Dirty': '.renderer',
+    'FrameRenderer': '.renderer',
+    'RenderStats': '.renderer'
+}
+
+if typing.TYPE_CHECKING:
+    from .poll import Poll
+    from .renderer import Dirty, FrameRenderer, RenderStats
+
+
+def __getattr__(name: str) -> typing.Any:
+    try:
+        module = importlib.import_module(_LAZY[name], __name__)
+    
+    except KeyError:
+        raise AttributeError(f'module {__name__!r} has no attribute {name!r}') from None
+    
+    value = getattr(module, name)
+    globals()[name] = value
+    
+    return value
@@ -23,8 +23,6 @@
 # Decision Descent.  If not,
 # see <https://www.gnu.org/licenses/>.
 import dataclasses
-import difflib
-import inspect
 import logging
 import random
 import typing
@@ -33,12 +31,19 @@ from PyQt5 import QtCore, QtWidgets
 
 from QtUtilities.widgets import QCircleProgressBar
 
+from .renderer import Dirty, FrameRenderer
+from ..logic import catchable
+from ..logic.clock import Clock, MonotonicClock
+from ..logic.policies import ConclusionPolicy, Standings
+from ..logic.sketch import ApproximateTally, ErrorBounds
+
 __all__ = ['Poll']
 
 
 @dataclasses.dataclass()
 class Choice:
     display: QtWidgets.QLabel = dataclasses.field(init=False, default_factory=QtWidgets.QLabel)
+    bar: QtWidgets.QProgressBar = dataclasses.field(init=False, default_factory=QtWidgets.QProgressBar)
     id: str
     name: str
     aliases: typing.List[str] = dataclasses.field(default_factory=list)
@@ -46,11 +51,17 @@ class Choice:
     def __post_init__(self):
         super(Choice, self).__init__()
         
+        # Tokens are normalized once, rather than on every comparison.
+        self.id = self.id.lower()
+        self.aliases = [a.lower() for a in self.aliases]
+        
         self.display.setText(f'[#{self.id}] {self.name}')
     
     def fuzzy_match(self, subject: str) -> bool:
         """Attempts to match an string passed to any id, name, or alias
         registered to this choice."""
+        import inspect
+        
         return any([i(subject.lower()) for n, i in inspect.getmembers(self)
                     if callable(i) and n.startswith('fuzzy_') and n != 'fuzzy_match'])
     
@@ -59,6 +70,8 @@ class Choice:
         this choice.
         
         Method: similarity"""
+        import difflib
+        
         return difflib.get_close_matches(
             subject, [self.id.lower(), self.name.lower()] + [a.lower() for a in self.aliases]
         ) >= 90
@@ -68,28 +81,42 @@ class Poll(QtWidgets.QWidget):
     """A semi-automated class for declaring chat polls."""
     LOGGER = logging.getLogger('extensions.DescentIsaac.polls')
     onConclude = QtCore.pyqtSignal(str)
+    onChoicesChanged = QtCore.pyqtSignal()
+    onActiveChanged = QtCore.pyqtSignal(object)  # Emitted before a concluding poll tallies its votes
+    onFinish = QtCore.pyqtSignal(object)
     
-    def __init__(self, intent: str, *, parent: QtWidgets.QWidget = None):
+    def __init__(self, intent: str, *, clock: Clock = None, parent: QtWidgets.QWidget = None):
         # Super call
         super(Poll, self).__init__(parent=parent)
         
         # Public attributes
         self.intent: str = intent
+        self.uid: typing.Optional[int] = None  # Assigned by the arbiter's lifecycle manager
         
         # Private attributes
-        self._timer: QtCore.QTimer = QtCore.QTimer(parent=self)
+        self._clock: Clock = clock if clock is not None else MonotonicClock(parent=self)
+        self._tick: typing.Optional[int] = None  # The clock handle of the next timer tick
+        self._deadline: float = 0.0  # When the next timer tick is due
         self._label: QtWidgets.QLabel = QtWidgets.QLabel(parent=self)
         self._time_indicator: QCircleProgressBar = QCircleProgressBar(parent=self)
+        self._renderer: FrameRenderer = FrameRenderer(self, self.paint_frame, parent=self)
         
         self._choices: typing.List[Choice] = []
         self._participants: typing.Dict[str, Choice] = {}
+        self._lookup: typing.Dict[str, Choice] = {}  # Every id, alias, and name a choice can be voted with
+        self._counts: typing.Dict[str, int] = {}  # Live vote counts, kept in step with participants
+        self._approximate: typing.Optional[ApproximateTally] = None  # Replaces both while overloaded
+        self._voters: typing.Optional[int] = None  # Participants tallied elsewhere, when votes are sharded
+        self._concluding: bool = False
+        self._held: bool = False  # Whether the poll is waiting on votes tallied elsewhere to conclude
+        self._winners: typing.List[str] = []
+        self._policies: typing.List[ConclusionPolicy] = []
+        self._electorate: int = 0  # The number of eligible voters, or 0 if it isn't known
         self._multi: bool = False
         self._current: typing.Optional[int] = None  # Current timer tick
         self._initial: typing.Optional[int] = None  # Initial timer tick
         
         # Internal calls
-        self._timer.timeout.connect(self.decrement)
-        
         layout = QtWidgets.QGridLayout()
         self.setLayout(layout)
         
@@ -106,97 +133,276 @@ class Poll(QtWidgets.QWidget):
     
     def is_active(self) -> bool:
         """Whether or not the poll is currently running."""
-        return self._timer.isActive()
+        return self._tick is not None
+    
+    def set_policies(self, *policies: ConclusionPolicy):
+        """Sets the policies that may conclude the poll before its timer runs
+        out.  The poll concludes as soon as any one of them is satisfied."""
+        self._policies = list(policies)
+    
+    def get_policies(self) -> typing.List[ConclusionPolicy]:
+        """Returns a copy of the poll's conclusion policies."""
+        return self._policies.copy()
+    
+    def set_electorate(self, voters: int):
+        """Sets the number of eligible voters, or 0 if it isn't known."""
+        self._electorate = max(0, voters)
+    
+    def is_approximate(self) -> bool:
+        """Whether or not the poll is tallying votes approximately."""
+        return self._approximate is not None
+    
+    def set_approximate(self, sample_rate: float, capacity: int = 100000, error_rate: float = 0.001):
+        """Switches the poll to tallying votes approximately, in fixed memory.
+        
+        Votes already cast are kept exactly, and the poll stops remembering
+        its participants.  There's no switching back.
+        
+        :param sample_rate: The share of participants whose votes are counted
+                            from now on.
+        :param capacity: The number of participants the poll expects.
+        :param error_rate: The chance a participant's first vote is mistaken
+                           for a repeat, at capacity."""
+        if self._approximate is not None:
+            return
+        
+        self._approximate = ApproximateTally(self._counts, sample_rate, capacity, error_rate)
+        self._approximate.absorb({n: c.id for n, c in self._participants.items()})
+        self._participants.clear()
+        
+        self.LOGGER.warning(f'Poll switched to approximate tallying, sampling {sample_rate:.1%} of participants')
+    
+    def get_error_bounds(self) -> typing.Optional[ErrorBounds]:
+        """Returns the error the poll's tally may carry, or None if the poll is
+        tallied exactly."""
+        return self._approximate.get_bounds() if self._approximate is not None else None
+    
+    def merge_tally(self, counts: typing.Dict[str, int], voters: int) -> bool:
+        """Replaces the poll's counts with ones tallied elsewhere, like by
+        the arbiter's vote shards.
+        
+        * Polls tallied elsewhere don't know their participants.
+        
+        :returns: Whether or not the counts changed."""
+        merged = {c.id: counts.get(c.id, 0) for c in self._choices}
+        
+        if merged == self._counts and voters == self._voters:
+            return False
+        
+        self._counts, self._voters = merged, voters
+        self._renderer.mark(Dirty.TALLY)
+        
+        if self._policies and self._tick is not None:
+            self._evaluate()
+        
+        return True
+    
+    def set_framerate(self, fps: int, budget: float = None):
+        """Sets the maximum number of times per second the poll repaints,
+        and optionally the UI-thread time it may spend doing so per second."""
+        self._renderer.set_framerate(fps)
+        
+        if budget is not None:
+            self._renderer.set_budget(budget)
     
     # Choice methods
     def add_choice(self, identifier: str, name: str, *aliases: str):
         """Adds a choice to the poll.
-
+        
         * Note: If the poll's timer is currently ticking, any calls made via
         this method will reset it."""
-        for choice in self._choices.copy():
+        for choice in self._choices:
             if choice.id != identifier.lower():
                 continue
             
             choice.aliases = [a.lower() for a in aliases]
-            return
+            self._index()
+            
+            return self.onChoicesChanged.emit()
         
         c = Choice(identifier, name, list(aliases))
-        c.display = QtWidgets.QLabel(f'[#{identifier}] {name}')
         
         layout: QtWidgets.QGridLayout = self.layout()
+        row = layout.rowCount()
+        
+        self._choices.append(c)
+        self._counts[c.id] = 0
+        
+        if self._approximate is not None:
+            self._approximate.add_choice(c.id)
         
-        self._choices.append(Choice(identifier, name, list(aliases)))
-        layout.addItem(c.display, layout.rowCount(), 1)
-        self.reset()
+        self._index()
+        layout.addWidget(c.display, row, 1)
+        layout.addWidget(c.bar, row, 2)
+        self._renderer.mark(Dirty.TALLY)
+        self.onChoicesChanged.emit()
+        
+        if self.is_active():
+            self.reset()
     
     def remove_choice(self, target: str):
         """Removes a choice from the poll.
-
+        
         * Note: If a poll's timer is currently ticking, any calls made via
         this method will reset."""
-        for choice in self._choices.copy():
-            if choice.id.lower() == target.lower() \
-                    or any([a == target.lower() for a in choice.aliases]) or choice.name == target.lower():
-                try:
-                    c = self._choices.pop(self._choices.index(choice))
-                    
-                    layout: QtWidgets.QGridLayout = self.layout()
-                    layout.removeItem(c.display)
-                
-                except IndexError:
-                    pass  # It's already been removed
-                
-                finally:
-                    return self.reset_timer()
+        choice = self._lookup.get(target.lower())
+        
+        if choice is None:
+            return
+        
+        try:
+            c = self._choices.pop(self._choices.index(choice))
+            self._counts.pop(c.id, None)
+            
+            if self._approximate is not None:
+                self._approximate.remove_choice(c.id)
+            
+            layout: QtWidgets.QGridLayout = self.layout()
+            layout.removeWidget(c.display)
+            layout.removeWidget(c.bar)
+            c.display.deleteLater()
+            c.bar.deleteLater()
+        
+        except ValueError:
+            pass  # It's already been removed
+        
+        finally:
+            self._index()
+            self.onChoicesChanged.emit()
+            
+            if self.is_active():
+                self.reset()
     
     def is_choice(self, target: str) -> bool:
         """Checks whether or not the passed target is currently assigned to any
         choice in this poll."""
-        for choice in self._choices.copy():
-            if choice.id == target.lower() or any([a == target.lower() for a in choice.aliases]):
-                return True
+        return target.lower() in self._lookup
+    
+    def _index(self):
+        """Rebuilds the lookup table of votable tokens.
         
-        return False
+        * Earlier choices take precedence when tokens collide."""
+        self._lookup.clear()
+        
+        for choice in self._choices:
+            for token in [choice.id, *choice.aliases, choice.name.lower()]:
+                self._lookup.setdefault(token, choice)
     
     def get_choices(self) -> typing.List[Choice]:
         """Returns a copy of the poll's choices."""
         return self._choices.copy()
     
+    def get_lookup(self) -> typing.Dict[str, str]:
+        """Returns every token the poll can be voted with, mapped to its
+        choice's id."""
+        return {t: c.id for t, c in self._lookup.items()}
+    
+    def get_tokens(self) -> typing.List[str]:
+        """Returns every id, alias, and name a participant could vote with."""
+        return list(self._lookup)
+    
     # Participants methods
     def add_participant(self, name: str, target: typing.Union[Choice, str]):
-        """Adds a participant to the poll."""
+        """Adds a participant to the poll.
+        
+        * Approximate polls ignore participants that aren't sampled before
+        looking up their choice."""
         name = name.lower()
         
+        if self._approximate is not None and not self._approximate.is_sampled(name):
+            return
+        
         # If the choice passed was a string, we'll convert it to a PollChoice
         # object.
         #
         # If the choice passed wasn't a valid poll choice, we'll raise a ValueError.
         if isinstance(target, str):
-            target = target.lower()
+            target = self._lookup.get(target.lower())
             
-            if not self.is_choice(target):
+            if target is None:
                 raise ValueError
-            
-            for choice in self._choices:
-                if choice.id == target or any([a == target for a in choice.aliases]) or choice.name == target:
-                    target = choice
-                    break
+        
+        if self._approximate is None:
+            self._count(name, target)
+        
+        elif not self._approximate.add(name, target.id):
+            return  # The participant wasn't sampled, or already voted
+        
+        self._renderer.mark(Dirty.TALLY)
+        
+        if self._policies and self._tick is not None:
+            self._evaluate()
+    
+    def _count(self, name: str, target: Choice):
+        """Counts a participant's vote exactly, replacing their previous vote."""
+        previous = self._participants.get(name)
+        
+        if previous is not None and previous.id in self._counts:
+            self._counts[previous.id] -= 1
         
         self._participants[name] = target
+        self._counts[target.id] = self._counts.get(target.id, 0) + 1
     
     def remove_participant(self, name: str):
-        """Removes a participant from the poll."""
-        self._participants.pop(name)
+        """Removes a participant from the poll.
+        
+        * Approximate polls don't remember their participants, so they can't
+        be removed from them."""
+        choice = self._participants.pop(name)
+        
+        if choice.id in self._counts:
+            self._counts[choice.id] -= 1
+        self._renderer.mark(Dirty.TALLY)
     
     def has_participated(self, name: str) -> bool:
         """Checks whether or not a target has participated in this poll."""
+        if self._approximate is not None:
+            return self._approximate.has_voted(name.lower())
+        
         return name.lower() in self._participants
     
     def get_participants(self) -> typing.List[str]:
-        """Returns a copy of the poll's participants."""
+        """Returns a copy of the poll's participants.
+        
+        * Approximate and sharded polls don't remember their participants."""
         return list(self._participants.keys())
     
+    def get_standings(self) -> Standings:
+        """Returns the poll's current standings.
+        
+        * Only the live vote counts are read, so this doesn't grow with the
+        number of participants."""
+        counts = self._counts if self._approximate is None else self._approximate.tally()
+        leader = runner_up = 0
+        
+        for count in counts.values():
+            if count > leader:
+                leader, runner_up = count, leader
+            
+            elif count > runner_up:
+                runner_up = count
+        
+        # Approximate polls ignore repeat votes, so their voters can't switch.
+        if self._approximate is not None:
+            votes, switchable = sum(counts.values()), 0
+        
+        elif self._voters is not None:
+            votes = switchable = self._voters
+        
+        else:
+            votes = switchable = len(self._participants)
+        
+        return Standings(leader, runner_up, votes, self._electorate, switchable)
+    
+    def _evaluate(self):
+        """Concludes the poll if any of its policies are satisfied."""
+        standings = self.get_standings()
+        
+        for policy in self._policies:
+            if policy.check(standings):
+                self.LOGGER.info(f'Concluding poll early; {policy!r} was satisfied by {standings}')
+                return self.conclude()
+    
     # Timer methods
     def start(self, seconds: int = None):
         """Starts the poll's timer."""
@@ -211,15 +417,39 @@ class Poll(QtWidgets.QWidget):
         else:
             self._current = self._initial
         
-        self._timer.start(1000)
+        if self._tick is not None:
+            self._clock.cancel(self._tick)
+        
+        self._deadline = self._clock.now()
+        self._schedule()
+        self.onActiveChanged.emit(self)
     
     def stop(self):
         """Stops the poll's timer."""
-        if self._timer.isActive():
-            return self._timer.stop()
+        if self._tick is not None:
+            self._clock.cancel(self._tick)
+            self._tick = None
+            return self.onActiveChanged.emit(self)
         
         self.LOGGER.warning('Poll already stopped!')
     
+    def _schedule(self):
+        """Schedules the timer's next tick.
+        
+        * Ticks are due exactly a second apart, so late ticks don't push back
+        the ones after them."""
+        self._deadline += 1
+        self._tick = self._clock.call_at(self._deadline, self.process_tick)
+    
+    def process_tick(self):
+        """Advances the poll's timer by a single tick."""
+        self._schedule()
+        self.decrement()
+    
+    def get_remaining(self) -> typing.Optional[int]:
+        """Returns the number of seconds left on the poll's timer."""
+        return self._current
+    
     def reset(self):
         """Resets the poll's timer."""
         if self._initial is None:
@@ -230,51 +460,128 @@ class Poll(QtWidgets.QWidget):
     
     def increment(self):
         """Increments the poll's timer.
-
+        
         * The poll's timer can never surpass the poll's upper limit."""
         if self._current < self._initial:
             self._current += 1
     
+    @catchable.signal
     def decrement(self):
         """Decrements the poll's timer.
-
+        
         * The poll's timer can never drop below 0."""
         if self._current > 0:
             self._current -= 1
-            self._time_indicator.setValue(self._current)
+            self._renderer.mark(Dirty.TIMER)
             return
         
+        self.conclude()
+    
+    def tally(self) -> typing.Dict[str, int]:
+        """Returns the number of votes each choice currently has.
+        
+        * Approximate polls return their estimates."""
+        counts = self._counts if self._approximate is None else self._approximate.tally()
+        
+        return {c.id: counts.get(c.id, 0) for c in self._choices}
+    
+    def conclude(self):
+        """Stops the poll, tallies its votes, and emits its winners.
+        
+        * `onFinish` is emitted once every winner has been emitted through
+        `onConclude`.
+        * If a listener of `onActiveChanged` holds the poll, its votes aren't
+        tallied until it's released."""
         # Stop the poll's timer from running
-        self.stop()
+        if self._tick is not None:
+            self._clock.cancel(self._tick)
+            self._tick = None
+        
+        # Listeners tallying votes elsewhere may hold the poll until they've
+        # merged them in.
+        self._concluding = True
+        
+        try:
+            self.onActiveChanged.emit(self)
+        
+        finally:
+            self._concluding = False
+        
+        if self._held:
+            return self.LOGGER.info('Poll concluded!  Waiting on votes tallied elsewhere...')
+        
+        self._award()
+    
+    def hold(self) -> bool:
+        """Delays a concluding poll's tally until `release` is called.
+        
+        * Polls can only be held by listeners of `onActiveChanged`, as the
+        poll concludes.
         
+        :returns: Whether or not the poll was held."""
+        if self._concluding:
+            self._held = True
+        
+        return self._held
+    
+    def release(self):
+        """Tallies a held poll's votes, and emits its winners."""
+        if self._held:
+            self._held = False
+            self._award()
+    
+    def _award(self):
+        """Tallies the poll's votes, and emits its winners."""
         self.LOGGER.info('Poll concluded!  Tallying votes...')
-        t: typing.Dict[str, int] = {c.id: 0 for c in self._choices}
+        t = self.tally()
         
-        for participant, choice in self._participants.items():
-            if choice.id not in t:
-                self.LOGGER.warning("Participant's choice isn't a valid choice!  This shouldn't have happened.")
-                continue
+        if self._approximate is not None:
+            self.LOGGER.info(f'Votes were tallied approximately; {self._approximate.get_bounds()}')
+        
+        if t:
+            highest_voted: int = max(t.values(), key=lambda x: int(x))
+            winners: typing.List[str] = [c for c, v in t.items() if v == highest_voted]
             
-            t[choice.id] += 1
+            self._winners = winners if self._multi else [random.choice(winners)]
         
-        highest_voted: int = max(t.values(), key=lambda x: int(x))
-        winners: typing.List[str] = [c for c, v in t.items() if v == highest_voted]
+        for c in self._winners:
+            self.onConclude.emit(c)
         
-        if self._multi:
-            for c in winners:
-                self.onConclude.emit(c)
+        self.onFinish.emit(self)
+    
+    def get_winners(self) -> typing.List[str]:
+        """Returns the choices the poll awarded when it concluded."""
+        return self._winners.copy()
+    
+    # Render methods
+    def paint_frame(self, flags: Dirty):
+        """Repaints the parts of the poll that changed since the last frame."""
+        if flags & Dirty.TIMER and self._current is not None:
+            self._time_indicator.setValue(self._current)
         
-        else:
-            self.onConclude.emit(random.choice(winners))
+        if flags & Dirty.TALLY:
+            counts = self.tally()
+            total = max(1, sum(counts.values()))
+            
+            for choice in self._choices:
+                choice.bar.setMaximum(total)
+                choice.bar.setValue(counts[choice.id])
+    
+    def showEvent(self, event):
+        super(Poll, self).showEvent(event)
         
-        # Magic methods
-        def __repr__(self):
-            return f'<{self.__class__.__name__} is_multi={self._multi} choices=[{",".join([i.id for i in self._choices])}]>'
+        self._renderer.resume()
+    
+    # Magic methods
+    def __repr__(self):
+        return f'<{self.__class__.__name__} is_multi={self._multi} choices=[{",".join([i.id for i in self._choices])}]>'
     
     # Utility methods
     def delete(self):
         """Deletes this poll cleanly."""
-        if self._timer.isActive():
-            self._timer.stop()
+        if self._tick is not None:
+            self._clock.cancel(self._tick)
+            self._tick = None
         
+        self._renderer.stop()
         self.deleteLater()
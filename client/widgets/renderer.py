@@ -0,0 +1,141 @@
+# This file is part of Decision Descent.
+#
+# Decision Descent is free software:
+# you can redistribute it
+# and/or modify it under the
+# terms of the GNU General
+# Public License as published by
+# the Free Software Foundation,
+# either version 3 of the License,
+# or (at your option) any later
+# version.
+#
+# Decision Descent is distributed in
+# the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without
+# even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A
+# PARTICULAR PURPOSE.  See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the
+# GNU General Public License along with
+# Decision Descent.  If not,
+# see <https://www.gnu.org/licenses/>.
+import dataclasses
+import enum
+import logging
+import time
+import typing
+
+from PyQt5 import QtCore, QtWidgets
+
+__all__ = ['Dirty', 'FrameRenderer', 'RenderStats']
+
+
+class Dirty(enum.IntFlag):
+    """The parts of a view that need to be repainted."""
+    NONE = 0
+    TIMER = 1
+    TALLY = 2
+    ALL = TIMER | TALLY
+
+
+@dataclasses.dataclass()
+class RenderStats:
+    """Counters describing how a renderer spent its frames."""
+    frames: int = 0
+    skipped: int = 0  # Frames dropped to stay within the time budget
+    deferred: int = 0  # Frames postponed while the view was hidden
+    spent: float = 0.0  # Seconds spent painting in the current window
+
+
+class FrameRenderer(QtCore.QObject):
+    """Batches repaint requests for a widget into frames.
+    
+    Changes are accumulated as dirty flags, and painted at most `fps` times a
+    second while the widget is visible.  Painting time is measured, and frames
+    are dropped once `budget` seconds of UI-thread time have been spent within
+    the current second."""
+    LOGGER = logging.getLogger('extensions.DescentIsaac.renderer')
+    
+    def __init__(self, widget: QtWidgets.QWidget, paint: typing.Callable[[Dirty], None], *,
+                 fps: int = 10, budget: float = 0.05, parent: QtCore.QObject = None):
+        # Super call
+        super(FrameRenderer, self).__init__(parent=parent)
+        
+        # Public attributes
+        self.stats: RenderStats = RenderStats()
+        
+        # Private attributes
+        self._widget: QtWidgets.QWidget = widget
+        self._paint: typing.Callable[[Dirty], None] = paint
+        self._dirty: Dirty = Dirty.NONE
+        self._budget: float = budget
+        self._window: float = time.perf_counter()  # Start of the current budget window
+        self._timer: QtCore.QTimer = QtCore.QTimer(parent=self)
+        
+        # Internal calls
+        self._timer.timeout.connect(self.render)
+        self.set_framerate(fps)
+    
+    # Properties
+    def set_framerate(self, fps: int):
+        """Sets the maximum number of frames painted per second."""
+        self._timer.setInterval(max(1, 1000 // max(1, fps)))
+    
+    def set_budget(self, seconds: float):
+        """Sets the maximum UI-thread time spent painting per second."""
+        self._budget = seconds
+    
+    def is_dirty(self) -> bool:
+        """Whether or not the view has changes waiting to be painted."""
+        return self._dirty != Dirty.NONE
+    
+    # Frame methods
+    def mark(self, flags: Dirty):
+        """Marks part of the view as needing a repaint.
+        
+        * The repaint happens on the next frame, not immediately."""
+        self._dirty |= flags
+        
+        if not self._timer.isActive() and self._widget.isVisible():
+            self._timer.start()
+    
+    def resume(self):
+        """Resumes painting after the view was hidden."""
+        if self._dirty and not self._timer.isActive():
+            self._timer.start()
+    
+    def stop(self):
+        """Stops painting frames."""
+        self._timer.stop()
+    
+    def render(self):
+        """Paints every change made since the last frame."""
+        if not self._dirty:
+            return self._timer.stop()
+        
+        if not self._widget.isVisible():
+            # Changes stay dirty until the view is shown again.
+            self.stats.deferred += 1
+            return self._timer.stop()
+        
+        now = time.perf_counter()
+        
+        if now - self._window >= 1.0:
+            self._window = now
+            self.stats.spent = 0.0
+        
+        elif self.stats.spent >= self._budget:
+            self.stats.skipped += 1
+            return
+        
+        flags, self._dirty = self._dirty, Dirty.NONE
+        
+        try:
+            self._paint(flags)
+        
+        finally:
+            self.stats.frames += 1
+            self.stats.spent += time.perf_counter() - now
@@ -43,7 +43,25 @@ return {
         --
         -- TYPE    » INTEGER
         -- DEFAULT » 25565
-        port = 25565
+        port = 25565,
+        
+        -- The number of milliseconds per frame the mod may spend
+        -- running intents from the other half.  Anything that doesn't
+        -- fit is run on the next frame.
+        --
+        -- TYPE    » NUMBER
+        -- DEFAULT » 4
+        budget = 4
+    },
+    
+    scheduler = {
+        -- The number of milliseconds per frame the mod may spend
+        -- running scheduled tasks, including the time spent running
+        -- intents.  Tasks that don't fit are run on the next frame.
+        --
+        -- TYPE    » NUMBER
+        -- DEFAULT » 6
+        budget = 6
     },
     
     rng = {
@@ -35,14 +35,31 @@ local const = require("constants")
 ---@field args any[]
 ---@field kwargs table<string, any>
 ---@field reply string
+---@field seq number
+---@field ack number
 local Payload = {}
 
+---@class Outgoing
+---@field seq number
+---@field line string
+local Outgoing = {}
+
+---@class Queued
+---@field payload Payload
+---@field key string|nil @Queued payloads with the same key supersede each other
+local Queued = {}
+
 
 --[[  Classes  ]]--
 ---
 --- This class attempts to mimic a proper WebSocket in terms of non-blocking
 --- reading and writing.  Any reads are converted to a Lua table, internally
 --- known as intent payloads, then processed into functional intent calls.
+---
+--- Sent payloads are numbered and kept in a bounded replay buffer until the
+--- other half acknowledges them.  On reconnection, the socket presents its
+--- session and the last sequence number it received so only missed payloads
+--- are exchanged.
 ---@class PseudoWS
 ---
 ---@field public host string @The address to connect to when `PseudoWS:connect` is called
@@ -51,6 +68,32 @@ local Payload = {}
 ---@field listener thread
 ---@field logger Logger
 ---@field intents table<string, function>
+---@field routes table<string, function>|nil @The compiled intents, or nil if they need recompiling
+---@field wildcards table[] @Compiled wildcard intents, most specific first
+---@field middleware function[]
+---@field session string|boolean @The session assigned by the other half, or false
+---@field established boolean @Whether the current connection completed its handshake
+---@field connecting number|nil @When the pending connection was started, or nil if there isn't one
+---@field connectTimeout number @The number of seconds a connection may take before it's abandoned
+---@field handshaking boolean @Whether the handshake is waiting for the other half's answer
+---@field handshakeSent number|nil @When the handshake was last sent, or nil if it needs to be sent
+---@field handshakeTimeout number @The number of seconds to wait for an answer before the handshake is sent again
+---@field seq number @The last sequence number sent
+---@field received number @The last sequence number received
+---@field outbox Outgoing[] @Payloads the other half hasn't acknowledged yet
+---@field outboxLimit number
+---@field batch table[]|nil @Payloads collected between `beginBatch` and `endBatch`
+---@field inbox string[] @Lines read from the socket that haven't been dispatched yet
+---@field inboxHead number @The index of the oldest line in the inbox
+---@field inboxTail number @The index of the newest line in the inbox
+---@field partial string|nil @The start of a line that hasn't been fully received yet
+---@field budget number @The number of seconds per frame dispatching may take
+---@field drainLimit number @The maximum number of lines read per frame
+---@field queue Queued[] @Payloads waiting for the next flush
+---@field queueLimit number
+---@field wire string[] @Raw lines waiting for the next flush
+---@field unsent string|nil @The part of the last flush the socket couldn't take
+---@field stats table<string, number> @Counters describing how the inbox and outbox are being processed
 local PseudoWS = {}
 PseudoWS.__index = PseudoWS
 
@@ -69,20 +112,53 @@ function PseudoWS.create()
                 listener = nil,
                 manager = nil,
                 logger = utils.getLogger(const.meta.id .. ".http"),
-                intents = require("intents")
+                intents = require("intents"),
+                routes = nil,
+                wildcards = {},
+                middleware = {},
+                session = false,
+                established = false,
+                connecting = nil,
+                connectTimeout = 5,
+                handshaking = false,
+                handshakeSent = nil,
+                handshakeTimeout = 5,
+                seq = 0,
+                received = 0,
+                outbox = {},
+                outboxLimit = 64,
+                batch = nil,
+                inbox = {},
+                inboxHead = 1,
+                inboxTail = 0,
+                partial = nil,
+                budget = 0.004,
+                drainLimit = 256,
+                queue = {},
+                queueLimit = 128,
+                wire = {},
+                unsent = nil,
+                stats = {
+                    frames = 0, overBudget = 0, carried = 0, dispatched = 0, worst = 0,
+                    flushes = 0, sent = 0, partial = 0, superseded = 0, dropped = 0
+                }
             },
             PseudoWS
     )
 end
 
 ---
---- Sends a message through the socket.
+--- Queues a message to be sent through the socket with the next flush.
+---
+--- Messages sent with a key are state updates; only the latest queued
+--- message with a given key is sent.
 ---
 ---@param intent string
 ---@param arguments any[]
 ---@param kwargs table<string, any>
 ---@param reply string
-function PseudoWS:sendMessage(intent, arguments, kwargs, reply)
+---@param key string
+function PseudoWS:sendMessage(intent, arguments, kwargs, reply, key)
     -- Ensure the arguments passed are valid
     if not intent or type(intent) ~= "string" then return self.logger:warning("Attempted to send a message with an invalid intent!") end
     if not arguments or type(arguments) ~= "table" then arguments = {} end
@@ -98,18 +174,210 @@ function PseudoWS:sendMessage(intent, arguments, kwargs, reply)
     if kwargs then payload.kwargs = kwargs end
     if reply then payload.reply = reply end
     
-    -- Send the message to the other side.
-    local s, m = self.socket:send(json.encode(payload))
-    
-    -- If the message couldn't be sent, we'll log the error.
-    if not s then
-        self.logger:warning("Could not send message to client!")
-        self.logger:warning(string.format("Error message: %s", m))
+    -- Payloads sent during a batch are sent together when it ends.
+    if self.batch then
+        self.batch[#self.batch + 1] = payload
         return
     end
     
-    -- If the message was sent, we'll log the number of bytes sent.
-    self.logger:info(string.format("%d bytes sent!", tonumber(s)))
+    local queue = self.queue
+    
+    if key ~= nil then
+        for i, queued in ipairs(queue) do
+            if queued.key == key then
+                table.remove(queue, i)
+                self.stats.superseded = self.stats.superseded + 1
+                
+                break
+            end
+        end
+    end
+    
+    -- Full queues drop their oldest state update, and only drop other
+    -- payloads if there aren't any.
+    if #queue >= self.queueLimit then
+        local victim = 1
+        
+        for i, queued in ipairs(queue) do
+            if queued.key ~= nil then
+                victim = i
+                break
+            end
+        end
+        
+        self.logger:warning(string.format("Outgoing queue is full!  Dropping payload with intent \"%s\" ...", queue[victim].payload.intent))
+        self.stats.dropped = self.stats.dropped + 1
+        
+        table.remove(queue, victim)
+    end
+    
+    queue[#queue + 1] = { payload = payload, key = key }
+end
+
+---
+--- Starts collecting sent payloads into a single batch envelope.
+---
+function PseudoWS:beginBatch()
+    if self.batch == nil then self.batch = {} end
+end
+
+---
+--- Sends every payload collected since `beginBatch` as a single batch.
+---
+---@param atomic boolean @Whether the other side should reject the whole batch if any payload can't be executed
+---@param reply string @The intent to invoke with every payload's result
+function PseudoWS:endBatch(atomic, reply)
+    local payloads = self.batch
+    self.batch = nil
+    
+    if payloads == nil or #payloads == 0 then return end
+    
+    self:sendMessage("batch", payloads, { atomic = atomic == true }, reply)
+end
+
+---
+--- Queues a raw line to be written through the socket with the next flush,
+--- ahead of any queued payloads.
+---
+---@param line string
+function PseudoWS:write(line)
+    self.wire[#self.wire + 1] = line
+end
+
+---
+--- Sends everything queued since the previous flush as a single write.
+---
+--- Queued payloads are only numbered once a session is established, and
+--- only once the socket has taken everything it was previously given.
+--- Whatever the socket doesn't take is retried with the next flush.
+---
+--- This should be called once per frame.
+---
+function PseudoWS:flush()
+    if self.socket == nil or self.connecting ~= nil then return end
+    
+    local stats = self.stats
+    
+    -- The handshake goes out ahead of everything else, and is sent again
+    -- until the other side answers it.
+    if self.handshaking and self.unsent == nil then
+        local now = socket.gettime()
+        
+        if self.handshakeSent == nil or now - self.handshakeSent >= self.handshakeTimeout then
+            table.insert(self.wire, 1, json.encode({ sender = const.sides.ISAAC, intent = "session.resume", args = { self.session, self.received } }) .. "\n")
+            self.handshakeSent = now
+        end
+    end
+    
+    if self.established and self.unsent == nil and #self.queue > 0 then
+        for _, queued in ipairs(self.queue) do
+            local payload = queued.payload
+            
+            -- Number the payload, and keep it until the other side
+            -- acknowledges it.
+            self.seq = self.seq + 1
+            payload.seq = self.seq
+            payload.ack = self.received
+            
+            local line = json.encode(payload) .. "\n"
+            
+            self.outbox[#self.outbox + 1] = { seq = self.seq, line = line }
+            self.wire[#self.wire + 1] = line
+        end
+        
+        self.queue = {}
+        
+        while #self.outbox > self.outboxLimit do table.remove(self.outbox, 1) end
+    end
+    
+    if self.unsent == nil and #self.wire == 0 then return end
+    
+    local data = (self.unsent or "") .. table.concat(self.wire)
+    local last, m, partial = self.socket:send(data)
+    
+    self.wire = {}
+    self.unsent = nil
+    stats.flushes = stats.flushes + 1
+    
+    if last ~= nil then
+        stats.sent = stats.sent + #data
+    elseif m == "timeout" then
+        -- The socket's buffer is full, so the rest is sent next frame.
+        self.unsent = string.sub(data, (partial or 0) + 1)
+        
+        stats.sent = stats.sent + (partial or 0)
+        stats.partial = stats.partial + 1
+    else
+        -- Numbered payloads are still in the outbox, so they'll be replayed
+        -- when the session resumes, and the handshake is sent again with the
+        -- next flush.
+        self.logger:warning(string.format("Could not send %d bytes to client!  Reason: %s", #data, tostring(m)))
+        self.handshakeSent = nil
+    end
+end
+
+---
+--- Drops every buffered payload the other side acknowledged.
+---
+---@param seq number
+function PseudoWS:acknowledge(seq)
+    local keep = {}
+    
+    for _, outgoing in ipairs(self.outbox) do
+        if outgoing.seq > seq then keep[#keep + 1] = outgoing end
+    end
+    
+    self.outbox = keep
+end
+
+---
+--- Asks the other side to resume the current session.
+---
+--- The handshake is sent with the next flush, and sent again every
+--- `handshakeTimeout` seconds until the other side answers it.
+---
+function PseudoWS:handshake()
+    self.established = false
+    self.handshaking = true
+    self.handshakeSent = nil
+end
+
+---
+--- Completes the session handshake.
+---
+---@param session string @The session assigned by the other side
+---@param last number @The last sequence number the other side received
+---@param resumed boolean @Whether the previous session was resumed
+function PseudoWS:establish(session, last, resumed)
+    self.session = session
+    self.established = true
+    self.handshaking = false
+    self.handshakeSent = nil
+    
+    if resumed then
+        self:acknowledge(last)
+    else
+        -- The other side started over, so our unacknowledged payloads are
+        -- renumbered for the new session.
+        self.logger:info("Started a new session!")
+        self.received = 0
+        self.seq = 0
+        
+        for _, outgoing in ipairs(self.outbox) do
+            local payload = json.decode(outgoing.line)
+            
+            self.seq = self.seq + 1
+            payload.seq = self.seq
+            payload.ack = 0
+            
+            outgoing.seq = self.seq
+            outgoing.line = json.encode(payload) .. "\n"
+        end
+    end
+    
+    self.logger:info(string.format("Session established!  Sending %d buffered payloads...", #self.outbox))
+    
+    for _, outgoing in ipairs(self.outbox) do self:write(outgoing.line) end
 end
 
 ---
@@ -129,6 +397,102 @@ function PseudoWS:decodeMessage(message)
     return m
 end
 
+---
+--- Registers an intent.
+---
+---@param path string @A dot separated path, where "*" segments match any single segment
+---@param func function
+function PseudoWS:addIntent(path, func)
+    self.intents[string.lower(path)] = func
+    self.routes = nil
+end
+
+---
+--- Adds middleware to the chain every intent runs through.
+---
+--- Middleware is called with the intent's path, the next function in the
+--- chain, and the intent's arguments.  It's responsible for calling the next
+--- function, and returning its result.
+---
+---@param middleware function
+function PseudoWS:use(middleware)
+    self.middleware[#self.middleware + 1] = middleware
+    self.routes = nil
+end
+
+---
+--- Wraps an intent in the middleware chain.
+---
+---@param path string
+---@param func function
+---@return function
+function PseudoWS:chain(path, func)
+    for i = #self.middleware, 1, -1 do
+        local middleware, nxt = self.middleware[i], func
+        
+        func = function(...) return middleware(path, nxt, ...) end
+    end
+    
+    return func
+end
+
+---
+--- Flattens the intent tables into a single lookup table of dotted paths.
+---
+--- Intents may be declared either as dotted keys, or as nested tables.
+---
+function PseudoWS:compile()
+    local routes = {}
+    local wildcards = {}
+    
+    local function walk(prefix, t)
+        for k, v in pairs(t) do
+            local path = string.lower(prefix and (prefix .. "." .. k) or k)
+            
+            if type(v) == "table" then
+                walk(path, v)
+            elseif type(v) == "function" and string.find(path, "*", 1, true) then
+                local pattern = string.gsub(path, "%.", "%%.")
+                pattern = string.gsub(pattern, "%*", "[^%%.]+")
+                
+                wildcards[#wildcards + 1] = { path = path, pattern = "^" .. pattern .. "$", func = v }
+            elseif type(v) == "function" then
+                routes[path] = self:chain(path, v)
+            end
+        end
+    end
+    
+    walk(nil, self.intents)
+    table.sort(wildcards, function(a, b) return #a.path > #b.path end)
+    
+    self.routes = routes
+    self.wildcards = wildcards
+end
+
+---
+--- Returns the compiled function for an intent.
+---
+---@param path string
+---@return function|nil
+function PseudoWS:resolve(path)
+    if self.routes == nil then self:compile() end
+    
+    local route = self.routes[path]
+    if route ~= nil then return route end
+    
+    -- Wildcard matches are compiled once, then cached with the exact routes.
+    for _, wildcard in ipairs(self.wildcards) do
+        if string.match(path, wildcard.pattern) then
+            route = self:chain(path, wildcard.func)
+            self.routes[path] = route
+            
+            return route
+        end
+    end
+    
+    return nil
+end
+
 ---
 --- Dispatches an intent payload from the other half to the mod's intent system.
 ---
@@ -143,35 +507,32 @@ function PseudoWS:dispatch(payload)
     -- If the payload is a message from this half, we'll ignore it.
     if dPayload.sender == const.sides.PYTHON then self.logger:info("Received payload from ourselves!  Ignoring...") end
     
-    self.logger:info(string.format("Processing payload with intent \"%s\" ...", dPayload.intent))
-    
-    self.logger:debug("Splitting intent into segments...")
-    local segs = {}  ---@type string[]
-    local c = self.intents
-    
-    -- Split the intent into segments, and insert them into the above array for use momentarily.
-    for s in string.gmatch(dPayload.intent, "%w+") do segs[#segs] = s end
+    -- Session payloads are handled by the socket itself.
+    if dPayload.intent == "session.established" then return self:establish(dPayload.args[1], dPayload.args[2], dPayload.args[3]) end
     
-    -- Attempt to locate the intent in the intent database
-    self.logger:debug("Attempting to find intent...")
+    if dPayload.ack then self:acknowledge(dPayload.ack) end
     
-    while #segs > 0 do
-        local seg = segs[1]
+    if dPayload.seq then
+        if dPayload.seq <= self.received then return self.logger:debug(string.format("Ignoring replayed payload #%d", dPayload.seq)) end
         
-        if c[seg] == nil then return self.logger:warning(string.format("Could not locate intent \"%s\" !", dPayload.intent)) end
-        if type(c[seg]) == "function" then return self.logger:warning(string.format("Intent \"%s\" has no callable!", dPayload.intent)) end
-        
-        c = c[seg]
-        table.remove(segs, 1)
+        self.received = dPayload.seq
     end
     
+    self.logger:info(string.format("Processing payload with intent \"%s\" ...", dPayload.intent))
+    
+    if dPayload.intent == "batch" then return self:dispatchBatch(dPayload) end
+    
+    -- Attempt to locate the intent in the compiled routes
+    local c = self:resolve(dPayload.intent)
+    
+    if c == nil then return self.logger:warning(string.format("Could not locate intent \"%s\" !", dPayload.intent)) end
     
     -- Attempt to invoke the requested intent with the payload data.
     self.logger:info(string.format("Attempting to invoke intent \"%s\" with arguments {%s}", dPayload.intent, table.concat(dPayload.args, ", ")))
     
     ---@type number
     local snap = socket.gettime()
-    local s, m = pcall(c, table.unpack(dPayload.args))
+    local s, m = pcall(c, table.unpack(dPayload.args or {}))
     
     if not s then return self.logger:warning("Intent failed with the following error: " .. tostring(m)) end
     
@@ -184,25 +545,143 @@ function PseudoWS:dispatch(payload)
     end
 end
 
+---
+--- Executes every payload in a batch envelope in a single pass, then sends a
+--- single combined reply.  Failed payloads are represented by `false` in the
+--- reply.
+---
+---@param dPayload Payload
+function PseudoWS:dispatchBatch(dPayload)
+    local payloads = dPayload.args or {}
+    local atomic = type(dPayload.kwargs) == "table" and dPayload.kwargs.atomic == true
+    local routes = {}
+    local results = {}
+    
+    -- Resolve every payload first, so atomic batches can be rejected before
+    -- anything runs.
+    for i, inner in ipairs(payloads) do
+        if type(inner) == "table" and type(inner.intent) == "string" then routes[i] = self:resolve(string.lower(inner.intent)) end
+        
+        if routes[i] == nil and atomic then return self.logger:warning(string.format("Atomic batch rejected!  Payload #%d is malformed or has no intent.", i)) end
+    end
+    
+    self.logger:info(string.format("Executing a batch of %d payloads...", #payloads))
+    
+    for i, inner in ipairs(payloads) do
+        local result = false
+        
+        if routes[i] ~= nil then
+            local s, m = pcall(routes[i], table.unpack(inner.args or {}))
+            
+            if s and m ~= nil then
+                result = m
+            elseif not s and atomic then
+                return self.logger:warning(string.format("Atomic batch stopped at payload #%d: %s", i, tostring(m)))
+            elseif not s then
+                self.logger:warning(string.format("Batch payload #%d failed: %s", i, tostring(m)))
+            end
+        end
+        
+        results[i] = result
+    end
+    
+    if dPayload.reply then self:sendMessage(dPayload.reply, results) end
+end
+
+---
+--- Reads every complete line waiting on the socket into the inbox, without
+--- blocking.
+---
+--- Lines that have only partially arrived are kept, and completed on a
+--- later call.
+---
+---@return string|nil @"closed" if the other side went away
+function PseudoWS:drain()
+    if self.socket == nil then return end
+    
+    for _ = 1, self.drainLimit do
+        local s, m, p = self.socket:receive("*l", self.partial)
+        
+        if s ~= nil then
+            self.partial = nil
+            
+            if s ~= "" then  -- Ignore empty responses
+                self.inboxTail = self.inboxTail + 1
+                self.inbox[self.inboxTail] = s
+            end
+        elseif m == "timeout" then
+            if p ~= nil and p ~= "" then self.partial = p else self.partial = nil end
+            
+            return
+        else
+            -- Whatever was left of the line is lost with the connection.
+            self.partial = nil
+            
+            if m ~= "closed" then self.logger:warning("Could not retrieve from socket!  Reason: " .. tostring(m)) end
+            
+            return m
+        end
+    end
+end
+
+---
+--- Returns the number of lines waiting in the inbox.
+---
+---@return number
+function PseudoWS:pending() return self.inboxTail - self.inboxHead + 1 end
+
 ---
 --- Processes any messages received through the socket.
 ---
+--- Lines are read without blocking, then dispatched until the frame's
+--- budget runs out.  At least one line is dispatched per call, and whatever
+--- doesn't fit is carried over to the next frame.
+---
+---@return string|nil @"closed" if the other side went away, or the connection couldn't be made
 function PseudoWS:processMessage()
-    local r, _, e = socket.select({ self.socket }, nil, 1)
+    if self.connecting ~= nil then
+        local status = self:finishConnect()
+        
+        if self.connecting ~= nil or status ~= nil then return status end
+    end
     
-    -- If there are no readable sockets, we'll return.
-    if not r or e then return end
+    local status = self:drain()
+    local stats = self.stats
     
-    -- Attempt to retrieve a line from the socket.
-    local s, m = self.socket:receive()
+    stats.frames = stats.frames + 1
     
-    -- If we couldn't read from the socket, we'll log it, then return.
-    if s == nil then return self.logger:warning("Could not retrieve from socket!  Reason: " .. tostring(m)) end
-    if s == '' then return end  -- Ignore empty responses
+    if self:pending() <= 0 then return status end
     
-    -- If we could successfully read from the socket, we'll dispatch the payload.
-    self.logger.info("Retrieved message: " .. tostring(s))
-    self:dispatch(tostring(s))
+    local start = socket.gettime()
+    local elapsed = 0
+    
+    repeat
+        local line = self.inbox[self.inboxHead]
+        
+        self.inbox[self.inboxHead] = nil
+        self.inboxHead = self.inboxHead + 1
+        stats.dispatched = stats.dispatched + 1
+        
+        self:dispatch(line)
+        elapsed = socket.gettime() - start
+    until elapsed >= self.budget or self:pending() <= 0
+    
+    if self:pending() > 0 then
+        stats.carried = stats.carried + 1
+    else
+        -- The inbox is empty, so its indices start over.
+        self.inboxHead = 1
+        self.inboxTail = 0
+    end
+    
+    if elapsed > self.budget then
+        stats.overBudget = stats.overBudget + 1
+        stats.worst = math.max(stats.worst, elapsed)
+        
+        self.logger:debug(string.format("Dispatching took %.1fms, over the %.1fms budget; %d payloads carried over", elapsed * 1000, self.budget * 1000, self:pending()))
+    end
+    
+    return status
 end
 
 ---
@@ -232,21 +711,77 @@ function PseudoWS:connect(host, port)
     -- Attempt to connect to the remote specified.
     local s, m = self.socket:connect(self.host, tonumber(self.port))
     
+    -- Non-blocking sockets usually can't connect straight away, so the
+    -- connection is finished by `processMessage` once it's made.
+    if not s and m == "timeout" then
+        self.connecting = socket.gettime()
+        return m
+    end
+    
     -- If we couldn't connect, we'll log it, then return.
     if not s then
         self.logger:warning(string.format("Could not connect to %s:%d !  Reason: %s", tostring(host), tonumber(port), tostring(m)))
         return m
     end
     
+    -- Resume our session, if we had one, before anything else is sent.
+    self:handshake()
+    
     return tonumber(s) == 1  -- This should always be true, but we'll add this check just in case.
 end
 
+---
+--- Finishes a pending connection, once the socket becomes writable.
+---
+--- Connections that take longer than `connectTimeout` seconds are
+--- abandoned.
+---
+---@return string|nil @"closed" if the connection couldn't be made
+function PseudoWS:finishConnect()
+    local _, writable = socket.select(nil, { self.socket }, 0)
+    
+    if writable[self.socket] == nil then
+        if socket.gettime() - self.connecting < self.connectTimeout then return end
+        
+        self.connecting = nil
+        self.logger:warning(string.format("Could not connect to %s:%d !  Reason: timed out", tostring(self.host), tonumber(self.port)))
+        
+        return "closed"
+    end
+    
+    self.connecting = nil
+    
+    -- Connecting again reports how the pending connection went.
+    local s, m = self.socket:connect(self.host, tonumber(self.port))
+    
+    if not s and m ~= "already connected" then
+        self.logger:warning(string.format("Could not connect to %s:%d !  Reason: %s", tostring(self.host), tonumber(self.port), tostring(m)))
+        
+        return "closed"
+    end
+    
+    -- Resume our session, if we had one, before anything else is sent.
+    self:handshake()
+end
+
 ---
 --- Disconnects from the remote.
 ---
 function PseudoWS:disconnect()
     if self.socket ~= nil then self.socket:close() end
     if self.listener ~= nil then self.listener = nil end
+    
+    -- The session is kept so it can be resumed on reconnection.  Lines
+    -- already in the inbox are still dispatched, and queued payloads are
+    -- still sent, but raw lines belonged to the old connection.
+    self.socket = nil
+    self.partial = nil
+    self.wire = {}
+    self.unsent = nil
+    self.established = false
+    self.connecting = nil
+    self.handshaking = false
+    self.handshakeSent = nil
 end
 
 return PseudoWS
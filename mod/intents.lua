@@ -269,3 +269,6 @@ intents["collectible.query.cost.devil"] = function(collectible)
     
     return Isaac.GetItemConfig():GetCollectible(collectible).DevilPrice * 2
 end
+
+
+return intents
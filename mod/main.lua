@@ -236,6 +236,7 @@ function Metadata:getApiVersion() return self.api end
 ---@field http PseudoWS
 ---@field state number
 ---@field metadata Metadata
+---@field standings table<number, table>
 local DescentIsaac = {}
 DescentIsaac.__index = DescentIsaac
 
@@ -270,19 +271,39 @@ function DescentIsaac:prepare()
     self.inst = RegisterMod(self.metadata:getName(), self.metadata:getApiVersion())
     
     self.logger:info("Injecting config intent...")
-    self.http.intents.state = {
-        config = {
-            ---@param c table
-            update = function(c)
-                local rng = config.rng  -- TODO: Implement RNG settings in client
-                
-                config = c
-                c.rng = rng
-                
-                self.logger:info("Config updated!")
-            end
-        }
-    }
+    
+    ---@param c table
+    self.http:addIntent("state.config.update", function(c)
+        local rng = config.rng  -- TODO: Implement RNG settings in client
+        
+        config = c
+        c.rng = rng
+        
+        self.logger:info("Config updated!")
+        
+        -- The config is only sent at the start of a session, so this is
+        -- the one time the other half needs the catalog.
+        self:sendCatalog()
+    end)
+    
+    self.logger:info("Injecting HUD intents...")
+    self.standings = {}
+    
+    self.http:addIntent("hud.standings", function(...) self:updateStandings({ ... }) end)
+    
+    self.logger:info("Injecting item pool middleware...")
+    
+    -- The other half keeps its own copy of the item pools for generating
+    -- choices, so it has to be told whenever an item leaves the pool.
+    self.http:use(function(path, nxt, ...)
+        local result = nxt(...)
+        
+        if path == "player.grant.collectible" or path == "player.grant.devil" then
+            self.http:sendMessage("rng.items.remove", { tostring(...) })
+        end
+        
+        return result
+    end)
 end
 
 ---
@@ -292,6 +313,11 @@ function DescentIsaac:initialize()
     self.logger:info("Initializing Decision Descent...")
     self.logger:info(string.format("Decision Descent v%s", tostring(self.metadata.getVersion())))
     
+    -- The config is replaced by the other half's once connected, so the
+    -- budgets are applied beforehand.
+    self.scheduler.budget = ((config.scheduler or {}).budget or 6) / 1000
+    self.http.budget = (config.http.budget or 4) / 1000
+    
     if not self.scheduler.running then
         self.logger:info("Starting scheduler...")
         self.scheduler:start()
@@ -299,12 +325,30 @@ function DescentIsaac:initialize()
     
     if not self.http.socket then
         self.logger:info("Connecting to remote...")
-        self.http:connect()
+        
+        local result = self.http:connect(config.http.host, config.http.port)
+        
+        if result ~= true and result ~= "timeout" then self:reconnect() end
     end
     
     self.state = const.states.SET_UP
 end
 
+---
+--- Reconnects to the remote after a second, so a client that isn't running
+--- isn't retried every frame.
+---
+function DescentIsaac:reconnect()
+    self.http:disconnect()
+    
+    self.scheduler:later(1, function()
+        local result = self.http:connect(config.http.host, config.http.port)
+        
+        -- Pending connections are finished, or abandoned, by the HTTP reader.
+        if result ~= true and result ~= "timeout" then self:reconnect() end
+    end)
+end
+
 ---
 --- Schedules tasks for recurring execution.
 ---
@@ -315,10 +359,13 @@ function DescentIsaac:schedule()
     self.scheduler:schedule(
             function()
                 if self.http:processMessage() == 'closed' then
-                    self.http:connect()
+                    -- The session survives the reconnection, so only missed
+                    -- payloads are exchanged.
+                    self:reconnect()
                 end
             end,
-            true
+            true,
+            scheduler.priorities.HIGH
     )
 end
 
@@ -344,6 +391,98 @@ function DescentIsaac:registerCallbacks()
     self.logger:info("Registered %d callbacks!", tonumber(c))
 end
 
+---
+--- Sends the other half a catalog of every collectible and trinket, so
+--- polls can reference items by their id alone.
+---
+function DescentIsaac:sendCatalog()
+    local iConfig = Isaac.GetItemConfig()
+    local entries = {}
+    
+    for id = 1, iConfig:GetCollectibles().Size - 1 do
+        local item = iConfig:GetCollectible(id)
+        
+        if item ~= nil then entries[#entries + 1] = { "collectible", tostring(id), item.Name } end
+    end
+    
+    for id = 1, iConfig:GetTrinkets().Size - 1 do
+        local trinket = iConfig:GetTrinket(id)
+        
+        if trinket ~= nil then entries[#entries + 1] = { "trinket", tostring(id), trinket.Name } end
+    end
+    
+    self.logger:info(string.format("Sending catalog of %d entries...", #entries))
+    self.http:sendMessage("catalog.update", entries, nil, nil, "catalog.update")
+end
+
+---
+--- Applies a batch of poll standings from the other half.
+---
+--- Each entry is a flat array holding a poll's id, the seconds left on its
+--- timer, and the votes cast, followed by pairs of choices and their counts.
+--- Only counts that changed are sent, and an entry holding nothing but the
+--- poll's id means the poll is gone.
+---
+---@param entries table
+function DescentIsaac:updateStandings(entries)
+    local frame = Isaac.GetFrameCount()
+    local iConfig = Isaac.GetItemConfig()
+    
+    for _, entry in ipairs(entries) do
+        local uid = entry[1]
+        local poll = self.standings[uid]
+        
+        if #entry == 1 then
+            self.standings[uid] = nil
+        else
+            if poll == nil then
+                poll = { counts = {}, labels = {}, order = {} }
+                self.standings[uid] = poll
+            end
+            
+            poll.remaining = entry[2]
+            poll.votes = entry[3]
+            poll.frame = frame
+            
+            for i = 4, #entry - 1, 2 do
+                local choice = entry[i]
+                
+                -- Labels are only looked up the first time a choice is seen.
+                if poll.counts[choice] == nil then
+                    local item = tonumber(choice) ~= nil and iConfig:GetCollectible(tonumber(choice)) or nil
+                    
+                    poll.order[#poll.order + 1] = choice
+                    poll.labels[choice] = item ~= nil and item.Name or choice
+                end
+                
+                poll.counts[choice] = entry[i + 1]
+            end
+        end
+    end
+end
+
+---
+--- Renders the standings of every running poll.
+---
+function DescentIsaac:renderStandings()
+    local frame = Isaac.GetFrameCount()
+    local y = 40
+    
+    for uid, poll in pairs(self.standings) do
+        -- The timer is counted down locally between updates; the game
+        -- renders 60 frames per second.
+        local remaining = math.max(0, poll.remaining - math.floor((frame - poll.frame) / 60))
+        
+        Isaac.RenderScaledText(string.format("Poll #%d  %ds  %d votes", uid, remaining, poll.votes), 50, y, 0.5, 0.5, 1.0, 1.0, 1.0, 0.8)
+        y = y + 8
+        
+        for _, choice in ipairs(poll.order) do
+            Isaac.RenderScaledText(string.format("%s  %d", poll.labels[choice], poll.counts[choice]), 56, y, 0.5, 0.5, 1.0, 1.0, 1.0, 0.8)
+            y = y + 8
+        end
+    end
+end
+
 ---
 --- Schedules a new collectible poll to be sent to the
 --- other half.
@@ -388,113 +527,122 @@ end
 ---
 --- Schedules a poll to be generated.
 ---
+--- Everything the poll sends is sent to the other half as a single batch.
+---
 function DescentIsaac:generatePoll()
-    self.scheduler:schedule(
-            function()
-                self.logger:info("Generating poll...")
-                
-                local mChoices = config.polls.choices.maximum
-                local game = Game()
-                local room = game:GetRoom()
-                local rType = room:GetType()
-                local rSeed = room:GetAwardSeed()
-                local iConfig = Isaac.GetItemConfig()
-                local iPool = game:GetItemPool()
-                local rng = RNG()
-                local choices = {}
-                
-                rng:SetSeed(rSeed)
-                
-                if config.polls == nil or config.polls.maximum_choices == nil then mChoices = 10 end
-                if config.polls.maximum_choices < 0 then mChoices = 10 end
-                if config.polls.maximum_choices >= 0 then mChoices = config.polls.maximum_choices end
-                
-                local rPool = iPool:GetPoolForRoom(rType, rSeed)
-                local rSpecs = config.rng.rooms[tostring(rType)]
-                
-                if rSpecs ~= nil and rng:RandomInt(rSpecs.maximum) > rSpecs.minimum then return end
-                
-                
-                -- Since Isaac doesn't let you peek at item pools, we'll
-                -- have to constantly get new items until unique ones
-                -- pop up.
-                local t = 0
-                
-                while #choices < #mChoices do
-                    local c = iPool:GetCollectible(rPool, false, rSeed)
-                    
-                    if c == nil then t = t + 1 end
-                    if t >= 3 then break end
-                    
-                    local i = iConfig:GetCollectible(c)
-                    local dup = false
-                    
-                    for a = 1, #choices do
-                        if choices[a] == c then
-                            dup = true
-                        end
-                    end
-                    
-                    if not dup then choices[#choices + 1] = { id = i.ID, name = i.Name } end
-                end
-                
-                if #choices <= 1 then return self.logger:warning("Could not generate enough options for a poll!") end
-                
-                
-                -- Iterate over the choices so we can alias item IDs to their item names.
-                -- Transforming the item name into aliases should be handled by the other half.
-                local dChoices = {}
-                local aliases = {}
-                for _, item in pairs(choices) do
-                    local dChoice = tostring(item.ID)
-                    dChoices[#dChoices + 1] = dChoice
-                    
-                    if aliases[dChoice] == nil then aliases[dChoice] = {} end
-                    
-                    table.insert(aliases[dChoice], item.Name)
-                end
-                
-                -- Time for the mess that is poll generation
-                if rSpecs == nil then
-                    -- If there is no spec defined for the room, we'll use the defaults
-                    -- which are:
-                    --
-                    -- DEVIL / BLACK MARKET » Send a devil poll
-                    -- ANYTHING ELSE        » Send a regular poll
-                    if rType ~= RoomType.ROOM_DEVIL then
-                        self.http:sendMessage("polls.create", dChoices, aliases, "player.grant.collectible")
-                    elseif rType == RoomType.ROOM_DEVIL or rType == RoomType.ROOM_BLACK_MARKET then
-                        self.http:sendMessage("polls.multi.create", dChoices, aliases, "player.grant.devil")
-                    end
+    self.scheduler:schedule(function()
+        self.http:beginBatch()
+        
+        -- The batch is always ended, so a failure can't hold back every
+        -- payload sent after it.
+        local success, m = pcall(self.createPoll, self)
+        
+        self.http:endBatch()
+        
+        if not success then self.logger:warning(string.format("Could not generate poll!  %s", tostring(m))) end
+    end, false)
+end
+
+---
+--- Generates a poll for the current room, and sends it to the other half.
+---
+function DescentIsaac:createPoll()
+    self.logger:info("Generating poll...")
+    
+    local mChoices = config.polls.choices.maximum
+    local game = Game()
+    local room = game:GetRoom()
+    local rType = room:GetType()
+    local rSeed = room:GetAwardSeed()
+    local iConfig = Isaac.GetItemConfig()
+    local iPool = game:GetItemPool()
+    local rng = RNG()
+    local choices = {}
+    
+    rng:SetSeed(rSeed)
+    
+    if config.polls == nil or config.polls.maximum_choices == nil then mChoices = 10 end
+    if config.polls.maximum_choices < 0 then mChoices = 10 end
+    if config.polls.maximum_choices >= 0 then mChoices = config.polls.maximum_choices end
+    
+    local rPool = iPool:GetPoolForRoom(rType, rSeed)
+    local rSpecs = config.rng.rooms[tostring(rType)]
+    
+    if rSpecs ~= nil and rng:RandomInt(rSpecs.maximum) > rSpecs.minimum then return end
+    
+    
+    -- Since Isaac doesn't let you peek at item pools, we'll
+    -- have to constantly get new items until unique ones
+    -- pop up.
+    local t = 0
+    
+    while #choices < #mChoices do
+        local c = iPool:GetCollectible(rPool, false, rSeed)
+        
+        if c == nil then t = t + 1 end
+        if t >= 3 then break end
+        
+        local i = iConfig:GetCollectible(c)
+        local dup = false
+        
+        for a = 1, #choices do
+            if choices[a] == c then
+                dup = true
+            end
+        end
+        
+        if not dup then choices[#choices + 1] = { id = i.ID, name = i.Name } end
+    end
+    
+    if #choices <= 1 then return self.logger:warning("Could not generate enough options for a poll!") end
+    
+    
+    -- Choices are only sent as item IDs; the other half resolves
+    -- their names and aliases from the catalog it was sent.
+    local dChoices = {}
+    local aliases = {}
+    for _, item in pairs(choices) do
+        dChoices[#dChoices + 1] = tostring(item.id)
+    end
+    
+    -- Time for the mess that is poll generation
+    if rSpecs == nil then
+        -- If there is no spec defined for the room, we'll use the defaults
+        -- which are:
+        --
+        -- DEVIL / BLACK MARKET » Send a devil poll
+        -- ANYTHING ELSE        » Send a regular poll
+        if rType ~= RoomType.ROOM_DEVIL then
+            self.http:sendMessage("polls.create", dChoices, aliases, "player.grant.collectible")
+        elseif rType == RoomType.ROOM_DEVIL or rType == RoomType.ROOM_BLACK_MARKET then
+            self.http:sendMessage("polls.multi.create", dChoices, aliases, "player.grant.devil")
+        end
+    else
+        -- If there is a spec for the room, we'll use that instead.
+        --
+        -- If the spec says a devil poll can be generated, we'll roll
+        -- the RNG to see if a non-devil room is going to be one.
+        --
+        -- If the spec doesn't define a devil poll value, or the value
+        -- is false, we'll use the defaults.
+        if rSpecs.devil then
+            if rType ~= RoomType.ROOM_DEVIL then
+                if rng:RandomInt(rSpecs.maximum) <= rSpecs.devil then
+                    self.http:sendMessage("polls.multi.create", dChoices, aliases, "player.grant.devil")
                 else
-                    -- If there is a spec for the room, we'll use that instead.
-                    --
-                    -- If the spec says a devil poll can be generated, we'll roll
-                    -- the RNG to see if a non-devil room is going to be one.
-                    --
-                    -- If the spec doesn't define a devil poll value, or the value
-                    -- is false, we'll use the defaults.
-                    if rSpecs.devil then
-                        if rType ~= RoomType.ROOM_DEVIL then
-                            if rng:RandomInt(rSpecs.maximum) <= rSpecs.devil then
-                                self.http:sendMessage("polls.multi.create", dChoices, aliases, "player.grant.devil")
-                            else
-                                self.http:sendMessage("polls.create", dChoices, aliases, "player.grant.collectible")
-                            end
-                        elseif rType == RoomType.ROOM_DEVIL or rType == RoomType.ROOM_BLACK_MARKET then
-                            self.http:sendMessage("polls.multi.create", dChoices, aliases, "player.grant.devil")
-                        end
-                    else
-                        if rType ~= RoomType.ROOM_DEVIL then
-                            self.http:sendMessage("polls.create", dChoices, aliases, "player.grant.collectible")
-                        elseif rType == RoomType.ROOM_DEVIL or roomType == RoomType.ROOM_BLACK_MARKET then
-                            self.http:sendMessage("polls.multi.create", dChoices, aliases, "player.grant.devil")
-                        end
-                    end
+                    self.http:sendMessage("polls.create", dChoices, aliases, "player.grant.collectible")
                 end
-            end,
-            false
-    )
+            elseif rType == RoomType.ROOM_DEVIL or rType == RoomType.ROOM_BLACK_MARKET then
+                self.http:sendMessage("polls.multi.create", dChoices, aliases, "player.grant.devil")
+            end
+        else
+            if rType ~= RoomType.ROOM_DEVIL then
+                self.http:sendMessage("polls.create", dChoices, aliases, "player.grant.collectible")
+            elseif rType == RoomType.ROOM_DEVIL or roomType == RoomType.ROOM_BLACK_MARKET then
+                self.http:sendMessage("polls.multi.create", dChoices, aliases, "player.grant.devil")
+            end
+        end
+    end
 end
 
 
@@ -503,13 +651,14 @@ end
 --- Invoked when the player starts a new run.
 ---
 --- This callback is responsible for notifying the other half to remove any
---- current polls running.
+--- current polls running, and to reseed its item pools for the new run.
 ---
 function DescentIsaac.MC_POST_GAME_STARTED(isSave)
     if isSave then return end
     
     DescentIsaac.scheduler:schedule(function()
         DescentIsaac.http:sendMessage("polls.delete", { "*" })
+        DescentIsaac.http:sendMessage("rng.seed", { Game():GetSeeds():GetStartSeed() }, nil, nil, "rng.seed")
     end, false)
 end
 
@@ -535,7 +684,7 @@ end
 ---
 function DescentIsaac.MC_POST_NEW_LEVEL()
     DescentIsaac.scheduler:schedule(function()
-        DescentIsaac.http:sendMessage("client.state.level.changed")
+        DescentIsaac.http:sendMessage("client.state.level.changed", nil, nil, nil, "state.level")
     end, false)
 end
 
@@ -544,7 +693,8 @@ end
 --- ours.
 ---
 --- This callback is responsible for displaying the version text at the
---- bottom-center of the screen, and ensuring boss room collectibles are removed.
+--- bottom-center of the screen, the standings of running polls, and ensuring
+--- boss room collectibles are removed.
 ---
 function DescentIsaac.MC_POST_RENDER()
     if config.hud.enabled then
@@ -555,6 +705,8 @@ function DescentIsaac.MC_POST_RENDER()
         local rX = math.abs(math.floor(tonumber(sX) / 3) - Isaac.GetTextWidth(vText))
         
         Isaac.RenderScaledText(vText, rX, sY - 35, 0.5, 0.5, 1.0, 1.0, 1.0, 0.8)
+        
+        DescentIsaac:renderStandings()
     end
     
     -- Every half an in-game second, we'll check to see if the player is in the
@@ -585,16 +737,11 @@ function DescentIsaac.MC_POST_RENDER()
 end
 
 ---
---- Invoked when the player switches rooms.
+--- Checks whether or not the current room should have a poll generated for
+--- it; that is, whether it's a *new*, supported room.
 ---
---- This callback is responsible for ensuring a poll is generated when the
---- player enters a *new*, supported room.
----
-function DescentIsaac.MC_POST_NEW_ROOM()
-    DescentIsaac.scheduler.schedule(function()
-        DescentIsaac.http:sendMessage("client.state.room.changed")
-    end, false)
-    
+---@return boolean
+function DescentIsaac:isPollRoom()
     local game = Game()
     local cRoom = game:GetRoom()
     local cLevel = game:GetLevel()
@@ -604,50 +751,76 @@ function DescentIsaac.MC_POST_NEW_ROOM()
     -- Ensure the current room is supported
     local supported = rType == RoomType.ROOM_ERROR or rType == RoomType.ROOM_TREASURE or rType == RoomType.ROOM_BOSS or rType == RoomType.ROOM_CURSE or rType == RoomType.ROOM_DEVIL or rType == RoomType.ROOM_ANGEL or rType == RoomType.ROOM_BLACK_MARKET
     
-    if not supported then return end
-    if not cRoom:IsFirstVisit() then return end
+    if not supported then return false end
+    if not cRoom:IsFirstVisit() then return false end
     
     
     -- Now it's time for another mess that is level checks and room checks.
     if lType == LevelStage.STAGE7 then
         -- The Void checks
         if supported and cRoom:GetDeliriumDistance() > 0 then
-            DescentIsaac:generatePoll()
+            return true
         end
     elseif lType == LevelStage.STAGE5 or lType == LevelStage.STAGE6 then
         if supported and not cRoom:IsCurrentRoomLastBoss() then
             -- Ignore Isaac/Satan boss room
-            DescentIsaac:generatePoll()
+            return true
         end
     elseif lType == LevelStage.STAGE3_2 or (lType == LevelStage.STAGE3_1 and cLevel:GetCurses() == LevelCurse.CURSE_OF_LABYRINTH) then
         if supported and not cRoom:IsCurrentRoomLastBoss() then
             -- Ignore the Mom boss room
-            DescentIsaac:generatePoll()
+            return true
         end
     elseif lType == LevelStage.STAGE4_2 or (lType == LevelStage.STAGE4_1 and cLevel:GetCurses() == LevelCurse.CURSE_OF_LABYRINTH) then
-        if supported and not currentRoom:IsCurrentRoomLastBoss() then
+        if supported and not cRoom:IsCurrentRoomLastBoss() then
             -- Ignore the It Lives! / Mom's Heart boss room
-            DescentIsaac:generatePoll()
+            return true
         end
     elseif lType == LevelStage.STAGE4_3 then
         if supported and rType ~= RoomType.ROOM_BOSS then
             -- Ignore Hushy's room
-            DescentIsaac:generatePoll()
+            return true
         end
     elseif supported then
-        DescentIsaac:generatePoll()
+        return true
     end
+    
+    return false
+end
+
+---
+--- Invoked when the player switches rooms.
+---
+--- This callback is responsible for ensuring a poll is generated when the
+--- player enters a *new*, supported room.
+---
+function DescentIsaac.MC_POST_NEW_ROOM()
+    local poll = DescentIsaac:isPollRoom()
+    
+    -- The room change and the room's poll are sent as a single batch.
+    DescentIsaac.scheduler:schedule(function()
+        DescentIsaac.http:beginBatch()
+        DescentIsaac.http:sendMessage("client.state.room.changed", nil, nil, nil, "state.room")
+        
+        local success, m = true, nil
+        
+        if poll then success, m = pcall(DescentIsaac.createPoll, DescentIsaac) end
+        
+        DescentIsaac.http:endBatch()
+        
+        if not success then DescentIsaac.logger:warning(string.format("Could not generate poll!  %s", tostring(m))) end
+    end, false)
 end
 
 ---
 --- Invoked when the game finishes processing events.
 ---
---- This callback is responsible for ensuring the scheduler is always running.
+--- This callback is responsible for running a frame's worth of scheduled
+--- tasks, then sending everything they queued for the other half.
 ---
 function DescentIsaac.MC_POST_UPDATE()
-    if Isaac.GetFrameCount() % 30 == 0 then
-        DescentIsaac.scheduler:start()  -- Ensure the scheduler is always running
-    end
+    DescentIsaac.scheduler:update()
+    DescentIsaac.http:flush()
 end
 
 
@@ -25,99 +25,347 @@
 -- see <https://www.gnu.org/licenses/>.
 ------------------------------------------------
 
+--[[  Requires  ]]--
+-- The socket library has a precise clock, but it's only available when the
+-- game is launched with debugging libraries.
+local hasSocket, socket = pcall(require, "socket")
+
+---@return number @The current time, in seconds
+local clock = hasSocket and socket.gettime or function() return Isaac.GetTime() / 1000 end
+
+
+--[[  Classes  ]]--
+---
+--- A first-in, first-out queue stored in a ring buffer, so pushing and
+--- popping never shift the other entries.
+---
+---@class Queue
+---@field items table
+---@field head number @The index of the oldest entry
+---@field size number
+---@field capacity number
+local Queue = {}
+Queue.__index = Queue
+
+---
+--- Creates a new queue.
+---
+---@param capacity number @The number of entries the queue holds before growing
+---@return Queue
+function Queue.new(capacity)
+    return setmetatable({ items = {}, head = 1, size = 0, capacity = capacity or 16 }, Queue)
+end
+
+---
+--- Adds an entry to the back of the queue.
+---
+---@param item any
+function Queue:push(item)
+    -- Full queues are unrolled into a buffer twice their size.
+    if self.size == self.capacity then
+        local items = {}
+        
+        for i = 1, self.size do items[i] = self.items[(self.head + i - 2) % self.capacity + 1] end
+        
+        self.items = items
+        self.head = 1
+        self.capacity = self.capacity * 2
+    end
+    
+    self.items[(self.head + self.size - 1) % self.capacity + 1] = item
+    self.size = self.size + 1
+end
+
+---
+--- Removes the entry at the front of the queue.
+---
+---@return any|nil
+function Queue:pop()
+    if self.size == 0 then return nil end
+    
+    local item = self.items[self.head]
+    
+    self.items[self.head] = nil
+    self.head = self.head % self.capacity + 1
+    self.size = self.size - 1
+    
+    return item
+end
+
+---
+--- A binary min-heap of tasks ordered by when they're due.
+---
+---@class Timeline
+---@field items Task[]
+local Timeline = {}
+Timeline.__index = Timeline
+
+---
+--- Creates a new timeline.
+---
+---@return Timeline
+function Timeline.new() return setmetatable({ items = {} }, Timeline) end
+
+---
+--- Adds a task to the timeline.
+---
+---@param task Task
+function Timeline:push(task)
+    local items = self.items
+    local i = #items + 1
+    
+    items[i] = task
+    
+    while i > 1 do
+        local parent = math.floor(i / 2)
+        
+        if items[parent].due <= items[i].due then break end
+        
+        items[parent], items[i] = items[i], items[parent]
+        i = parent
+    end
+end
+
+---
+--- Removes the earliest task, if it's due.
+---
+---@param now number
+---@return Task|nil
+function Timeline:pop(now)
+    local items = self.items
+    local count = #items
+    
+    if count == 0 or items[1].due > now then return nil end
+    
+    local task = items[1]
+    
+    items[1] = items[count]
+    items[count] = nil
+    count = count - 1
+    
+    local i = 1
+    
+    while true do
+        local smallest, left, right = i, i * 2, i * 2 + 1
+        
+        if left <= count and items[left].due < items[smallest].due then smallest = left end
+        if right <= count and items[right].due < items[smallest].due then smallest = right end
+        if smallest == i then break end
+        
+        items[smallest], items[i] = items[i], items[smallest]
+        i = smallest
+    end
+    
+    return task
+end
+
 ---@class Task
+---@field func function @The function to call
+---@field persist boolean @Whether the task runs again on every following frame
+---@field priority number
+---@field due number @When a delayed task is due, in frames or seconds
 local Task = {}
-Task.__index = {}
+Task.__index = Task
 
 ---
 --- Creates a new task
 ---
 ---@param f function  @The function to call
 ---@param p boolean  @An indicator that this task should rejoin the queue once the function has been called.
+---@param priority number
 ---@return Task
-function Task.new(f, p)
-    return setmetatable({ func = f, persist = p, __call = f, __newindex = function() end }, Task)
+function Task.new(f, p, priority)
+    return setmetatable({ func = f, persist = p == true, priority = priority, due = 0 }, Task)
 end
 
 ---
 --- Whether or not the task should be revived.
 ---
 ---@return boolean
-function Task:revivable() return p end
+function Task:revivable() return self.persist end
 
 ---
---- Schedulers are responsible for managing methods that should be called away
---- from the main thread.  Methods that do not request a revival will be removed
---- from the task list.
+--- Schedulers are responsible for spreading work across frames.  Tasks are
+--- run from the mod's update callback, most urgent first, until the frame's
+--- time budget is spent; whatever doesn't fit waits for the next frame.
+--- Tasks may also be delayed by a number of frames or seconds.
+---
+--- Methods that do not request a revival will be removed from the task list.
+--- Revived tasks run once per frame.
 ---
 ---@class Scheduler
----@field tasks Task[]
----@field thread thread
+---@field queues Queue[] @The tasks ready to run, one queue per priority
+---@field frames Timeline @Tasks delayed by a number of frames
+---@field timers Timeline @Tasks delayed by a number of seconds
+---@field frame number @The number of frames the scheduler has run
+---@field budget number @The number of seconds per frame tasks may take
 ---@field running boolean
+---@field stats table<string, number> @Counters describing how the budget is being spent
 local Scheduler = {}
 Scheduler.__index = Scheduler
 
+---@type table<string, number>
+Scheduler.priorities = { HIGH = 1, NORMAL = 2, LOW = 3 }
+
 ---
 --- Creates a new scheduler.
 ---
+---@param budget number @The number of seconds per frame tasks may take
 ---@return Scheduler
-function Scheduler.new()
+function Scheduler.new(budget)
+    local queues = {}
+    
+    for _, priority in pairs(Scheduler.priorities) do queues[priority] = Queue.new() end
+    
     return setmetatable(
             {
-                tasks = {},
-                thread = nil,
-                running = false
+                queues = queues,
+                frames = Timeline.new(),
+                timers = Timeline.new(),
+                frame = 0,
+                budget = budget or 0.004,
+                running = false,
+                stats = { frames = 0, ran = 0, overBudget = 0, carried = 0, worst = 0 }
             },
             Scheduler
     )
 end
 
 ---
---- Schedules a function to be run in the coroutine system.
+--- Schedules a function to be run on an upcoming frame.
 ---
 ---@param f function
 ---@param revive boolean  @Whether or not the function should be re-queued when it finishes executing.
-function Scheduler:schedule(f, revive)
+---@param priority number  @One of `Scheduler.priorities`; defaults to NORMAL
+---@return Task|nil
+function Scheduler:schedule(f, revive, priority)
+    if type(f) ~= "function" then return end
+    
+    local task = Task.new(f, revive, priority or Scheduler.priorities.NORMAL)
+    self.queues[task.priority]:push(task)
+    
+    return task
+end
+
+---
+--- Schedules a function to be run once a number of frames have passed.
+---
+---@param frames number
+---@param f function
+---@param priority number  @One of `Scheduler.priorities`; defaults to NORMAL
+---@return Task|nil
+function Scheduler:after(frames, f, priority)
     if type(f) ~= "function" then return end
-    if revive == nil then revive = false end
     
-    table.insert(self.tasks, Task.new(f, revive))
+    local task = Task.new(f, false, priority or Scheduler.priorities.NORMAL)
+    task.due = self.frame + math.max(1, frames)
+    self.frames:push(task)
+    
+    return task
+end
+
+---
+--- Schedules a function to be run once a number of seconds have passed.
+---
+---@param seconds number
+---@param f function
+---@param priority number  @One of `Scheduler.priorities`; defaults to NORMAL
+---@return Task|nil
+function Scheduler:later(seconds, f, priority)
+    if type(f) ~= "function" then return end
+    
+    local task = Task.new(f, false, priority or Scheduler.priorities.NORMAL)
+    task.due = clock() + seconds
+    self.timers:push(task)
+    
+    return task
 end
 
 ---
 --- Initiates the scheduler.
 ---
 function Scheduler:start()
-    if self.thread ~= nil and coroutine.status(self.thread) == "running" then return end
-    if self.thread ~= nil and coroutine.status(self.thread) == "paused" then return coroutine.resume(self.thread) end
-    
     self.running = true
+end
+
+---
+--- Stops the scheduler.  Queued tasks are kept until it's started again.
+---
+function Scheduler:stop()
+    self.running = false
+end
+
+---
+--- Returns the number of tasks waiting to run, excluding delayed tasks.
+---
+---@return number
+function Scheduler:pending()
+    local count = 0
     
-    self.thread = coroutine.create(function()
-        while self.running do
-            if self.tasks then
-                local t = self.tasks[1]  ---@type Task
-                
-                pcall(t)
-                table.remove(self.tasks, 1)
-                
-                if t:revivable() then
-                    table.insert(self.tasks, t)
-                end
-            end
-        end
-    end)
+    for _, queue in ipairs(self.queues) do count = count + queue.size end
     
-    coroutine.start(self.thread)
+    return count
 end
 
 ---
---- Stops the scheduler.
+--- Runs a single frame's worth of tasks.
 ---
-function Scheduler:stop()
-    if self.thread == nil then return false end
+--- This should be called once per frame, from the mod's update callback.
+--- At least one task is run per frame, so the queues always make progress.
+---
+function Scheduler:update()
+    if not self.running then return end
     
-    self.running = false
+    local stats = self.stats
+    local start = clock()
+    local revived = {}
+    local elapsed = 0
+    local ran = 0
+    
+    self.frame = self.frame + 1
+    stats.frames = stats.frames + 1
+    
+    -- Delayed tasks that are due join their queues.
+    local task = self.frames:pop(self.frame)
+    
+    while task ~= nil do
+        self.queues[task.priority]:push(task)
+        task = self.frames:pop(self.frame)
+    end
+    
+    task = self.timers:pop(start)
+    
+    while task ~= nil do
+        self.queues[task.priority]:push(task)
+        task = self.timers:pop(start)
+    end
+    
+    for _, queue in ipairs(self.queues) do
+        while queue.size > 0 and (ran == 0 or elapsed < self.budget) do
+            task = queue:pop()
+            
+            local s, m = pcall(task.func)
+            if not s then Isaac.DebugString(string.format("[Scheduler] Task failed with the following error: %s", tostring(m))) end
+            
+            -- Revived tasks wait for the next frame, so they can't monopolize
+            -- this one.
+            if task:revivable() then revived[#revived + 1] = task end
+            
+            ran = ran + 1
+            elapsed = clock() - start
+        end
+    end
+    
+    for _, t in ipairs(revived) do self.queues[t.priority]:push(t) end
+    
+    stats.ran = stats.ran + ran
+    
+    if self:pending() > #revived then stats.carried = stats.carried + 1 end
+    
+    if elapsed > self.budget then
+        stats.overBudget = stats.overBudget + 1
+        stats.worst = math.max(stats.worst, elapsed)
+    end
 end
 
 return Scheduler
@@ -0,0 +1,118 @@
+# This file is part of Decision Descent.
+#
+# Decision Descent is free software:
+# you can redistribute it
+# and/or modify it under the
+# terms of the GNU General
+# Public License as published by
+# the Free Software Foundation,
+# either version 3 of the License,
+# or (at your option) any later
+# version.
+#
+# Decision Descent is distributed in
+# the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without
+# even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A
+# PARTICULAR PURPOSE.  See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the
+# GNU General Public License along with
+# Decision Descent.  If not,
+# see <https://www.gnu.org/licenses/>.
+"""Measures what argument schemas add to decoding a message from the mod.
+
+For a handful of representative payloads, the script times decoding without
+a schema, decoding with the intent's schema, and dispatching the decoded
+message through a router, with the profiler's middleware, to a handler that
+does nothing.  Validation should cost about as much as the dispatch it
+protects; real handlers cost more than both.
+
+Usage:  python "scripts/Benchmark Schemas.py" --bot <ShovelBot directory>"""
+import argparse
+import importlib
+import json
+import logging
+import sys
+import timeit
+import typing
+
+
+def payloads(logic) -> typing.Dict[str, typing.Tuple[dict, typing.Any]]:
+    """Returns the payloads to time, along with their intents' schemas."""
+    choices = logic.Schema(varargs=str, extra=logic.ListOf(str))
+    
+    return {
+        'polls.create': (
+            {'intent': 'polls.create', 'args': ['105', '114', '118'],
+             'kwargs': {'105': ["The D6"], '114': ["Mom's Knife"], '118': ['Brimstone']},
+             'reply': 'player.grant.collectible'},
+            choices
+        ),
+        'polls.delete': (
+            {'intent': 'polls.delete', 'args': ['*']},
+            logic.Schema(str)
+        ),
+        'rng.pool.update': (
+            {'intent': 'rng.pool.update', 'args': ['treasure', {str(i): 1 + i % 3 for i in range(1, 200)}]},
+            logic.Schema(str, logic.MapOf(float))
+        ),
+        'batch': (
+            {'intent': 'batch', 'args': [{'intent': 'polls.delete', 'args': ['*']}] * 10,
+             'kwargs': {'atomic': True}},
+            logic.Schema(varargs=dict, kwargs={'atomic': bool})
+        )
+    }
+
+
+def time_per_call(statement: typing.Callable[[], typing.Any], repeat: int) -> float:
+    """Returns the best average number of seconds a statement takes."""
+    timer = timeit.Timer(statement)
+    number, _ = timer.autorange()
+    
+    return min(timer.repeat(repeat, number)) / number
+
+
+if __name__ == '__main__':
+    # Logging
+    logging.basicConfig(format='[{levelname}][{name}] {message}', style='{',
+                        handlers=[logging.StreamHandler()], level=logging.WARNING)
+    logger = logging.getLogger('core.benchmark')
+    logger.setLevel(logging.INFO)
+    
+    # Arguments
+    parser = argparse.ArgumentParser(description='Measures the cost of validating messages against schemas.')
+    parser.add_argument('--bot', required=True, help="The path to ShovelBot's root directory.")
+    parser.add_argument('--package', default='extensions.client',
+                        help='The import path of the installed extension.')
+    parser.add_argument('--repeat', type=int, default=5, help='The number of runs per measurement.')
+    args = parser.parse_args()
+    
+    sys.path.insert(0, args.bot)
+    logic = importlib.import_module(f'{args.package}.logic')
+    message = importlib.import_module(f'{args.package}.dataclasses').Message
+    
+    # Measurements
+    print(f'{"payload":<18} {"decode":>10} {"validate":>10} {"dispatch":>10}  validate/dispatch')
+    
+    for name, (payload, schema) in payloads(logic).items():
+        logger.info(f'Timing {name}...')
+        
+        schemas = {name: schema}
+        router = logic.Router()
+        router.use(logic.Profiler().middleware)
+        router.add(name, logic.signal(lambda *a, **k: None))
+        
+        # Payloads are round-tripped through JSON, so they're exactly what
+        # the transport would decode.
+        payload = json.loads(json.dumps(payload))
+        decoded = message.from_json(payload, schemas)
+        
+        decode = time_per_call(lambda: message.from_json(payload), args.repeat)
+        validate = time_per_call(lambda: message.from_json(payload, schemas), args.repeat) - decode
+        dispatch = time_per_call(lambda: decoded(router), args.repeat)
+        
+        print(f'{name:<18} {decode * 1e6:>8.2f}us {validate * 1e6:>8.2f}us {dispatch * 1e6:>8.2f}us'
+              f'  {validate / dispatch:>8.2f}x')
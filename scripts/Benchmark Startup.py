@@ -0,0 +1,137 @@
+# This file is part of Decision Descent.
+#
+# Decision Descent is free software:
+# you can redistribute it
+# and/or modify it under the
+# terms of the GNU General
+# Public License as published by
+# the Free Software Foundation,
+# either version 3 of the License,
+# or (at your option) any later
+# version.
+#
+# Decision Descent is distributed in
+# the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without
+# even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A
+# PARTICULAR PURPOSE.  See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the
+# GNU General Public License along with
+# Decision Descent.  If not,
+# see <https://www.gnu.org/licenses/>.
+"""Measures how much Decision Descent adds to ShovelBot's startup.
+
+Every measurement runs in a fresh interpreter so nothing is cached between
+runs.  The script reports the cost of importing the bot's own modules, the
+extra cost of importing the extension on top of them, and the cost of the
+subsystems that are loaded on first use.
+
+Usage:  python "scripts/Benchmark Startup.py" --bot <ShovelBot directory>"""
+import argparse
+import logging
+import os
+import statistics
+import subprocess
+import sys
+import typing
+
+# Snippets timed in a fresh interpreter.  Each one prints the number of
+# seconds the measured statement took.
+BASELINE = 'import time; s = time.perf_counter(); import core, QtUtilities; print(time.perf_counter() - s)'
+EXTENSION = ('import time, core, QtUtilities; s = time.perf_counter(); '
+             'import {package}; print(time.perf_counter() - s)')
+FIRST_USE = ('import time, core, QtUtilities, {package}; s = time.perf_counter(); '
+             '{package}.{attribute}; print(time.perf_counter() - s)')
+SUBSYSTEMS = {
+    'arbiter': 'logic.Arbiter',
+    'transport': 'logic.HTTP',
+    'asyncio transport': 'logic.AsyncHTTP',
+    'vote shards': 'logic.ShardPool',
+    'profiler': 'logic.Profiler',
+    'watchdog': 'logic.Watchdog',
+    'item catalog': 'logic.Catalog',
+    'poll widget': 'widgets.Poll',
+    'messages': 'dataclasses.Message'
+}
+
+
+def run(code: str, bot: str, *options: str) -> subprocess.CompletedProcess:
+    """Runs a snippet in a fresh interpreter rooted at the bot's directory."""
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join([bot, os.environ.get('PYTHONPATH', '')]))
+    
+    return subprocess.run([sys.executable, *options, '-c', code], cwd=bot, env=env,
+                          capture_output=True, text=True, check=True)
+
+
+def measure(code: str, bot: str, repeat: int) -> float:
+    """Returns the median number of seconds a snippet reports."""
+    return statistics.median(float(run(code, bot).stdout.strip().splitlines()[-1]) for _ in range(repeat))
+
+
+def import_profile(package: str, bot: str) -> typing.List[typing.Tuple[int, str]]:
+    """Returns the self time, in microseconds, of every module the extension
+    imports that the bot hadn't already imported."""
+    stderr = run(f'import core, QtUtilities, {package}', bot, '-X', 'importtime').stderr
+    modules = []
+    
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        
+        self_us, _, name = [p.strip() for p in line[len('import time:'):].split('|')]
+        modules.append((int(self_us), name.strip()))
+    
+    # Everything after the bot's own packages finished importing belongs to
+    # the extension.
+    names = [n for _, n in modules]
+    cutoff = max((names.index(n) for n in ('core', 'QtUtilities') if n in names), default=-1) + 1
+    
+    return sorted(modules[cutoff:], reverse=True)
+
+
+if __name__ == '__main__':
+    # Logging
+    logging.basicConfig(format='[{levelname}][{name}] {message}', style='{',
+                        handlers=[logging.StreamHandler()], level=logging.INFO)
+    logger = logging.getLogger('core.benchmark')
+    
+    # Arguments
+    parser = argparse.ArgumentParser(description="Measures Decision Descent's contribution to bot startup.")
+    parser.add_argument('--bot', required=True, help="The path to ShovelBot's root directory.")
+    parser.add_argument('--package', default='extensions.client',
+                        help='The import path of the installed extension.')
+    parser.add_argument('--repeat', type=int, default=5, help='The number of runs per measurement.')
+    parser.add_argument('--top', type=int, default=10, help='The number of slowest modules to list.')
+    args = parser.parse_args()
+    
+    # Measurements
+    logger.info('Measuring bot startup...')
+    baseline = measure(BASELINE, args.bot, args.repeat)
+    
+    logger.info('Measuring extension import...')
+    extension = measure(EXTENSION.format(package=args.package), args.bot, args.repeat)
+    
+    logger.info('Measuring first use of lazily loaded subsystems...')
+    subsystems = {
+        name: measure(FIRST_USE.format(package=args.package, attribute=attribute), args.bot, args.repeat)
+        for name, attribute in SUBSYSTEMS.items()
+    }
+    
+    # Report
+    print(f'Bot modules:           {baseline * 1000:8.2f} ms')
+    print(f'Extension import:      {extension * 1000:8.2f} ms  '
+          f'({extension / (baseline + extension) * 100:.1f}% of startup)')
+    print()
+    print('First use (loaded on demand):')
+    
+    for name, seconds in subsystems.items():
+        print(f'  {name:<20} {seconds * 1000:8.2f} ms')
+    
+    print()
+    print('Slowest modules imported by the extension (self time):')
+    
+    for self_us, name in import_profile(args.package, args.bot)[:args.top]:
+        print(f'  {self_us / 1000:8.2f} ms  {name}')
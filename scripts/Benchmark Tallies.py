@@ -0,0 +1,103 @@
+# This file is part of Decision Descent.
+#
+# Decision Descent is free software:
+# you can redistribute it
+# and/or modify it under the
+# terms of the GNU General
+# Public License as published by
+# the Free Software Foundation,
+# either version 3 of the License,
+# or (at your option) any later
+# version.
+#
+# Decision Descent is distributed in
+# the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without
+# even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A
+# PARTICULAR PURPOSE.  See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the
+# GNU General Public License along with
+# Decision Descent.  If not,
+# see <https://www.gnu.org/licenses/>.
+"""Measures what a vote costs a poll, tallied exactly and approximately.
+
+A poll is created for each tallying mode, and a stream of votes from
+distinct participants is cast into it.  Approximate tallying is only worth
+switching to if it costs less per vote than exact tallying at the sample
+rates the arbiter picks when chat is overloaded.
+
+Usage:  python "scripts/Benchmark Tallies.py" --bot <ShovelBot directory>"""
+import argparse
+import importlib
+import logging
+import os
+import sys
+import time
+import typing
+
+
+def time_per_vote(poll, votes: typing.List[typing.Tuple[str, str]]) -> float:
+    """Returns the average number of seconds a poll takes to count a vote."""
+    start = time.perf_counter()
+    
+    for name, choice in votes:
+        poll.add_participant(name, choice)
+    
+    return (time.perf_counter() - start) / len(votes)
+
+
+if __name__ == '__main__':
+    # Logging
+    logging.basicConfig(format='[{levelname}][{name}] {message}', style='{',
+                        handlers=[logging.StreamHandler()], level=logging.ERROR)
+    logger = logging.getLogger('core.benchmark')
+    logger.setLevel(logging.INFO)
+    
+    # Arguments
+    parser = argparse.ArgumentParser(description='Measures the cost of counting a vote in each tallying mode.')
+    parser.add_argument('--bot', required=True, help="The path to ShovelBot's root directory.")
+    parser.add_argument('--package', default='extensions.client',
+                        help='The import path of the installed extension.')
+    parser.add_argument('--votes', type=int, default=200000, help='The number of votes cast per poll.')
+    parser.add_argument('--repeat', type=int, default=5, help='The number of runs per measurement.')
+    args = parser.parse_args()
+    
+    # Polls are widgets, so Qt needs an application, but never a display.
+    os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+    sys.path.insert(0, args.bot)
+    
+    from PyQt5 import QtWidgets
+    
+    app = QtWidgets.QApplication(sys.argv)
+    logic = importlib.import_module(f'{args.package}.logic')
+    widgets = importlib.import_module(f'{args.package}.widgets')
+    
+    choices = ['105', '114', '118']
+    votes = [(f'viewer{i}', choices[i % len(choices)]) for i in range(args.votes)]
+    
+    # Measurements
+    print(f'{"mode":<20} {"per vote":>10}  vs exact')
+    exact = None
+    
+    for rate in (None, 1.0, 0.5, 0.1, 0.01):
+        mode = 'exact' if rate is None else f'approximate {rate:.0%}'
+        logger.info(f'Timing {mode}...')
+        best = float('inf')
+        
+        for _ in range(args.repeat):
+            poll = widgets.Poll('benchmark.conclude', clock=logic.VirtualClock())
+            
+            for c in choices:
+                poll.add_choice(c, c)
+            
+            if rate is not None:
+                poll.set_approximate(rate, capacity=args.votes)
+            
+            best = min(best, time_per_vote(poll, votes))
+            poll.deleteLater()
+        
+        exact = best if exact is None else exact
+        print(f'{mode:<20} {best * 1e6:>8.3f}us  {best / exact:>7.2f}x')
@@ -0,0 +1,203 @@
+# This file is part of Decision Descent.
+#
+# Decision Descent is free software:
+# you can redistribute it
+# and/or modify it under the
+# terms of the GNU General
+# Public License as published by
+# the Free Software Foundation,
+# either version 3 of the License,
+# or (at your option) any later
+# version.
+#
+# Decision Descent is distributed in
+# the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without
+# even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A
+# PARTICULAR PURPOSE.  See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the
+# GNU General Public License along with
+# Decision Descent.  If not,
+# see <https://www.gnu.org/licenses/>.
+"""Compares the Qt and asyncio transports on loopback.
+
+A stand-in for the mod connects to each transport over a plain socket,
+completes the session handshake, and measures:
+  
+  • latency, as the round trip of a single message echoed back by a handler;
+  • inbound throughput, as messages per second decoded and emitted;
+  • outbound throughput, as messages per second queued, sent, and received.
+
+Handlers run on whichever thread the transport emits on; the Qt thread for
+the Qt transport, and the transport's own loop for the asyncio one.
+
+Usage:  python "scripts/Benchmark Transports.py" --bot <ShovelBot directory>"""
+import argparse
+import importlib
+import json
+import logging
+import socket
+import statistics
+import sys
+import threading
+import time
+import typing
+
+
+class Mod:
+    """A blocking stand-in for the mod's half of the connection."""
+    
+    def __init__(self, port: int, timeout: float = 5.0):
+        deadline = time.perf_counter() + timeout
+        
+        while True:
+            try:
+                self.socket = socket.create_connection(('127.0.0.1', port), timeout=timeout)
+                break
+            
+            except ConnectionRefusedError:
+                if time.perf_counter() > deadline:
+                    raise
+                
+                time.sleep(0.01)
+        
+        self.socket.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self.file = self.socket.makefile('rb')
+        self.seq = 0
+        self.ack = 0
+        
+        self.socket.sendall(b'{"intent": "session.resume", "args": [null, 0]}\r\n')
+        self.read()
+    
+    def encode(self, intent: str, *args: typing.Any) -> bytes:
+        self.seq += 1
+        
+        return f'{json.dumps({"intent": intent, "args": args, "seq": self.seq, "ack": self.ack})}\r\n'.encode()
+    
+    def send(self, intent: str, *args: typing.Any):
+        self.socket.sendall(self.encode(intent, *args))
+    
+    def read(self) -> dict:
+        payload = json.loads(self.file.readline())
+        self.ack = payload.get('seq', self.ack)
+        
+        return payload
+    
+    def close(self):
+        self.file.close()
+        self.socket.close()
+
+
+def measure(port: int, rounds: int, messages: int) -> typing.Dict[str, float]:
+    """Runs every measurement against the transport listening on a port."""
+    mod = Mod(port)
+    results = {}
+    
+    # Latency
+    samples = []
+    
+    for i in range(rounds):
+        start = time.perf_counter()
+        mod.send('bench.echo', i)
+        mod.read()
+        samples.append(time.perf_counter() - start)
+    
+    samples.sort()
+    results['median'] = statistics.median(samples)
+    results['p99'] = samples[int(len(samples) * 0.99) - 1]
+    
+    # Inbound throughput
+    data = b''.join(mod.encode('bench.count', i) for i in range(messages)) + mod.encode('bench.echo', 0)
+    start = time.perf_counter()
+    mod.socket.sendall(data)
+    mod.read()
+    results['inbound'] = messages / (time.perf_counter() - start)
+    
+    # Outbound throughput
+    start = time.perf_counter()
+    mod.send('bench.flood', messages)
+    
+    for _ in range(messages):
+        mod.read()
+    
+    results['outbound'] = messages / (time.perf_counter() - start)
+    
+    mod.close()
+    return results
+
+
+def handler(transport, message_type: type) -> typing.Callable:
+    """Returns the slot that answers the benchmark's intents."""
+    def process(message):
+        if message.intent == 'bench.echo':
+            transport.send_message(message_type('bench.echo', message.args, {}, None))
+        
+        elif message.intent == 'bench.flood':
+            for i in range(message.args[0]):
+                transport.send_message(message_type('bench.flooded', [i], {}, None))
+    
+    return process
+
+
+if __name__ == '__main__':
+    # Logging
+    logging.basicConfig(format='[{levelname}][{name}] {message}', style='{',
+                        handlers=[logging.StreamHandler()], level=logging.WARNING)
+    logger = logging.getLogger('core.benchmark')
+    logger.setLevel(logging.INFO)
+    
+    # Arguments
+    parser = argparse.ArgumentParser(description='Compares the Qt and asyncio transports on loopback.')
+    parser.add_argument('--bot', required=True, help="The path to ShovelBot's root directory.")
+    parser.add_argument('--package', default='extensions.client',
+                        help='The import path of the installed extension.')
+    parser.add_argument('--port', type=int, default=25566, help='The port to benchmark on.')
+    parser.add_argument('--rounds', type=int, default=2000, help='The number of round trips to time.')
+    parser.add_argument('--messages', type=int, default=20000,
+                        help='The number of messages to time throughput with.')
+    args = parser.parse_args()
+    
+    sys.path.insert(0, args.bot)
+    logic = importlib.import_module(f'{args.package}.logic')
+    message = importlib.import_module(f'{args.package}.dataclasses').Message
+    
+    from PyQt5 import QtCore
+    
+    app = QtCore.QCoreApplication(sys.argv)
+    measurements = {}
+    
+    # Qt transport
+    logger.info('Timing the Qt transport...')
+    qt = logic.HTTP()
+    qt.onResponse.connect(handler(qt, message))
+    qt.connect(args.port)
+    
+    worker = threading.Thread(target=lambda: measurements.update(qt=measure(args.port, args.rounds, args.messages)))
+    watcher = QtCore.QTimer()
+    watcher.timeout.connect(lambda: worker.is_alive() or app.quit())
+    
+    worker.start()
+    watcher.start(10)
+    app.exec_()
+    
+    watcher.stop()
+    qt.disconnect()
+    
+    # asyncio transport
+    logger.info('Timing the asyncio transport...')
+    aio = logic.AsyncHTTP()
+    aio.onResponse.connect(handler(aio, message))
+    aio.connect(args.port + 1).result()
+    
+    measurements['asyncio'] = measure(args.port + 1, args.rounds, args.messages)
+    aio.disconnect()
+    
+    # Results
+    print(f'{"transport":<10} {"median":>10} {"p99":>10} {"inbound":>12} {"outbound":>12}')
+    
+    for name, r in measurements.items():
+        print(f'{name:<10} {r["median"] * 1e6:>8.0f}us {r["p99"] * 1e6:>8.0f}us'
+              f' {r["inbound"]:>10.0f}/s {r["outbound"]:>10.0f}/s')
@@ -0,0 +1,178 @@
+# This file is part of Decision Descent.
+#
+# Decision Descent is free software:
+# you can redistribute it
+# and/or modify it under the
+# terms of the GNU General
+# Public License as published by
+# the Free Software Foundation,
+# either version 3 of the License,
+# or (at your option) any later
+# version.
+#
+# Decision Descent is distributed in
+# the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without
+# even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A
+# PARTICULAR PURPOSE.  See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the
+# GNU General Public License along with
+# Decision Descent.  If not,
+# see <https://www.gnu.org/licenses/>.
+"""Checks that sharded vote tallies match the polls' own tallies.
+
+A random chat is voted into a handful of polls, which are stopped and
+restarted along the way.  Every vote is counted three ways: by the polls,
+exactly as the arbiter counts unsharded votes; by a single shard; and by a
+pool of worker processes.  The shards' tallies, both the ones they push and
+the ones requested from them, must match the polls' exactly.
+
+Usage:  python "scripts/Check Shards.py" --bot <ShovelBot directory>"""
+import argparse
+import importlib
+import logging
+import os
+import random
+import sys
+import time
+
+
+def format_mismatch(uid, expected, actual) -> str:
+    """Returns a readable description of a poll whose tallies don't match."""
+    return f'  poll #{uid}: expected {expected!r}, got {actual!r}'
+
+
+if __name__ == '__main__':
+    # Logging
+    logging.basicConfig(format='[{levelname}][{name}] {message}', style='{',
+                        handlers=[logging.StreamHandler()], level=logging.WARNING)
+    logger = logging.getLogger('core.check')
+    logger.setLevel(logging.INFO)
+    
+    # Arguments
+    parser = argparse.ArgumentParser(description="Checks that sharded vote tallies match the polls' own tallies.")
+    parser.add_argument('--bot', required=True, help="The path to ShovelBot's root directory.")
+    parser.add_argument('--package', default='extensions.client',
+                        help='The import path of the installed extension.')
+    parser.add_argument('--shards', type=int, default=4, help='The number of worker processes.')
+    parser.add_argument('--polls', type=int, default=3, help='The number of polls voted on at once.')
+    parser.add_argument('--choices', type=int, default=4, help='The number of choices in each poll.')
+    parser.add_argument('--voters', type=int, default=500, help='The number of participants.')
+    parser.add_argument('--votes', type=int, default=20000, help='The number of chat messages.')
+    parser.add_argument('--seed', type=int, default=0, help='The seed the chat is drawn with.')
+    args = parser.parse_args()
+    
+    # Polls are widgets, so Qt needs an application, but never a display.
+    os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+    sys.path.insert(0, args.bot)
+    
+    from PyQt5 import QtWidgets
+    
+    app = QtWidgets.QApplication(sys.argv)
+    logic = importlib.import_module(f'{args.package}.logic')
+    widgets = importlib.import_module(f'{args.package}.widgets')
+    
+    clock = logic.VirtualClock()
+    lifecycle = logic.PollLifecycle()
+    rng = random.Random(args.seed)
+    polls = []
+    
+    # Choices overlap between polls, so votes have to go to the first
+    # active poll they're a choice in.
+    for index in range(args.polls):
+        poll = widgets.Poll('check.conclude', clock=clock)
+        
+        for choice in range(index, index + args.choices):
+            poll.add_choice(str(choice), f'Choice {choice}', f'alias{choice}')
+        
+        lifecycle.register(poll)
+        lifecycle.start(poll, 60)
+        polls.append(poll)
+    
+    tokens = sorted({t for p in polls for t in p.get_tokens()}) + ['kappa', 'pog']
+    
+    def describe():
+        return [(p.uid, p.get_lookup(), p.is_active()) for p in polls]
+    
+    shard = logic.Shard()
+    pool = logic.ShardPool(logic.VirtualClock())
+    pool.start(args.shards)
+    
+    shard.sync(describe())
+    pool.sync(describe())
+    
+    # Chat
+    logger.info(f'Counting {args.votes} messages from {args.voters} participants...')
+    batch = []
+    
+    for message in range(args.votes):
+        name, token = f'voter{rng.randrange(args.voters)}', rng.choice(tokens)
+        
+        for p in polls:
+            if p.is_active() and p.is_choice(token):
+                p.add_participant(name, token)
+                break
+        
+        batch.append((name, token))
+        pool.submit(name, token)
+        
+        # Polls stop and restart at the same point in the chat for everyone.
+        if rng.random() < 0.001:
+            p = rng.choice(polls)
+            
+            if p.is_active():
+                p.stop()
+            
+            else:
+                p.start()
+            
+            shard.add_votes(batch)
+            shard.activate(p.uid, p.is_active())
+            pool.activate(p.uid, p.is_active())
+            batch = []
+    
+    shard.add_votes(batch)
+    pool.flush()
+    
+    expected = {p.uid: (p.tally(), len(p.get_participants())) for p in polls}
+    
+    # Pushed tallies arrive on their own, without the pool asking for them.
+    deadline = time.monotonic() + 10
+    
+    while pool.get_partials() != expected and time.monotonic() < deadline:
+        pool.receive()
+        time.sleep(0.01)
+    
+    pushed = pool.get_partials()
+    
+    # Requested tallies are picked up the same way.
+    answers = []
+    pool.request(answers.append)
+    deadline = time.monotonic() + 10
+    
+    while not answers and time.monotonic() < deadline:
+        pool.receive()
+        time.sleep(0.01)
+    
+    results = {'shard': shard.collect(), 'pushed': pushed, 'requested': answers[0] if answers else {}}
+    pool.stop()
+    
+    # Report
+    failed = False
+    
+    for name, actual in results.items():
+        mismatches = [format_mismatch(uid, tally, actual.get(uid)) for uid, tally in expected.items()
+                      if actual.get(uid) != tally]
+        
+        print(f'{name:<10} {"ok" if not mismatches else f"{len(mismatches)} polls differ"}')
+        
+        for line in mismatches:
+            print(line)
+        
+        failed = failed or bool(mismatches)
+    
+    app.quit()
+    raise SystemExit(1 if failed else 0)
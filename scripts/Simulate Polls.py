@@ -0,0 +1,107 @@
+# This file is part of Decision Descent.
+#
+# Decision Descent is free software:
+# you can redistribute it
+# and/or modify it under the
+# terms of the GNU General
+# Public License as published by
+# the Free Software Foundation,
+# either version 3 of the License,
+# or (at your option) any later
+# version.
+#
+# Decision Descent is distributed in
+# the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without
+# even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A
+# PARTICULAR PURPOSE.  See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the
+# GNU General Public License along with
+# Decision Descent.  If not,
+# see <https://www.gnu.org/licenses/>.
+"""Simulates poll lifecycles against a virtual clock.
+
+Polls are created, voted on, and left to run out their timers exactly as
+they would be in a session, except the clock is advanced instantly instead
+of waiting on real seconds.  The script reports how many complete
+lifecycles it simulated per second.
+
+Usage:  python "scripts/Simulate Polls.py" --bot <ShovelBot directory>"""
+import argparse
+import importlib
+import logging
+import os
+import random
+import sys
+import time
+
+if __name__ == '__main__':
+    # Logging
+    logging.basicConfig(format='[{levelname}][{name}] {message}', style='{',
+                        handlers=[logging.StreamHandler()], level=logging.WARNING)
+    logger = logging.getLogger('core.simulation')
+    logger.setLevel(logging.INFO)
+    
+    # Arguments
+    parser = argparse.ArgumentParser(description='Simulates poll lifecycles against a virtual clock.')
+    parser.add_argument('--bot', required=True, help="The path to ShovelBot's root directory.")
+    parser.add_argument('--package', default='extensions.client',
+                        help='The import path of the installed extension.')
+    parser.add_argument('--polls', type=int, default=1000, help='The number of polls to simulate.')
+    parser.add_argument('--concurrent', type=int, default=4, help='The number of polls running at once.')
+    parser.add_argument('--duration', type=int, default=35, help='The number of seconds each poll runs for.')
+    parser.add_argument('--choices', type=int, default=3, help='The number of choices in each poll.')
+    parser.add_argument('--voters', type=int, default=50, help='The number of votes cast in each poll.')
+    parser.add_argument('--seed', type=int, default=0, help='The seed votes are drawn with.')
+    args = parser.parse_args()
+    
+    # Polls are widgets, so Qt needs an application, but never a display.
+    os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+    sys.path.insert(0, args.bot)
+    
+    from PyQt5 import QtCore, QtWidgets
+    
+    app = QtWidgets.QApplication(sys.argv)
+    logic = importlib.import_module(f'{args.package}.logic')
+    widgets = importlib.import_module(f'{args.package}.widgets')
+    
+    clock = logic.VirtualClock()
+    lifecycle = logic.PollLifecycle(history=args.polls)
+    rng = random.Random(args.seed)
+    
+    # Simulation
+    logger.info(f'Simulating {args.polls} polls of {args.duration}s...')
+    start = time.perf_counter()
+    created = 0
+    
+    while created < args.polls or lifecycle.live_count():
+        while created < args.polls and lifecycle.live_count() < args.concurrent:
+            poll = widgets.Poll('simulation.conclude', clock=clock)
+            
+            for choice in range(1, args.choices + 1):
+                poll.add_choice(str(choice), f'Choice {choice}')
+            
+            lifecycle.register(poll)
+            lifecycle.start(poll, args.duration)
+            created += 1
+            
+            for voter in range(args.voters):
+                poll.add_participant(f'voter{voter}', str(rng.randint(1, args.choices)))
+        
+        # Skip straight to the next tick that's due.
+        clock.advance(clock.next_deadline() - clock.now())
+        
+        # There's no event loop running, so archived polls are deleted here.
+        app.sendPostedEvents(None, QtCore.QEvent.DeferredDelete)
+    
+    elapsed = time.perf_counter() - start
+    
+    # Report
+    print(f'Simulated {lifecycle.archived_count()} polls ({clock.now():.0f}s of poll time) in {elapsed:.3f}s')
+    print(f'  {lifecycle.archived_count() / elapsed:,.0f} lifecycles/s, '
+          f'{clock.now() / elapsed:,.0f}x real time')
+    
+    app.quit()
@@ -22,72 +22,276 @@
 # GNU General Public License along with
 # Decision Descent.  If not,
 # see <https://www.gnu.org/licenses/>.
+"""Installs the mod into the game's mods directory.
+
+The installed copy keeps a manifest of its files' content hashes, so only
+files that changed since the previous deploy are copied, and files removed
+from the source tree are removed from the installed copy.  Every file is
+written next to its destination, then moved over it, so the game never
+loads a partially copied file.
+
+With --watch, the source tree is polled and synced whenever it changes.
+
+Usage:  python "scripts/Test Decision Descent.py" [--mods <mods directory>] [--watch]"""
+import argparse
+import hashlib
+import json
 import logging
-from os import path
-from shutil import copytree
+import os
+import shutil
+import time
+import typing
 
-from PyQt5 import QtCore
+MANIFEST = '.descent-manifest.json'
 
-if __name__ == '__main__':
-    # Logging
-    logging.basicConfig(format='[{levelname}][{name}] {message}', style='{', handlers=[logging.StreamHandler()])
-    logger = logging.getLogger('core.test')
+# A file's modification time and size, used to skip hashing files that
+# haven't been touched.
+Stamp = typing.Tuple[int, int]
+
+
+def default_mods_directory() -> str:
+    """Returns the mods directory from $DESCENT_MODS, or the game's default
+    mods directory."""
+    return os.environ.get('DESCENT_MODS') or os.path.join(
+        os.path.expanduser('~'), 'Documents', 'My Games', 'Binding of Isaac Afterbirth+ Mods'
+    )
+
+
+def hash_file(file: str) -> str:
+    """Returns the hex digest of a file's contents."""
+    digest = hashlib.blake2b(digest_size=16)
     
-    # Declarations
-    current_directory = QtCore.QDir.current()
-    mods_directory = QtCore.QDir(
-        path.join(QtCore.QDir.homePath(), 'Documents/My Games/Binding of Isaac Afterbirth+ Mods'))
-    mod_directory = QtCore.QDir(mods_directory.path(), 'Decision Descent')
+    with open(file, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 16), b''):
+            digest.update(chunk)
     
-    # Validation
-    logger.info('Checking current working directory...')
-    if not current_directory.exists('core'):
-        logger.warning("The current directory isn't the root Decision Descent directory!")
-        logger.warning(f'The current directory is {current_directory.path()}')
-        logger.warning('Moving up a directory...')
-        
-        current_directory.cdUp()
+    return digest.hexdigest()
+
+
+def ignored(name: str) -> bool:
+    """Returns whether or not a file or directory is left out of deploys.
     
-    else:
-        logger.info('The current directory is the root Decision Descent directory!')
+    * Dot-files, and the temporary files editors and deploys write, are
+    ignored."""
+    return name.startswith('.') or name.endswith('.tmp')
+
+
+def scan(source: str) -> typing.Dict[str, Stamp]:
+    """Returns the stamp of every file in a tree, by its path relative to the
+    tree's root.
     
-    logger.info('Checking mod directory...')
-    if mod_directory.exists() and not mod_directory.isEmpty():
-        logger.warning("The mod directory already exists!")
-        logger.warning(f'Deleting {current_directory.path()} ...')
+    * Files that vanish or can't be read while the tree is scanned are
+    skipped."""
+    stamps = {}
+    
+    for root, directories, files in os.walk(source):
+        directories[:] = [d for d in directories if not ignored(d)]
         
-        if mod_directory.removeRecursively():
-            logger.info('Mod directory successfully deleted!')
+        for name in files:
+            if ignored(name):
+                continue
+            
+            file = os.path.join(root, name)
+            
+            try:
+                stat = os.stat(file)
+            
+            except OSError:
+                continue
+            
+            stamps[os.path.relpath(file, source).replace(os.sep, '/')] = (stat.st_mtime_ns, stat.st_size)
+    
+    return stamps
+
+
+class Deployer:
+    """Keeps an installed copy of a tree in sync with its source."""
+    LOGGER = logging.getLogger('core.deploy')
+    
+    def __init__(self, source: str, destination: str):
+        # Public attributes
+        self.source: str = source
+        self.destination: str = destination
         
-        else:
-            logger.warning("Mod directory couldn't be deleted entirely!")
+        # Private attributes
+        self._hashes: typing.Dict[str, typing.Tuple[Stamp, str]] = {}  # Source hashes, by path
+        self._skipped: typing.Set[str] = set()  # Files the previous sync couldn't read or write
     
-    else:
-        logger.info('The mod directory is already deleted!')
+    # Manifest methods
+    def load_manifest(self) -> typing.Dict[str, str]:
+        """Returns the installed copy's manifest, or an empty one if the copy
+        doesn't have one."""
+        try:
+            with open(os.path.join(self.destination, MANIFEST), encoding='utf-8') as f:
+                return json.load(f)
+        
+        except (OSError, ValueError):
+            return {}
     
-    # Copy mods directory
-    try:
-        copytree(path.join(current_directory.path(), 'mod'), mod_directory.path())
+    def save_manifest(self, manifest: typing.Dict[str, str]):
+        """Writes the installed copy's manifest."""
+        path = os.path.join(self.destination, MANIFEST)
+        
+        with open(path + '.tmp', 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, indent=2, sort_keys=True)
+        
+        os.replace(path + '.tmp', path)
     
-    except OSError as e:
-        logger.fatal(f'Could not copy mod to {mod_directory.path()} !')
-        logger.fatal('Reason(s):')
+    # Sync methods
+    def hash_tree(self, stamps: typing.Dict[str, Stamp]) -> typing.Dict[str, str]:
+        """Returns the hash of every source file, only rehashing files whose
+        stamps changed since they were last hashed.
+        
+        * Files that can't be read are left out, and recorded as skipped."""
+        hashes = {}
         
-        for arg in e.args:
-            if isinstance(arg, list):
-                for error in arg:
-                    logger.fatal(f'- {error.__class__.__name__} - {error.__cause__}')
+        for name, stamp in stamps.items():
+            cached = self._hashes.get(name)
             
-            else:
-                logger.fatal(f'- {str(arg)}')
+            if cached is None or cached[0] != stamp:
+                try:
+                    cached = self._hashes[name] = (stamp, hash_file(os.path.join(self.source, name)))
+                
+                except OSError as e:
+                    self.LOGGER.warning(f'Could not read {name} !  {e!s}')
+                    self._skipped.add(name)
+                    continue
+            
+            hashes[name] = cached[1]
+        
+        for name in set(self._hashes) - set(stamps):
+            del self._hashes[name]
+        
+        return hashes
     
-    else:
-        logger.info(f'Mod tree successfully copied to {mod_directory.path()} !')
+    def sync(self, stamps: typing.Dict[str, Stamp] = None, force: bool = False) -> typing.Tuple[int, int]:
+        """Copies changed files to the installed copy, and removes files that
+        are no longer in the source.
+        
+        :param stamps: The source tree's stamps, if they were just scanned.
+        :param force: Whether or not every file should be copied, regardless
+                      of the manifest.
+        :returns: The number of files copied, and the number removed.
+        
+        * Files that can't be read or written are skipped, and kept in the
+        installed copy as they are."""
+        stamps = stamps if stamps is not None else scan(self.source)
+        self._skipped.clear()
+        
+        hashes = self.hash_tree(stamps)
+        manifest = {} if force else self.load_manifest()
+        copied = removed = 0
+        
+        os.makedirs(self.destination, exist_ok=True)
+        
+        for name, digest in hashes.items():
+            target = os.path.join(self.destination, name)
+            
+            # Files deleted from the installed copy by hand are restored.
+            if manifest.get(name) == digest and os.path.exists(target):
+                continue
+            
+            try:
+                os.makedirs(os.path.dirname(target), exist_ok=True)
+                shutil.copy2(os.path.join(self.source, name), target + '.tmp')
+                os.replace(target + '.tmp', target)
+            
+            except OSError as e:
+                self.LOGGER.warning(f'Could not copy {name} !  {e!s}')
+                self._skipped.add(name)
+                continue
+            
+            manifest[name] = digest
+            copied += 1
+            self.LOGGER.info(f'Copied {name}')
+        
+        # Files that are still in the source, but couldn't be read, are kept.
+        for name in set(manifest) - set(stamps):
+            try:
+                os.remove(os.path.join(self.destination, name))
+            
+            except FileNotFoundError:
+                pass
+            
+            except OSError as e:
+                self.LOGGER.warning(f'Could not remove {name} !  {e!s}')
+                self._skipped.add(name)
+                continue
+            
+            del manifest[name]
+            removed += 1
+            self.LOGGER.info(f'Removed {name}')
+        
+        if copied or removed or force:
+            self.save_manifest(manifest)
+        
+        return copied, removed
     
-    finally:
-        if mods_directory.exists('mod'):
-            if mods_directory.rename('mod', 'Decision Descent'):
-                logger.info('Mod folder was successfully renamed to "Decision Descent"!')
+    def watch(self, interval: float):
+        """Syncs the installed copy whenever the source tree changes, until
+        interrupted.
+        
+        * Syncs that fail, or skip files, are retried on the next check."""
+        self.LOGGER.info(f'Watching {self.source} for changes...  Press Ctrl+C to stop.')
+        previous = scan(self.source)
+        
+        while True:
+            time.sleep(interval)
+            
+            try:
+                stamps = scan(self.source)
+                
+                if stamps == previous and not self._skipped:
+                    continue
+                
+                start = time.perf_counter()
+                copied, removed = self.sync(stamps)
             
-            else:
-                logger.warning('Mod folder could not be renamed from "mod" to "Decision Descent"!')
+            except OSError as e:
+                self.LOGGER.warning(f'Could not sync {self.source} !  {e!s}')
+                continue
+            
+            previous = stamps
+            
+            if copied or removed:
+                self.LOGGER.info(f'Synced {copied} changed and {removed} removed files '
+                                 f'in {(time.perf_counter() - start) * 1000:.1f}ms')
+
+
+if __name__ == '__main__':
+    # Logging
+    logging.basicConfig(format='[{levelname}][{name}] {message}', style='{',
+                        handlers=[logging.StreamHandler()], level=logging.INFO)
+    logger = logging.getLogger('core.test')
+    
+    # Arguments
+    parser = argparse.ArgumentParser(description="Installs the mod into the game's mods directory.")
+    parser.add_argument('--mods', default=default_mods_directory(),
+                        help="The game's mods directory.  Defaults to $DESCENT_MODS, or the game's default.")
+    parser.add_argument('--name', default='Decision Descent', help="The name of the installed mod's directory.")
+    parser.add_argument('--force', action='store_true', help='Copy every file, regardless of the manifest.')
+    parser.add_argument('--watch', action='store_true', help='Keep syncing whenever the mod changes.')
+    parser.add_argument('--interval', type=int, default=100,
+                        help='The number of milliseconds between checks for changes in watch mode.')
+    args = parser.parse_args()
+    
+    # The script may be run from the repository's root or its scripts directory.
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    deployer = Deployer(os.path.join(root, 'mod'), os.path.join(args.mods, args.name))
+    
+    # Deploy
+    try:
+        copied, removed = deployer.sync(force=args.force)
+    
+    except OSError as e:
+        logger.fatal(f'Could not deploy mod to {deployer.destination} !  {e!s}')
+        raise SystemExit(1)
+    
+    logger.info(f'Deployed to {deployer.destination}  ({copied} copied, {removed} removed)')
+    
+    if args.watch:
+        try:
+            deployer.watch(args.interval / 1000)
+        
+        except KeyboardInterrupt:
+            logger.info('Stopped watching.')
@@ -0,0 +1,41 @@
+# This file is part of Decision Descent.
+#
+# Decision Descent is free software:
+# you can redistribute it
+# and/or modify it under the
+# terms of the GNU General
+# Public License as published by
+# the Free Software Foundation,
+# either version 3 of the License,
+# or (at your option) any later
+# version.
+#
+# Decision Descent is distributed in
+# the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without
+# even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A
+# PARTICULAR PURPOSE.  See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the
+# GNU General Public License along with
+# Decision Descent.  If not,
+# see <https://www.gnu.org/licenses/>.
+"""Makes the client importable without ShovelBot.
+
+The client's package normally runs as one of ShovelBot's extensions, and
+its `__init__` imports ShovelBot's own modules.  The tests only exercise the
+client's logic, so the package is registered without running `__init__`;
+its subpackages import as usual."""
+import os
+import sys
+import types
+
+_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+if 'client' not in sys.modules:
+    package = types.ModuleType('client')
+    package.__path__ = [os.path.join(_ROOT, 'client')]
+    
+    sys.modules['client'] = package
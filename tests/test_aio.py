@@ -0,0 +1,205 @@
+# This file is part of Decision Descent.
+#
+# Decision Descent is free software:
+# you can redistribute it
+# and/or modify it under the
+# terms of the GNU General
+# Public License as published by
+# the Free Software Foundation,
+# either version 3 of the License,
+# or (at your option) any later
+# version.
+#
+# Decision Descent is distributed in
+# the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without
+# even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A
+# PARTICULAR PURPOSE.  See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the
+# GNU General Public License along with
+# Decision Descent.  If not,
+# see <https://www.gnu.org/licenses/>.
+import asyncio
+import json
+import socket
+import time
+import typing
+
+from client.dataclasses import Message
+from client.logic.aio import AsyncHTTP, Emitter
+from client.logic.outbound import Priority
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+class FakeMod:
+    """The mod's half of the connection, over a real socket."""
+    
+    def __init__(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.reader = reader
+        self.writer = writer
+    
+    @classmethod
+    async def connect(cls, port: int) -> 'FakeMod':
+        return cls(*await asyncio.open_connection('127.0.0.1', port))
+    
+    async def send(self, payload: dict):
+        self.writer.write(f'{json.dumps(payload)}\n'.encode())
+        await self.writer.drain()
+    
+    async def receive(self) -> dict:
+        return json.loads(await asyncio.wait_for(self.reader.readline(), 5))
+    
+    async def resume(self, session: str = None, last: int = 0) -> dict:
+        await self.send({'intent': 'session.resume', 'args': [session, last]})
+        return await self.receive()
+    
+    async def close(self):
+        self.writer.close()
+        await self.writer.wait_closed()
+
+
+async def _serve() -> typing.Tuple[AsyncHTTP, int]:
+    transport = AsyncHTTP(loop=asyncio.get_running_loop())
+    port = _free_port()
+    await transport.serve(port)
+    
+    return transport, port
+
+
+def test_emitters_call_every_slot():
+    emitter = Emitter()
+    calls = []
+    
+    emitter.connect(calls.append)
+    emitter.connect(lambda value: calls.append(value * 2))
+    emitter.emit(2)
+    emitter.disconnect(calls.append)
+    emitter.emit(3)
+    emitter.disconnect()
+    emitter.emit(4)
+    
+    assert calls == [2, 4, 6]
+
+
+def test_messages_wait_for_the_handshake():
+    async def scenario():
+        transport, port = await _serve()
+        connected = []
+        transport.onConnectionReceived.connect(lambda: connected.append(True))
+        transport.send_message(Message('reply', ('queued',), {}, None))
+        
+        mod = await FakeMod.connect(port)
+        established = await mod.resume()
+        queued = await mod.receive()
+        
+        await mod.close()
+        await transport.close()
+        
+        return connected, established, queued
+    
+    connected, established, queued = asyncio.run(scenario())
+    
+    assert connected == [True]
+    assert established['intent'] == 'session.established'
+    assert (queued['intent'], queued['args'], queued['seq']) == ('reply', ['queued'], 1)
+
+
+def test_urgent_messages_are_sent_first():
+    async def scenario():
+        transport, port = await _serve()
+        mod = await FakeMod.connect(port)
+        await mod.resume()
+        
+        transport.send_message(Message('telemetry', (), {}, None), Priority.TELEMETRY)
+        transport.send_message(Message('reply', (), {}, None))
+        transport.send_message(Message('conclusion', (), {}, None), Priority.CRITICAL)
+        received = [(await mod.receive())['intent'] for _ in range(3)]
+        
+        await mod.close()
+        await transport.close()
+        
+        return received
+    
+    assert asyncio.run(scenario()) == ['conclusion', 'reply', 'telemetry']
+
+
+def test_received_messages_are_emitted():
+    async def scenario():
+        transport, port = await _serve()
+        received = asyncio.get_running_loop().create_future()
+        transport.onResponse.connect(received.set_result)
+        
+        mod = await FakeMod.connect(port)
+        await mod.resume()
+        await mod.send({'intent': 'polls.create', 'args': ['105'], 'seq': 1})
+        message = await asyncio.wait_for(received, 5)
+        
+        await mod.close()
+        await transport.close()
+        
+        return message
+    
+    assert asyncio.run(scenario()) == Message('polls.create', ('105',), {}, None)
+
+
+def test_reconnecting_mods_resume_their_session():
+    async def scenario():
+        transport, port = await _serve()
+        resumed = []
+        transport.onSessionResumed.connect(lambda: resumed.append(True))
+        
+        mod = await FakeMod.connect(port)
+        session = (await mod.resume())['args'][0]
+        
+        for i in range(3):
+            transport.send_message(Message('reply', (i,), {}, None))
+        
+        last = (await mod.receive())['seq']
+        await mod.close()
+        
+        mod = await FakeMod.connect(port)
+        established = await mod.resume(session, last)
+        replayed = [(await mod.receive())['args'] for _ in range(2)]
+        
+        await mod.close()
+        await transport.close()
+        
+        return resumed, established, replayed
+    
+    resumed, established, replayed = asyncio.run(scenario())
+    
+    assert resumed == [True]
+    assert established['args'][2] is True
+    assert replayed == [[1], [2]]
+
+
+def test_transports_can_run_their_own_loop():
+    transport = AsyncHTTP()
+    port = _free_port()
+    transport.connect(port).result(5)
+    
+    try:
+        with socket.create_connection(('127.0.0.1', port), timeout=5) as s:
+            s.sendall(b'{"intent": "session.resume", "args": [null, 0]}\n')
+            
+            reader = s.makefile('rb')
+            established = json.loads(reader.readline())
+            
+            transport.send_message(Message('reply', ('threaded',), {}, None))
+            reply = json.loads(reader.readline())
+    
+    finally:
+        start = time.monotonic()
+        transport.disconnect()
+    
+    assert established['intent'] == 'session.established'
+    assert reply['args'] == ['threaded']
+    assert time.monotonic() - start < 5
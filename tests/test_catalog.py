@@ -0,0 +1,117 @@
+# This file is part of Decision Descent.
+#
+# Decision Descent is free software:
+# you can redistribute it
+# and/or modify it under the
+# terms of the GNU General
+# Public License as published by
+# the Free Software Foundation,
+# either version 3 of the License,
+# or (at your option) any later
+# version.
+#
+# Decision Descent is distributed in
+# the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without
+# even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A
+# PARTICULAR PURPOSE.  See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the
+# GNU General Public License along with
+# Decision Descent.  If not,
+# see <https://www.gnu.org/licenses/>.
+import os
+
+import pytest
+
+from client.logic.catalog import Catalog, CatalogEntry, normalize
+
+ENTRIES = [
+    CatalogEntry('collectible', '105', 'The D6', ('dice', 'd6')),
+    CatalogEntry('collectible', '114', "Mom's Knife", ('knife',)),
+    CatalogEntry('collectible', '118', 'Brimstone'),
+    CatalogEntry('trinket', '12', 'Butt Penny'),
+    CatalogEntry('trinket', '105', 'Dice Bag', ('dice',))
+]
+
+
+@pytest.fixture()
+def catalog(tmp_path):
+    catalog = Catalog(str(tmp_path / 'catalog.dat'))
+    Catalog.build(catalog.path, ENTRIES)
+    
+    assert catalog.open()
+    yield catalog
+    catalog.close()
+
+
+def test_text_is_normalized():
+    assert normalize('  The   D6\t') == 'the d6'
+    assert normalize('STRASSE') == normalize('straße')
+
+
+def test_entries_resolve_by_every_token(catalog):
+    d6 = ENTRIES[0]
+    
+    assert len(catalog) == 5
+    assert catalog.resolve('105') == d6
+    assert catalog.resolve('collectible:105') == d6
+    assert catalog.resolve('the d6') == d6
+    assert catalog.resolve('  THE  D6 ') == d6
+    assert catalog.resolve('d6') == d6
+    assert catalog.resolve('Moms Knife') == ENTRIES[1]
+    assert catalog.resolve("mom's knife") == ENTRIES[1]
+    assert catalog.resolve('Wafer') is None
+
+
+def test_bare_ids_resolve_to_collectibles(catalog):
+    assert catalog.resolve('105').kind == 'collectible'
+    assert catalog.resolve('trinket:105') == ENTRIES[4]
+    assert catalog.resolve('12') is None
+    assert catalog.resolve('trinket:12') == ENTRIES[3]
+
+
+def test_earlier_entries_win_collisions(catalog):
+    assert catalog.resolve('dice') == ENTRIES[0]
+
+
+def test_entries_are_listed_in_order(catalog):
+    assert list(catalog.get_entries()) == ENTRIES
+
+
+def test_updates_replace_the_mapped_file(catalog):
+    assert catalog.update(ENTRIES[2:]) == 3
+    
+    assert catalog.is_open()
+    assert len(catalog) == 3
+    assert catalog.resolve('105') is None
+    assert catalog.resolve('brimstone') == ENTRIES[2]
+    assert not os.path.exists(catalog.path + '.new')
+
+
+def test_missing_and_empty_files_are_not_opened(tmp_path):
+    catalog = Catalog(str(tmp_path / 'missing.dat'))
+    
+    assert not catalog.open()
+    assert not catalog.is_open()
+    assert catalog.resolve('105') is None
+    
+    (tmp_path / 'empty.dat').write_bytes(b'')
+    
+    assert not Catalog(str(tmp_path / 'empty.dat')).open()
+
+
+def test_foreign_and_truncated_files_are_not_opened(tmp_path):
+    path = tmp_path / 'catalog.dat'
+    Catalog.build(str(path), ENTRIES)
+    data = path.read_bytes()
+    
+    for broken in (b'not a catalog file at all', data[:10], data[:-1], data[:len(data) // 2]):
+        path.write_bytes(broken)
+        catalog = Catalog(str(path))
+        
+        assert not catalog.open()
+        assert not catalog.is_open()
+        assert len(catalog) == 0
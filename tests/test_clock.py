@@ -0,0 +1,116 @@
+# This file is part of Decision Descent.
+#
+# Decision Descent is free software:
+# you can redistribute it
+# and/or modify it under the
+# terms of the GNU General
+# Public License as published by
+# the Free Software Foundation,
+# either version 3 of the License,
+# or (at your option) any later
+# version.
+#
+# Decision Descent is distributed in
+# the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without
+# even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A
+# PARTICULAR PURPOSE.  See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the
+# GNU General Public License along with
+# Decision Descent.  If not,
+# see <https://www.gnu.org/licenses/>.
+import pytest
+
+pytest.importorskip('PyQt5.QtCore')
+
+from client.logic.clock import Clock, VirtualClock
+
+
+def test_clocks_must_tell_the_time():
+    with pytest.raises(TypeError):
+        Clock()
+
+
+def test_callbacks_run_in_deadline_order():
+    clock = VirtualClock()
+    calls = []
+    
+    clock.call_later(3, lambda: calls.append(('c', clock.now())))
+    clock.call_later(1, lambda: calls.append(('a', clock.now())))
+    clock.call_at(1, lambda: calls.append(('b', clock.now())))
+    
+    assert clock.next_deadline() == 1
+    assert clock.advance(2) == 2
+    assert calls == [('a', 1), ('b', 1)]
+    assert clock.now() == 2
+    
+    clock.advance(1)
+    
+    assert calls[-1] == ('c', 3)
+    assert len(clock) == 0
+
+
+def test_cancelled_callbacks_never_run():
+    clock = VirtualClock()
+    calls = []
+    handle = clock.call_later(1, lambda: calls.append('cancelled'))
+    clock.call_later(2, lambda: calls.append('kept'))
+    
+    assert clock.cancel(handle)
+    assert not clock.cancel(handle)
+    assert clock.next_deadline() == 2
+    
+    clock.advance(5)
+    
+    assert calls == ['kept']
+
+
+def test_callbacks_scheduled_while_advancing_run_if_due():
+    clock = VirtualClock()
+    ticks = []
+    
+    def tick():
+        ticks.append(clock.now())
+        clock.call_later(1, tick)
+    
+    clock.call_later(1, tick)
+    clock.advance(3.5)
+    
+    assert ticks == [1, 2, 3]
+    assert clock.run(limit=2) == 2
+    assert ticks == [1, 2, 3, 4, 5]
+
+
+def test_failing_callbacks_do_not_stop_the_clock():
+    clock = VirtualClock()
+    calls = []
+    
+    clock.call_later(1, lambda: 1 / 0)
+    clock.call_later(2, lambda: calls.append('after'))
+    
+    assert clock.run() == 2
+    assert calls == ['after']
+
+
+def test_clocks_cannot_move_backwards():
+    clock = VirtualClock(10)
+    
+    with pytest.raises(ValueError):
+        clock.advance(-1)
+    
+    assert clock.now() == 10
+
+
+def test_many_cancellations_are_pruned():
+    clock = VirtualClock()
+    handles = [clock.call_later(i, lambda: None) for i in range(1000)]
+    
+    for handle in handles[:-1]:
+        clock.cancel(handle)
+    
+    assert len(clock) == 1
+    assert len(clock._queue) < 200
+    assert clock.next_deadline() == 999
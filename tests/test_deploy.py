@@ -0,0 +1,136 @@
+# This file is part of Decision Descent.
+#
+# Decision Descent is free software:
+# you can redistribute it
+# and/or modify it under the
+# terms of the GNU General
+# Public License as published by
+# the Free Software Foundation,
+# either version 3 of the License,
+# or (at your option) any later
+# version.
+#
+# Decision Descent is distributed in
+# the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without
+# even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A
+# PARTICULAR PURPOSE.  See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the
+# GNU General Public License along with
+# Decision Descent.  If not,
+# see <https://www.gnu.org/licenses/>.
+import importlib.util
+import json
+import os
+
+import pytest
+
+_SCRIPT = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'scripts',
+                       'Test Decision Descent.py')
+
+
+@pytest.fixture(scope='module')
+def deploy():
+    spec = importlib.util.spec_from_file_location('deploy', _SCRIPT)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    
+    return module
+
+
+@pytest.fixture()
+def trees(tmp_path):
+    source, destination = tmp_path / 'source', tmp_path / 'installed'
+    (source / 'resources').mkdir(parents=True)
+    (source / 'main.lua').write_text('return {}')
+    (source / 'metadata.xml').write_text('<metadata/>')
+    (source / 'resources' / 'hud.lua').write_text('return {}')
+    (source / '.git').mkdir()
+    (source / '.git' / 'HEAD').write_text('ref: refs/heads/master')
+    (source / 'main.lua.tmp').write_text('half written')
+    
+    return source, destination
+
+
+def _installed(destination) -> set:
+    return {os.path.relpath(os.path.join(r, f), destination).replace(os.sep, '/')
+            for r, _, files in os.walk(destination) for f in files}
+
+
+def test_first_deploys_copy_every_file(deploy, trees):
+    source, destination = trees
+    
+    assert deploy.Deployer(str(source), str(destination)).sync() == (3, 0)
+    assert _installed(destination) == {'main.lua', 'metadata.xml', 'resources/hud.lua', deploy.MANIFEST}
+    
+    with open(destination / deploy.MANIFEST, encoding='utf-8') as f:
+        manifest = json.load(f)
+    
+    assert manifest['main.lua'] == deploy.hash_file(str(source / 'main.lua'))
+
+
+def test_unchanged_files_are_not_copied(deploy, trees):
+    source, destination = trees
+    deploy.Deployer(str(source), str(destination)).sync()
+    
+    # A fresh deployer has nothing cached, so it relies on the manifest.
+    assert deploy.Deployer(str(source), str(destination)).sync() == (0, 0)
+
+
+def test_changed_files_are_copied(deploy, trees):
+    source, destination = trees
+    deployer = deploy.Deployer(str(source), str(destination))
+    deployer.sync()
+    
+    (source / 'main.lua').write_text('return {changed = true}')
+    
+    assert deployer.sync() == (1, 0)
+    assert (destination / 'main.lua').read_text() == 'return {changed = true}'
+
+
+def test_removed_files_are_removed(deploy, trees):
+    source, destination = trees
+    deployer = deploy.Deployer(str(source), str(destination))
+    deployer.sync()
+    
+    (source / 'resources' / 'hud.lua').unlink()
+    
+    assert deployer.sync() == (0, 1)
+    assert 'resources/hud.lua' not in _installed(destination)
+
+
+def test_files_deleted_by_hand_are_restored(deploy, trees):
+    source, destination = trees
+    deployer = deploy.Deployer(str(source), str(destination))
+    deployer.sync()
+    
+    (destination / 'metadata.xml').unlink()
+    
+    assert deployer.sync() == (1, 0)
+    assert (destination / 'metadata.xml').exists()
+
+
+def test_forced_deploys_copy_everything(deploy, trees):
+    source, destination = trees
+    deployer = deploy.Deployer(str(source), str(destination))
+    deployer.sync()
+    
+    assert deployer.sync(force=True) == (3, 0)
+
+
+def test_files_are_only_rehashed_when_touched(deploy, trees, monkeypatch):
+    source, destination = trees
+    deployer = deploy.Deployer(str(source), str(destination))
+    deployer.sync()
+    
+    hashed = []
+    original = deploy.hash_file
+    monkeypatch.setattr(deploy, 'hash_file', lambda file: hashed.append(file) or original(file))
+    
+    (source / 'main.lua').write_text('return {touched = true}')
+    deployer.sync()
+    
+    assert hashed == [os.path.join(str(source), 'main.lua')]
@@ -0,0 +1,107 @@
+# This file is part of Decision Descent.
+#
+# Decision Descent is free software:
+# you can redistribute it
+# and/or modify it under the
+# terms of the GNU General
+# Public License as published by
+# the Free Software Foundation,
+# either version 3 of the License,
+# or (at your option) any later
+# version.
+#
+# Decision Descent is distributed in
+# the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without
+# even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A
+# PARTICULAR PURPOSE.  See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the
+# GNU General Public License along with
+# Decision Descent.  If not,
+# see <https://www.gnu.org/licenses/>.
+import threading
+from concurrent import futures
+
+import pytest
+
+pytest.importorskip('PyQt5.QtCore')
+
+from client.dataclasses import Message
+from client.logic.executor import ExecutionMode, IntentExecutor
+
+
+def _message(intent: str) -> Message:
+    return Message(intent, (), {}, None)
+
+
+@pytest.fixture()
+def executor():
+    executor = IntentExecutor(threads=2, processes=1)
+    yield executor
+    executor.shutdown()
+
+
+def test_inline_handlers_are_returned_as_is(executor):
+    handler = len
+    
+    assert executor.wrap(handler, ExecutionMode.INLINE) is handler
+
+
+def test_threaded_handlers_run_off_the_calling_thread(executor):
+    handler = executor.wrap(lambda: threading.current_thread().name, ExecutionMode.THREAD)
+    future = handler()
+    
+    assert isinstance(future, futures.Future)
+    assert future.result(5).startswith('descent-intent')
+
+
+def test_bound_methods_cannot_run_in_processes(executor):
+    with pytest.raises(ValueError):
+        executor.wrap(executor.release, ExecutionMode.PROCESS)
+
+
+def test_gather_waits_for_every_future():
+    pending = futures.Future()
+    failed = futures.Future()
+    
+    assert IntentExecutor.gather([1, 2]) == [1, 2]
+    
+    combined = IntentExecutor.gather([1, pending, failed])
+    pending.set_result(2)
+    
+    assert not combined.done()
+    
+    failed.set_exception(RuntimeError('handler failed'))
+    
+    assert combined.result(0) == [1, 2, None]
+
+
+def test_results_are_released_in_message_order(executor):
+    replies = []
+    executor.onReply.connect(lambda message, result: replies.append((message.intent, result)))
+    slow, fast = futures.Future(), futures.Future()
+    
+    executor.track(_message('slow'), slow)
+    executor.track(_message('fast'), fast)
+    fast.set_result('fast result')
+    
+    assert replies == []
+    
+    executor.track(_message('inline'), 'inline result')
+    slow.set_result('slow result')
+    
+    assert replies == [('slow', 'slow result'), ('fast', 'fast result'), ('inline', 'inline result')]
+
+
+def test_failed_handlers_reply_with_nothing(executor):
+    replies = []
+    executor.onReply.connect(lambda message, result: replies.append((message.intent, result)))
+    failed = futures.Future()
+    
+    executor.track(_message('failed'), failed)
+    failed.set_exception(RuntimeError('handler failed'))
+    
+    assert replies == [('failed', None)]
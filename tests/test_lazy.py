@@ -0,0 +1,85 @@
+# This file is part of Decision Descent.
+#
+# Decision Descent is free software:
+# you can redistribute it
+# and/or modify it under the
+# terms of the GNU General
+# Public License as published by
+# the Free Software Foundation,
+# either version 3 of the License,
+# or (at your option) any later
+# version.
+#
+# Decision Descent is distributed in
+# the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without
+# even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A
+# PARTICULAR PURPOSE.  See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the
+# GNU General Public License along with
+# Decision Descent.  If not,
+# see <https://www.gnu.org/licenses/>.
+import ast
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+import client.logic
+
+_TESTS = os.path.dirname(os.path.abspath(__file__))
+_LOGIC = os.path.dirname(client.logic.__file__)
+
+
+def _defined(module: str) -> set:
+    """Returns the names a module defines at its top level, without
+    importing it."""
+    with open(os.path.join(_LOGIC, f'{module}.py'), encoding='utf-8') as f:
+        tree = ast.parse(f.read())
+    
+    names = set()
+    
+    for node in tree.body:
+        if isinstance(node, (ast.ClassDef, ast.FunctionDef)):
+            names.add(node.name)
+        
+        elif isinstance(node, ast.Assign):
+            names.update(t.id for t in node.targets if isinstance(t, ast.Name))
+    
+    return names
+
+
+def _imported(code: str) -> list:
+    """Runs code in a fresh interpreter, and returns the client modules it
+    imported."""
+    script = (f'import sys; sys.path.insert(0, {_TESTS!r}); import conftest\n'
+              f'{code}\n'
+              f'import json; print(json.dumps(sorted(m for m in sys.modules if m.startswith("client."))))')
+    result = subprocess.run([sys.executable, '-c', script], capture_output=True, text=True, check=True)
+    
+    return json.loads(result.stdout)
+
+
+def test_lazy_names_are_defined_by_their_modules():
+    for name, module in client.logic._LAZY.items():
+        assert name in _defined(module.lstrip('.')), f'{module} does not define {name}'
+
+
+def test_importing_the_package_imports_no_subsystems():
+    assert _imported('import client.logic') == ['client.logic']
+
+
+def test_subsystems_are_imported_on_first_use():
+    imported = _imported('import client.logic\nclient.logic.Router')
+    
+    assert imported == ['client.logic', 'client.logic.errors', 'client.logic.router']
+
+
+def test_unknown_names_raise_attribute_errors():
+    with pytest.raises(AttributeError):
+        client.logic.Nonexistent
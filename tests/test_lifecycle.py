@@ -0,0 +1,142 @@
+# This file is part of Decision Descent.
+#
+# Decision Descent is free software:
+# you can redistribute it
+# and/or modify it under the
+# terms of the GNU General
+# Public License as published by
+# the Free Software Foundation,
+# either version 3 of the License,
+# or (at your option) any later
+# version.
+#
+# Decision Descent is distributed in
+# the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without
+# even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A
+# PARTICULAR PURPOSE.  See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the
+# GNU General Public License along with
+# Decision Descent.  If not,
+# see <https://www.gnu.org/licenses/>.
+import typing
+
+import pytest
+
+QtCore = pytest.importorskip('PyQt5.QtCore')
+
+from client.logic.lifecycle import PollLifecycle, PollState
+
+
+class FakePoll(QtCore.QObject):
+    """Just enough of a poll for the lifecycle to manage."""
+    onFinish = QtCore.pyqtSignal(object)
+    
+    def __init__(self, intent: str, tally: typing.Dict[str, int] = None):
+        super(FakePoll, self).__init__()
+        
+        self.uid = None
+        self.intent = intent
+        self.started = None
+        self.deleted = False
+        self._tally = tally or {}
+    
+    def start(self, seconds: int = None):
+        self.started = seconds
+    
+    def delete(self):
+        self.deleted = True
+    
+    def tally(self) -> typing.Dict[str, int]:
+        return dict(self._tally)
+    
+    def is_multi(self) -> bool:
+        return False
+    
+    def get_winners(self) -> typing.List[str]:
+        return [max(self._tally, key=self._tally.get)] if self._tally else []
+    
+    def get_error_bounds(self):
+        return None
+
+
+def test_polls_move_through_their_states():
+    lifecycle = PollLifecycle()
+    poll = FakePoll('player.grant.collectible', {'105': 3, '114': 1})
+    uid = lifecycle.register(poll)
+    
+    assert lifecycle.get_state(uid) is PollState.CREATED
+    
+    lifecycle.start(poll, 30)
+    
+    assert poll.started == 30
+    assert lifecycle.get_state(uid) is PollState.RUNNING
+    
+    poll.onFinish.emit(poll)
+    
+    assert lifecycle.get_state(uid) is PollState.ARCHIVED
+    assert poll.deleted
+    assert lifecycle.live_count() == 0
+
+
+def test_archived_polls_leave_a_record():
+    lifecycle = PollLifecycle()
+    archived = []
+    lifecycle.onArchived.connect(archived.append)
+    
+    poll = FakePoll('player.grant.collectible', {'105': 3, '114': 1})
+    uid = lifecycle.register(poll)
+    poll.onFinish.emit(poll)
+    
+    record, = lifecycle.get_history()
+    
+    assert archived == [record]
+    assert record.uid == uid
+    assert record.intent == 'player.grant.collectible'
+    assert record.tally == (('105', 3), ('114', 1))
+    assert record.winners == ('105',)
+    assert record.participants == 4
+
+
+def test_history_is_bounded():
+    lifecycle = PollLifecycle(history=3)
+    
+    for _ in range(10):
+        poll = FakePoll('player.grant.collectible')
+        lifecycle.register(poll)
+        poll.onFinish.emit(poll)
+    
+    assert [r.uid for r in lifecycle.get_history()] == [8, 9, 10]
+    assert lifecycle.archived_count() == 10
+
+
+def test_finishing_twice_archives_once():
+    lifecycle = PollLifecycle()
+    poll = FakePoll('player.grant.collectible')
+    lifecycle.register(poll)
+    
+    poll.onFinish.emit(poll)
+    lifecycle.process_finish(poll)
+    
+    assert lifecycle.archived_count() == 1
+
+
+def test_discarded_polls_are_not_recorded():
+    lifecycle = PollLifecycle()
+    kept, discarded = FakePoll('player.grant.collectible'), FakePoll('player.grant.trinket')
+    lifecycle.register(kept)
+    lifecycle.register(discarded)
+    
+    lifecycle.discard(discarded)
+    
+    assert discarded.deleted
+    assert lifecycle.get_live() == [kept]
+    assert lifecycle.get_history() == []
+    
+    lifecycle.clear()
+    
+    assert kept.deleted
+    assert lifecycle.live_count() == 0
@@ -0,0 +1,117 @@
+# This file is part of Decision Descent.
+#
+# Decision Descent is free software:
+# you can redistribute it
+# and/or modify it under the
+# terms of the GNU General
+# Public License as published by
+# the Free Software Foundation,
+# either version 3 of the License,
+# or (at your option) any later
+# version.
+#
+# Decision Descent is distributed in
+# the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without
+# even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A
+# PARTICULAR PURPOSE.  See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the
+# GNU General Public License along with
+# Decision Descent.  If not,
+# see <https://www.gnu.org/licenses/>.
+import dataclasses
+
+from client.dataclasses import Message
+from client.logic.outbound import OutboundQueue, Priority
+
+
+def _message(intent: str, *args) -> Message:
+    return Message(intent, args, {}, None)
+
+
+def _drain(queue: OutboundQueue) -> list:
+    messages = []
+    
+    while queue:
+        messages.append(queue.pop())
+    
+    return messages
+
+
+def test_messages_are_sent_by_priority_then_order():
+    queue = OutboundQueue()
+    queue.push(_message('telemetry'), Priority.TELEMETRY)
+    queue.push(_message('hud'), Priority.HUD)
+    queue.push(_message('first reply'))
+    queue.push(_message('conclusion'), Priority.CRITICAL)
+    queue.push(_message('second reply'))
+    
+    assert [m.intent for m in _drain(queue)] == ['conclusion', 'first reply', 'second reply', 'hud', 'telemetry']
+    assert queue.pop() is None
+
+
+def test_keyed_messages_replace_each_other_in_place():
+    queue = OutboundQueue()
+    queue.push(_message('hud', 1), Priority.HUD, key='standings')
+    queue.push(_message('other'), Priority.HUD)
+    queue.push(_message('hud', 2), Priority.HUD, key='standings')
+    
+    assert [(m.intent, m.args) for m in _drain(queue)] == [('hud', (2,)), ('other', ())]
+    assert queue.merged[Priority.HUD] == 1
+
+
+def test_keyed_messages_are_merged():
+    def merge(old: Message, new: Message) -> Message:
+        return dataclasses.replace(new, args=old.args + new.args)
+    
+    queue = OutboundQueue()
+    
+    for i in range(3):
+        queue.push(_message('hud', i), Priority.HUD, key='standings', merge=merge)
+    
+    assert queue.pop().args == (0, 1, 2)
+    
+    # Keys are released once their message is sent.
+    queue.push(_message('hud', 3), Priority.HUD, key='standings', merge=merge)
+    
+    assert queue.pop().args == (3,)
+
+
+def test_keys_are_scoped_to_their_class():
+    queue = OutboundQueue()
+    queue.push(_message('hud'), Priority.HUD, key='standings')
+    queue.push(_message('config'), Priority.CONFIG, key='standings')
+    
+    assert len(queue) == 2
+
+
+def test_full_classes_drop_their_oldest_message():
+    queue = OutboundQueue({Priority.HUD: 2})
+    queue.push(_message('hud', 0), Priority.HUD, key='stale')
+    queue.push(_message('hud', 1), Priority.HUD)
+    queue.push(_message('hud', 2), Priority.HUD)
+    
+    assert [m.args for m in _drain(queue)] == [(1,), (2,)]
+    assert queue.dropped[Priority.HUD] == 1
+    
+    # The dropped message's key is free again.
+    queue.push(_message('hud', 3), Priority.HUD, key='stale')
+    
+    assert queue.merged[Priority.HUD] == 0
+
+
+def test_unlimited_classes_are_never_dropped():
+    queue = OutboundQueue()
+    
+    for i in range(1000):
+        queue.push(_message('conclusion', i), Priority.CRITICAL)
+    
+    assert len(queue) == 1000
+    assert queue.dropped[Priority.CRITICAL] == 0
+    
+    queue.clear()
+    
+    assert not queue
@@ -0,0 +1,107 @@
+# This file is part of Decision Descent.
+#
+# Decision Descent is free software:
+# you can redistribute it
+# and/or modify it under the
+# terms of the GNU General
+# Public License as published by
+# the Free Software Foundation,
+# either version 3 of the License,
+# or (at your option) any later
+# version.
+#
+# Decision Descent is distributed in
+# the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without
+# even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A
+# PARTICULAR PURPOSE.  See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the
+# GNU General Public License along with
+# Decision Descent.  If not,
+# see <https://www.gnu.org/licenses/>.
+import itertools
+
+import pytest
+
+from client.logic.policies import ConclusionPolicy, Lead, Quorum, Standings, Supermajority
+
+
+def test_policies_must_check_standings():
+    with pytest.raises(TypeError):
+        ConclusionPolicy()
+
+
+def test_remaining_voters_need_an_electorate():
+    assert Standings(3, 1, 4).remaining is None
+    assert Standings(3, 1, 4, electorate=10).remaining == 6
+    assert Standings(3, 1, 12, electorate=10).remaining == 0
+
+
+def test_leads_need_an_electorate():
+    assert not Lead().check(Standings(100, 0, 100))
+
+
+def test_leads_must_survive_every_remaining_vote():
+    assert not Lead().check(Standings(6, 2, 8, electorate=12))
+    assert Lead().check(Standings(7, 2, 9, electorate=12))
+
+
+def test_leads_must_survive_voters_switching():
+    # Without switching, a lead of 4 with 3 voters left is safe.
+    assert Lead().check(Standings(6, 2, 8, electorate=11))
+    
+    # Each switch away from the leader closes the gap by two.
+    assert not Lead().check(Standings(6, 2, 8, electorate=11, switchable=8))
+    assert not Lead().check(Standings(6, 2, 8, electorate=8, switchable=2))
+    assert Lead().check(Standings(6, 1, 7, electorate=7, switchable=1))
+
+
+def _worst_case(leader: int, runner_up: int, others: int, remaining: int) -> bool:
+    """Whether or not the runner-up can tie or pass the leader, if every
+    remaining voter and any number of existing voters back it."""
+    for switched in range(leader + others + 1):
+        from_leader = min(switched, leader)
+        
+        if runner_up + remaining + switched >= leader - from_leader:
+            return True
+    
+    return False
+
+
+def test_leads_are_never_concluded_while_they_can_be_caught():
+    for leader, runner_up, others, remaining in itertools.product(range(8), range(8), range(3), range(4)):
+        if runner_up > leader:
+            continue
+        
+        votes = leader + runner_up + others
+        standings = Standings(leader, runner_up, votes, electorate=votes + remaining, switchable=votes)
+        
+        if Lead().check(standings):
+            assert not _worst_case(leader, runner_up, others, remaining), standings
+
+
+def test_supermajorities():
+    policy = Supermajority(0.6, minimum=5)
+    
+    assert not policy.check(Standings(3, 0, 3))
+    assert not policy.check(Standings(5, 5, 10))
+    assert policy.check(Standings(6, 4, 10))
+    assert Supermajority(0.5, minimum=0).minimum == 1
+
+
+def test_quorums():
+    assert Quorum(5).check(Standings(3, 2, 5))
+    assert not Quorum(5).check(Standings(2, 2, 4))
+    
+    # Everyone must vote, which requires knowing who can.
+    assert not Quorum().check(Standings(3, 2, 5))
+    assert not Quorum().check(Standings(3, 2, 5, electorate=6))
+    assert Quorum().check(Standings(3, 2, 5, electorate=5))
+
+
+def test_policies_describe_themselves():
+    assert repr(Supermajority(0.75, 10)) == 'Supermajority(fraction=0.75, minimum=10)'
+    assert repr(Lead()) == 'Lead()'
@@ -0,0 +1,105 @@
+# This file is part of Decision Descent.
+#
+# Decision Descent is free software:
+# you can redistribute it
+# and/or modify it under the
+# terms of the GNU General
+# Public License as published by
+# the Free Software Foundation,
+# either version 3 of the License,
+# or (at your option) any later
+# version.
+#
+# Decision Descent is distributed in
+# the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without
+# even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A
+# PARTICULAR PURPOSE.  See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the
+# GNU General Public License along with
+# Decision Descent.  If not,
+# see <https://www.gnu.org/licenses/>.
+import random
+import string
+
+from client.logic.prefilter import BloomFilter, PreFilter
+
+
+def test_bloom_filter_has_no_false_negatives():
+    bloom = BloomFilter(500, 0.01)
+    items = [f'item-{i}' for i in range(500)]
+    
+    for item in items:
+        bloom.add(item)
+    
+    assert all(item in bloom for item in items)
+
+
+def test_bloom_filter_error_rate_at_capacity():
+    bloom = BloomFilter(1000, 0.01)
+    
+    for i in range(1000):
+        bloom.add(f'member-{i}')
+    
+    false_positives = sum(f'stranger-{i}' in bloom for i in range(20000))
+    
+    # Three times the requested rate leaves plenty of room for variance.
+    assert false_positives / 20000 < 0.03
+
+
+def test_empty_filter_rejects_everything():
+    prefilter = PreFilter()
+    prefilter.rebuild([])
+    
+    assert prefilter.check('1') is None
+    assert prefilter.check('the d6') is None
+    assert prefilter.stats.rejected_length == 2
+
+
+def test_tokens_pass_normalized():
+    prefilter = PreFilter()
+    prefilter.rebuild(['105', 'The D6', 'Brimstone'])
+    
+    assert prefilter.check('105') == '105'
+    assert prefilter.check('#105') == '105'
+    assert prefilter.check('  the d6 ') == 'the d6'
+    assert prefilter.check('BRIMSTONE') == 'brimstone'
+    assert prefilter.stats.passed == 4
+
+
+def test_shapes_that_cannot_be_votes_are_rejected():
+    prefilter = PreFilter()
+    prefilter.rebuild(['105', 'The D6'])
+    
+    assert prefilter.check('this is far too long to be any token') is None
+    assert prefilter.stats.rejected_length == 1
+    
+    assert prefilter.check('a b c') is None
+    assert prefilter.check('#12') is None
+    assert prefilter.stats.rejected_shape == 2
+
+
+def test_chat_is_mostly_rejected_by_the_bloom_filter():
+    prefilter = PreFilter()
+    prefilter.rebuild([str(i) for i in range(100, 200)])
+    rng = random.Random(0)
+    words = [''.join(rng.choice(string.ascii_lowercase) for _ in range(3)) for _ in range(1000)]
+    
+    passed = [w for w in words if prefilter.check(w) is not None]
+    
+    assert len(passed) < 50
+    assert prefilter.stats.rejected_bloom == 1000 - len(passed)
+    assert prefilter.stats.seen == 1000
+
+
+def test_rebuild_replaces_tokens():
+    prefilter = PreFilter()
+    prefilter.rebuild(['105'])
+    prefilter.rebuild(['The D6'])
+    
+    assert prefilter.check('the d6') == 'the d6'
+    assert prefilter.check('105') is None
+    assert prefilter.stats.rejected_length == 1
@@ -0,0 +1,105 @@
+# This file is part of Decision Descent.
+#
+# Decision Descent is free software:
+# you can redistribute it
+# and/or modify it under the
+# terms of the GNU General
+# Public License as published by
+# the Free Software Foundation,
+# either version 3 of the License,
+# or (at your option) any later
+# version.
+#
+# Decision Descent is distributed in
+# the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without
+# even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A
+# PARTICULAR PURPOSE.  See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the
+# GNU General Public License along with
+# Decision Descent.  If not,
+# see <https://www.gnu.org/licenses/>.
+import os
+
+import pytest
+
+from client.logic import catchable
+from client.logic.profiler import HandlerStats, Profiler
+
+
+@catchable.signal
+def process_vote(name: str):
+    return name
+
+
+def test_handler_stats_aggregate_calls():
+    stats = HandlerStats()
+    
+    for elapsed in (0.1, 0.3, 0.2):
+        stats.add(elapsed)
+    
+    assert stats.calls == 3
+    assert stats.mean == pytest.approx(0.2)
+    assert stats.worst == 0.3
+    assert HandlerStats().mean == 0.0
+
+
+def test_wrapped_slots_are_timed_while_running(tmp_path):
+    profiler = Profiler(str(tmp_path))
+    process_vote('before')
+    
+    profiler.start()
+    
+    for _ in range(3):
+        process_vote('during')
+    
+    recording = profiler.stop()
+    process_vote('after')
+    
+    assert not profiler.is_running()
+    assert recording.handlers['process_vote'].calls == 3
+    assert profiler.get_handlers()['process_vote'].calls == 3
+    assert recording.duration > 0
+
+
+def test_intents_are_timed_through_middleware(tmp_path):
+    profiler = Profiler(str(tmp_path))
+    
+    assert profiler.middleware('polls.create', lambda reply: reply, 'reply') == 'reply'
+    
+    profiler.start()
+    profiler.middleware('polls.create', lambda reply: reply, 'reply')
+    recording = profiler.stop()
+    
+    assert recording.handlers['intent:polls.create'].calls == 1
+
+
+def test_stopping_an_idle_profiler_records_nothing():
+    assert Profiler().stop() is None
+
+
+def test_recordings_are_written_with_a_summary(tmp_path):
+    profiler = Profiler(str(tmp_path / 'profiles'))
+    profiler.start()
+    process_vote('during')
+    path = profiler.write(profiler.stop())
+    
+    assert os.path.isfile(path)
+    
+    with open(os.path.splitext(path)[0] + '.txt', encoding='utf-8') as f:
+        summary = f.read()
+    
+    assert 'process_vote' in summary
+
+
+def test_unwritable_directories_are_reported(tmp_path):
+    blocked = tmp_path / 'blocked'
+    blocked.write_text('not a directory')
+    
+    profiler = Profiler(str(blocked))
+    profiler.start()
+    
+    assert profiler.write(profiler.stop()) is None
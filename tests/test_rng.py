@@ -0,0 +1,148 @@
+# This file is part of Decision Descent.
+#
+# Decision Descent is free software:
+# you can redistribute it
+# and/or modify it under the
+# terms of the GNU General
+# Public License as published by
+# the Free Software Foundation,
+# either version 3 of the License,
+# or (at your option) any later
+# version.
+#
+# Decision Descent is distributed in
+# the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without
+# even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A
+# PARTICULAR PURPOSE.  See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the
+# GNU General Public License along with
+# Decision Descent.  If not,
+# see <https://www.gnu.org/licenses/>.
+import collections
+import random
+
+import pytest
+
+from client.logic.rng import RNG, AliasTable, WeightedSampler
+
+
+def _frequencies(draw, count: int) -> dict:
+    counts = collections.Counter(draw() for _ in range(count))
+    
+    return {k: n / count for k, n in counts.items()}
+
+
+def test_alias_tables_draw_in_proportion():
+    table = AliasTable([1, 2, 7])
+    rng = random.Random(0)
+    frequencies = _frequencies(lambda: table.draw(rng), 50000)
+    
+    assert frequencies[0] == pytest.approx(0.1, abs=0.01)
+    assert frequencies[1] == pytest.approx(0.2, abs=0.01)
+    assert frequencies[2] == pytest.approx(0.7, abs=0.01)
+
+
+def test_alias_tables_need_a_positive_weight():
+    with pytest.raises(ValueError):
+        AliasTable([])
+    
+    with pytest.raises(ValueError):
+        AliasTable([0, 0])
+
+
+def test_samplers_skip_nonpositive_weights():
+    sampler = WeightedSampler({'a': 1, 'b': 0, 'c': -1}, random.Random(0))
+    
+    assert len(sampler) == 1
+    assert 'b' not in sampler
+    assert sampler.sample(3) == ['a']
+
+
+def test_removed_keys_are_never_drawn():
+    sampler = WeightedSampler({'a': 1, 'b': 1, 'c': 1, 'd': 97}, random.Random(0))
+    sampler.draw()
+    sampler.remove('d')
+    
+    assert 'd' not in sampler
+    assert {sampler.draw() for _ in range(1000)} == {'a', 'b', 'c'}
+
+
+def test_empty_pools_draw_nothing():
+    sampler = WeightedSampler({'a': 1}, random.Random(0))
+    sampler.remove('a')
+    
+    assert sampler.draw() is None
+    assert sampler.sample(2) == []
+
+
+def test_samples_are_distinct():
+    sampler = WeightedSampler({str(i): 1 + i for i in range(10)}, random.Random(0))
+    
+    for amount in (1, 3, 9, 10, 20):
+        picked = sampler.sample(amount)
+        
+        assert len(picked) == len(set(picked)) == min(amount, 10)
+
+
+def test_reweighting_changes_frequencies():
+    sampler = WeightedSampler({'a': 1, 'b': 1}, random.Random(0))
+    sampler.draw()
+    sampler.reweight('b', 9)
+    
+    assert _frequencies(sampler.draw, 20000)['b'] == pytest.approx(0.9, abs=0.01)
+    
+    sampler.reweight('b', 0)
+    
+    assert sampler.get_weights() == {'a': 1.0}
+
+
+def test_reweighting_restores_removed_keys():
+    sampler = WeightedSampler({'a': 1, 'b': 1, 'c': 1, 'd': 1}, random.Random(0))
+    sampler.draw()
+    sampler.remove('a')
+    sampler.reweight('a', 2)
+    
+    assert 'a' in sampler
+    assert len(sampler) == 4
+    assert _frequencies(sampler.draw, 20000)['a'] == pytest.approx(0.4, abs=0.01)
+
+
+def test_seeded_pools_are_reproducible():
+    weights = {str(i): 1 + i % 4 for i in range(50)}
+    first, second = RNG('seed'), RNG('seed')
+    first.set_pool('treasure', weights)
+    first.set_pool('devil', weights)
+    second.set_pool('devil', weights)
+    second.set_pool('treasure', weights)
+    
+    # Pools have their own streams, so the order they're drawn from doesn't
+    # matter.
+    first_draws = [first.sample('treasure', 3), first.sample('devil', 3)]
+    second_draws = [second.sample('devil', 3), second.sample('treasure', 3)]
+    
+    assert first_draws == second_draws[::-1]
+    assert RNG('another seed').seed == 'another seed'
+
+
+def test_reseeding_restores_removed_keys():
+    rng = RNG(1)
+    rng.set_pool('treasure', {'a': 1, 'b': 1})
+    rng.set_pool('devil', {'a': 1, 'c': 1})
+    first = rng.sample('treasure', 2)
+    
+    rng.remove('a')
+    
+    assert rng.sample('treasure', 2) == ['b']
+    assert rng.sample('devil', 2) == ['c']
+    
+    rng.reseed(1)
+    
+    assert rng.sample('treasure', 2) == first
+
+
+def test_unknown_pools_are_empty():
+    assert RNG(1).sample('treasure', 3) == []
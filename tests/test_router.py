@@ -0,0 +1,151 @@
+# This file is part of Decision Descent.
+#
+# Decision Descent is free software:
+# you can redistribute it
+# and/or modify it under the
+# terms of the GNU General
+# Public License as published by
+# the Free Software Foundation,
+# either version 3 of the License,
+# or (at your option) any later
+# version.
+#
+# Decision Descent is distributed in
+# the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without
+# even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A
+# PARTICULAR PURPOSE.  See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the
+# GNU General Public License along with
+# Decision Descent.  If not,
+# see <https://www.gnu.org/licenses/>.
+import pytest
+
+from client.dataclasses import Message
+from client.logic.errors import IntentExistsError, IntentNotFoundError
+from client.logic.router import Router
+
+
+def _route(name: str):
+    """Returns a handler that reports the route it was registered under."""
+    def handler(reply: str, *args, **kwargs):
+        return name, args, kwargs
+    
+    return handler
+
+
+def _router(*paths: str) -> Router:
+    router = Router()
+    
+    for path in paths:
+        router.add(path, _route(path))
+    
+    return router
+
+
+def test_exact_routes_are_resolved():
+    router = _router('polls.create', 'polls.delete')
+    
+    assert router.resolve('polls.create')('reply', '105') == ('polls.create', ('105',), {})
+    assert router.resolve('POLLS.DELETE')('reply')[0] == 'polls.delete'
+    assert 'Polls.Create' in router
+
+
+def test_single_segment_wildcards():
+    router = _router('player.*.collectible')
+    
+    assert router.resolve('player.grant.collectible')('reply')[0] == 'player.*.collectible'
+    
+    with pytest.raises(IntentNotFoundError):
+        router.resolve('player.collectible')
+    
+    with pytest.raises(IntentNotFoundError):
+        router.resolve('player.grant.extra.collectible')
+
+
+def test_trailing_wildcards():
+    router = _router('debug.**')
+    
+    assert router.resolve('debug.profile')('reply')[0] == 'debug.**'
+    assert router.resolve('debug.profile.start')('reply')[0] == 'debug.**'
+    
+    with pytest.raises(IntentNotFoundError):
+        router.resolve('polls.create')
+
+
+def test_most_specific_routes_win():
+    router = _router('player.**', 'player.*.*', 'player.grant.*', 'player.grant.trinket')
+    
+    assert router.resolve('player.grant.trinket')('reply')[0] == 'player.grant.trinket'
+    assert router.resolve('player.grant.collectible')('reply')[0] == 'player.grant.*'
+    assert router.resolve('player.take.collectible')('reply')[0] == 'player.*.*'
+    assert router.resolve('player.take')('reply')[0] == 'player.**'
+
+
+def test_wildcard_matches_are_cached():
+    router = _router('player.*.collectible')
+    handler = router.resolve('player.grant.collectible')
+    
+    assert router.table['player.grant.collectible'] is handler
+    assert router.resolve('player.grant.collectible') is handler
+
+
+def test_middleware_wraps_every_route_in_order():
+    calls = []
+    
+    def outer(path, call, *args, **kwargs):
+        calls.append(('outer', path))
+        return call(*args, **kwargs)
+    
+    def inner(path, call, *args, **kwargs):
+        calls.append(('inner', path))
+        return call(*args, **kwargs)
+    
+    router = _router('player.*.collectible')
+    router.use(outer)
+    router.add('polls.create', _route('polls.create'), middleware=[inner])
+    
+    assert router.resolve('polls.create')('reply', '105') == ('polls.create', ('105',), {})
+    assert router.resolve('player.grant.collectible')('reply')[0] == 'player.*.collectible'
+    assert calls == [('outer', 'polls.create'), ('inner', 'polls.create'), ('outer', 'player.grant.collectible')]
+
+
+def test_middleware_can_short_circuit():
+    router = _router('polls.create')
+    router.use(lambda path, call, *args, **kwargs: 'blocked')
+    
+    assert router.resolve('polls.create')('reply') == 'blocked'
+
+
+def test_routes_can_be_removed():
+    router = _router('polls.create', 'polls.*')
+    router.resolve('polls.delete')
+    router.remove('polls.*')
+    
+    assert router.get_routes() == ['polls.create']
+    
+    with pytest.raises(IntentNotFoundError):
+        router.resolve('polls.delete')
+    
+    with pytest.raises(IntentNotFoundError):
+        router.remove('polls.*')
+
+
+def test_duplicate_routes_are_rejected():
+    router = _router('polls.create')
+    
+    with pytest.raises(IntentExistsError):
+        router.add('Polls.Create', _route('polls.create'))
+
+
+def test_messages_dispatch_through_the_router():
+    router = _router('polls.*')
+    message = Message('polls.create', ('105',), {'105': ['The D6']}, 'player.grant.collectible')
+    
+    assert message(router) == ('polls.*', ('105',), {'105': ['The D6']})
+    
+    with pytest.raises(IntentNotFoundError):
+        Message('player.grant.collectible', (), {}, None)(router)
@@ -0,0 +1,158 @@
+# This file is part of Decision Descent.
+#
+# Decision Descent is free software:
+# you can redistribute it
+# and/or modify it under the
+# terms of the GNU General
+# Public License as published by
+# the Free Software Foundation,
+# either version 3 of the License,
+# or (at your option) any later
+# version.
+#
+# Decision Descent is distributed in
+# the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without
+# even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A
+# PARTICULAR PURPOSE.  See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the
+# GNU General Public License along with
+# Decision Descent.  If not,
+# see <https://www.gnu.org/licenses/>.
+import pytest
+
+from client.dataclasses import Message
+from client.logic.errors import MalformedMessageError
+from client.logic.schema import ListOf, MapOf, Nullable, Schema, compile_spec, exact_types
+
+
+@pytest.mark.parametrize('spec, value, expected', [
+    (str, 'abc', 'abc'),
+    (str, 105, '105'),
+    (str, 105.0, '105'),
+    (str, 1.5, '1.5'),
+    (int, 3, 3),
+    (int, 3.0, 3),
+    (int, '3', 3),
+    (float, 2, 2),
+    (float, '2.5', 2.5),
+    (bool, True, True),
+    (list, {}, []),
+    (dict, [], {}),
+    (object, {'a': 1}, {'a': 1}),
+    (Nullable(int), None, None),
+    (Nullable(int), '4', 4),
+    ((int, str), 'x', 'x'),
+    ((int, bool), '7', 7),
+    (ListOf(int), [1, '2', 3.0], [1, 2, 3]),
+    (MapOf(float), {'a': '1.5', 'b': 2}, {'a': 1.5, 'b': 2})
+])
+def test_values_are_coerced(spec, value, expected):
+    coerced = compile_spec(spec)(value, 'value')
+    
+    assert coerced == expected
+    assert type(coerced) is type(expected)
+
+
+@pytest.mark.parametrize('spec, value', [
+    (str, None),
+    (str, [1]),
+    (int, 3.5),
+    (int, 'three'),
+    (int, True),
+    (float, 'nan-ish'),
+    (bool, 1),
+    (list, {'a': 1}),
+    (dict, [1]),
+    (Nullable(int), 'x'),
+    ((int, bool), 'x'),
+    (ListOf(int), [1, 'two'])
+])
+def test_mismatched_values_are_rejected(spec, value):
+    with pytest.raises(MalformedMessageError):
+        compile_spec(spec)(value, 'value')
+
+
+def test_invalid_specs_are_rejected():
+    with pytest.raises(TypeError):
+        compile_spec(set)
+
+
+def test_exact_containers_are_not_copied():
+    value = [1, 2, 3]
+    
+    assert compile_spec(ListOf(int))(value, 'value') is value
+    assert compile_spec(ListOf(object))(value, 'value') is value
+
+
+def test_exact_types():
+    assert exact_types(float) == (float, int)
+    assert exact_types((int, str, int)) == (int, str)
+    assert exact_types(Nullable(bool)) == (bool, type(None))
+    assert exact_types((int, object)) is None
+    assert exact_types(ListOf(int)) == ()
+
+
+def test_rejections_say_where_the_value_was():
+    with pytest.raises(MalformedMessageError, match=r'args\[1\]\[2\]'):
+        Schema(str, ListOf(int))('polls.create', ['a', [1, 2, 'x']], {})
+    
+    with pytest.raises(MalformedMessageError, match=r'kwargs\.weights\.b'):
+        Schema(kwargs={'weights': MapOf(float)})('rng.pool.update', [], {'weights': {'a': 1, 'b': 'x'}})
+    
+    with pytest.raises(MalformedMessageError, match=r'^polls\.create: '):
+        Schema(int)('polls.create', ['x'], {})
+
+
+def test_arguments_are_coerced():
+    schema = Schema(str, int, kwargs={'weight': float})
+    
+    assert schema('intent', [105, '3'], {'weight': '0.5'}) == (('105', 3), {'weight': 0.5})
+
+
+def test_argument_counts_are_checked():
+    schema = Schema(str, int, required=1)
+    
+    assert schema('intent', ['a'], {}) == (('a',), {})
+    assert schema('intent', ['a', 2], {}) == (('a', 2), {})
+    
+    with pytest.raises(MalformedMessageError, match='at least 1'):
+        schema('intent', [], {})
+    
+    with pytest.raises(MalformedMessageError, match='at most 2'):
+        schema('intent', ['a', 2, 3], {})
+
+
+def test_varargs_are_coerced():
+    schema = Schema(str, varargs=int)
+    
+    assert schema('intent', ['a', 1, '2', 3.0], {}) == (('a', 1, 2, 3), {})
+    
+    with pytest.raises(MalformedMessageError, match=r'args\[2\]'):
+        schema('intent', ['a', 1, 'x'], {})
+
+
+def test_keyword_arguments_are_checked():
+    schema = Schema(kwargs={'atomic': bool})
+    
+    assert schema('batch', [], {'atomic': True}) == ((), {'atomic': True})
+    
+    with pytest.raises(MalformedMessageError, match='unexpected keyword argument "other"'):
+        schema('batch', [], {'other': 1})
+    
+    extra = Schema(extra=ListOf(str))
+    
+    assert extra('polls.create', [], {'105': ['The D6', 6]}) == ((), {'105': ['The D6', '6']})
+
+
+def test_messages_are_validated_against_their_intent_schema():
+    schemas = {'polls.delete': Schema(str)}
+    
+    assert Message.from_json({'intent': 'Polls.Delete', 'args': [5]}, schemas).args == ('5',)
+    assert Message.from_json({'intent': 'polls.create', 'args': [5]}, schemas).args == (5,)
+    
+    with pytest.raises(MalformedMessageError):
+        Message.from_json({'intent': 'polls.delete', 'args': []}, schemas)
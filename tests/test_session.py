@@ -0,0 +1,156 @@
+# This file is part of Decision Descent.
+#
+# Decision Descent is free software:
+# you can redistribute it
+# and/or modify it under the
+# terms of the GNU General
+# Public License as published by
+# the Free Software Foundation,
+# either version 3 of the License,
+# or (at your option) any later
+# version.
+#
+# Decision Descent is distributed in
+# the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without
+# even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A
+# PARTICULAR PURPOSE.  See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the
+# GNU General Public License along with
+# Decision Descent.  If not,
+# see <https://www.gnu.org/licenses/>.
+import json
+import typing
+
+from client.dataclasses import Message
+from client.logic.session import Handshake, Session
+
+
+def _message(intent: str) -> Message:
+    return Message(intent, (), {}, None)
+
+
+def _decode(data: bytes) -> dict:
+    return json.loads(data.decode())
+
+
+def _connect(session: Session, resume: str = None, last: int = 0) -> typing.Tuple[str, Handshake]:
+    """Completes a handshake, and returns the session's id along with it."""
+    handshake = session.resume(resume, last)
+    
+    return _decode(handshake.data[0])['args'][0], handshake
+
+
+def _send(session: Session, *intents: str) -> typing.List[bytes]:
+    for intent in intents:
+        session.push(_message(intent))
+    
+    return [session.next() for _ in intents]
+
+
+def test_messages_are_numbered():
+    session = Session()
+    _connect(session)
+    
+    sent = [_decode(d) for d in _send(session, 'a', 'b', 'c')]
+    
+    assert [m['seq'] for m in sent] == [1, 2, 3]
+    assert [m['intent'] for m in sent] == ['a', 'b', 'c']
+    assert session.sent == 3
+
+
+def test_resuming_replays_missed_messages():
+    session = Session()
+    identifier, _ = _connect(session)
+    sent = _send(session, 'a', 'b', 'c', 'd')
+    
+    session.detach()
+    resumed_id, handshake = _connect(session, identifier, 2)
+    
+    assert handshake.resumed
+    assert resumed_id == identifier
+    assert handshake.data[1:] == tuple(sent[2:])
+
+
+def test_unknown_sessions_start_over():
+    session = Session()
+    identifier, _ = _connect(session)
+    _send(session, 'a', 'b')
+    
+    session.detach()
+    new_id, handshake = _connect(session, 'somebody else', 2)
+    
+    assert not handshake.resumed
+    assert new_id != identifier
+    assert handshake.data[1:] == ()
+    assert _decode(_send(session, 'c')[0])['seq'] == 1
+
+
+def test_sessions_that_fell_out_of_the_buffer_start_over():
+    session = Session(replay=4)
+    identifier, _ = _connect(session)
+    _send(session, *'abcdefgh')
+    
+    session.detach()
+    _, handshake = _connect(session, identifier, 2)
+    
+    assert not handshake.resumed
+
+
+def test_acknowledged_messages_are_dropped():
+    session = Session()
+    identifier, _ = _connect(session)
+    _send(session, 'a', 'b', 'c')
+    
+    session.receive(b'{"intent": "noop", "seq": 1, "ack": 2}')
+    session.detach()
+    
+    # The acknowledged messages can no longer be replayed.
+    assert not session.resume(identifier, 1).resumed
+    
+    identifier, _ = _connect(session)
+    sent = _send(session, 'a', 'b', 'c')
+    
+    session.receive(b'{"intent": "noop", "seq": 1, "ack": 2}')
+    session.detach()
+    _, handshake = _connect(session, identifier, 2)
+    
+    assert handshake.resumed
+    assert handshake.data[1:] == (sent[2],)
+
+
+def test_replayed_messages_are_ignored():
+    session = Session()
+    _connect(session)
+    
+    first = session.receive(b'{"intent": "noop", "seq": 1}')
+    replayed = session.receive(b'{"intent": "noop", "seq": 1}')
+    
+    assert first == Message('noop', (), {}, None)
+    assert replayed is None
+    assert _decode(_send(session, 'a')[0])['ack'] == 1
+
+
+def test_invalid_lines_are_rejected():
+    session = Session()
+    _connect(session)
+    
+    assert session.receive(b'not json') is None
+    assert session.receive(b'[1, 2, 3]') is None
+    assert session.receive(b'{"intent": "noop", "seq": true}') is None
+    assert session.receive(b'{"intent": "session.resume", "args": [null, "last"]}') is None
+
+
+def test_handshakes_are_received_like_messages():
+    session = Session()
+    handshake = session.receive(b'{"intent": "session.resume", "args": [null, 0]}')
+    
+    assert isinstance(handshake, Handshake)
+    assert session.established
+    
+    session.detach()
+    
+    assert not session.established
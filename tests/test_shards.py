@@ -0,0 +1,211 @@
+# This file is part of Decision Descent.
+#
+# Decision Descent is free software:
+# you can redistribute it
+# and/or modify it under the
+# terms of the GNU General
+# Public License as published by
+# the Free Software Foundation,
+# either version 3 of the License,
+# or (at your option) any later
+# version.
+#
+# Decision Descent is distributed in
+# the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without
+# even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A
+# PARTICULAR PURPOSE.  See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the
+# GNU General Public License along with
+# Decision Descent.  If not,
+# see <https://www.gnu.org/licenses/>.
+import multiprocessing
+import os
+import random
+import signal
+import time
+import types
+
+import pytest
+
+from client.logic import shards
+from client.logic.shards import Shard, ShardPool, _merge, shard_of
+
+LOOKUP = {'105': '105', 'the d6': '105', '114': '114', 'knife': '114', '118': '118'}
+
+
+def _votes(count: int, seed: int = 0) -> list:
+    """Returns a chat log of votes, where some participants change their
+    minds."""
+    rng = random.Random(seed)
+    tokens = list(LOOKUP)
+    
+    return [(f'viewer{rng.randrange(count // 2)}', rng.choice(tokens)) for _ in range(count)]
+
+
+def _shard(polls: list, votes: list) -> Shard:
+    shard = Shard()
+    shard.sync(polls)
+    shard.add_votes(votes)
+    
+    return shard
+
+
+def test_partitions_are_stable_and_balanced():
+    names = [f'viewer{i}' for i in range(10000)]
+    counts = [0] * 4
+    
+    for name in names:
+        counts[shard_of(name, 4)] += 1
+    
+    assert [shard_of(n, 4) for n in names[:100]] == [shard_of(n, 4) for n in names[:100]]
+    assert all(2200 < c < 2800 for c in counts)
+    assert shard_of('viewer', 1) == 0
+
+
+def test_shards_count_votes_like_a_poll():
+    shard = _shard([(1, LOOKUP, True)], [('a', '105'), ('b', 'the d6'), ('a', 'knife'), ('c', 'unknown')])
+    
+    assert shard.collect() == {1: ({'105': 1, '114': 1, '118': 0}, 2)}
+
+
+def test_votes_go_to_the_first_active_poll():
+    polls = [(1, {'105': '105'}, False), (2, {'105': '105', '114': '114'}, True), (3, {'105': '105'}, True)]
+    shard = _shard(polls, [('a', '105')])
+    
+    assert shard.collect() == {1: ({'105': 0}, 0), 2: ({'105': 1, '114': 0}, 1), 3: ({'105': 0}, 0)}
+    
+    shard.activate(1, True)
+    shard.add_votes([('b', '105')])
+    
+    assert shard.collect()[1] == ({'105': 1}, 1)
+
+
+def test_syncing_keeps_live_tallies():
+    shard = _shard([(1, LOOKUP, True), (2, LOOKUP, True)], [('a', '105'), ('b', '114')])
+    
+    # Poll 2 went away, and poll 1 lost a choice.
+    shard.sync([(1, {'105': '105', '118': '118'}, True)])
+    
+    assert shard.collect() == {1: ({'105': 1, '118': 0}, 2)}
+
+
+def test_merged_shards_match_a_single_tally():
+    polls = [(1, LOOKUP, True)]
+    votes = _votes(5000)
+    partitions = [[] for _ in range(4)]
+    
+    for name, token in votes:
+        partitions[shard_of(name, 4)].append((name, token))
+    
+    merged = _merge(_shard(polls, p).collect() for p in partitions)
+    
+    assert merged == _shard(polls, votes).collect()
+
+
+@pytest.fixture()
+def pool(monkeypatch):
+    pytest.importorskip('PyQt5.QtCore')
+    from client.logic.clock import VirtualClock
+    
+    # Spawned workers would import the client's package, which needs
+    # ShovelBot.  Forked workers inherit the package the tests registered.
+    monkeypatch.setattr(shards, 'multiprocessing', types.SimpleNamespace(
+        get_context=lambda _: multiprocessing.get_context('fork')
+    ))
+    
+    clock = VirtualClock()
+    pool = ShardPool(clock, timeout=1.0)
+    pool.start(3)
+    
+    yield clock, pool
+    
+    pool.stop()
+
+
+def _wait(clock, answers: list):
+    """Advances the pool's clock until a request is answered."""
+    deadline = time.monotonic() + 10
+    
+    while not answers and time.monotonic() < deadline:
+        time.sleep(0.005)
+        clock.advance(0.01)
+    
+    assert answers, 'The request was never answered'
+
+
+def test_pools_tally_votes_across_processes(pool):
+    clock, pool = pool
+    polls = [(1, LOOKUP, True)]
+    votes = _votes(2000)
+    answers = []
+    
+    pool.sync(polls)
+    
+    for name, token in votes:
+        pool.submit(name, token)
+    
+    pool.request(answers.append)
+    _wait(clock, answers)
+    
+    assert answers == [_shard(polls, votes).collect()]
+    assert pool.get_partials() == answers[0]
+
+
+def test_requests_are_answered_without_lost_shards(pool):
+    clock, pool = pool
+    polls = [(1, LOOKUP, True)]
+    votes = _votes(2000)
+    answers = []
+    
+    pool.sync(polls)
+    
+    for name, token in votes:
+        pool.submit(name, token)
+    
+    pool._workers[0][0].terminate()
+    pool._workers[0][0].join()
+    pool.request(answers.append)
+    _wait(clock, answers)
+    
+    survivors = _shard(polls, [(n, t) for n, t in votes if shard_of(n, 3) != 0]).collect()
+    
+    assert answers == [survivors]
+
+
+def test_unresponsive_shards_time_out(pool):
+    clock, pool = pool
+    answers = []
+    stalled = pool._workers[1][0].pid
+    
+    pool.sync([(1, LOOKUP, True)])
+    os.kill(stalled, signal.SIGSTOP)
+    
+    try:
+        pool.request(answers.append)
+        
+        for _ in range(50):
+            time.sleep(0.005)
+            pool.receive()
+        
+        assert answers == []
+        
+        clock.advance(pool.timeout)
+        
+        assert answers == [{1: ({'105': 0, '114': 0, '118': 0}, 0)}]
+    
+    finally:
+        os.kill(stalled, signal.SIGCONT)
+
+
+def test_stopping_answers_pending_requests(pool):
+    _, pool = pool
+    answers = []
+    
+    pool.request(answers.append)
+    pool.stop()
+    
+    assert len(answers) == 1
@@ -0,0 +1,127 @@
+# This file is part of Decision Descent.
+#
+# Decision Descent is free software:
+# you can redistribute it
+# and/or modify it under the
+# terms of the GNU General
+# Public License as published by
+# the Free Software Foundation,
+# either version 3 of the License,
+# or (at your option) any later
+# version.
+#
+# Decision Descent is distributed in
+# the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without
+# even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A
+# PARTICULAR PURPOSE.  See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the
+# GNU General Public License along with
+# Decision Descent.  If not,
+# see <https://www.gnu.org/licenses/>.
+import pytest
+
+from client.logic.prefilter import BloomFilter
+from client.logic.sketch import ApproximateTally
+
+
+def _vote(tally: ApproximateTally, voters: int, split: float = 0.7):
+    """Casts a vote for every voter, splitting them between two choices."""
+    for i in range(voters):
+        tally.add(f'viewer{i}', 'a' if i < voters * split else 'b')
+
+
+def test_bloom_filter_adds_report_new_items():
+    bloom = BloomFilter(100, 0.01, hashes=3)
+    
+    assert bloom.add('viewer')
+    assert not bloom.add('viewer')
+    assert 'viewer' in bloom
+
+
+def test_unsampled_tallies_are_exact():
+    tally = ApproximateTally(['a', 'b'])
+    _vote(tally, 1000)
+    
+    assert tally.tally() == {'a': 700, 'b': 300}
+    assert tally.participants() == 1000
+
+
+def test_only_first_votes_count():
+    tally = ApproximateTally(['a', 'b'])
+    
+    assert tally.add('viewer', 'a')
+    assert not tally.add('viewer', 'b')
+    assert tally.has_voted('viewer')
+    assert tally.tally() == {'a': 1, 'b': 0}
+
+
+def test_participants_are_either_always_or_never_sampled():
+    tally = ApproximateTally(['a', 'b'], sample_rate=0.1)
+    names = [f'viewer{i}' for i in range(1000)]
+    sampled = [n for n in names if tally.is_sampled(n)]
+    
+    assert sampled == [n for n in names if tally.is_sampled(n)]
+    assert 50 < len(sampled) < 150
+    
+    for name in names:
+        assert tally.add(name, 'a') == (name in sampled)
+    
+    assert not any(tally.has_voted(n) for n in names if n not in sampled)
+
+
+def test_sampled_tallies_are_scaled_up():
+    tally = ApproximateTally(['a', 'b'], sample_rate=0.1)
+    _vote(tally, 50000)
+    
+    estimate = tally.tally()
+    
+    assert estimate['a'] == pytest.approx(35000, rel=0.1)
+    assert estimate['b'] == pytest.approx(15000, rel=0.15)
+    assert tally.participants() == pytest.approx(50000, rel=0.1)
+
+
+def test_absorbed_votes_are_counted_exactly():
+    tally = ApproximateTally(['a', 'b'], sample_rate=0.01)
+    tally.absorb({'first': 'a', 'second': 'a', 'third': 'b'})
+    
+    assert tally.tally() == {'a': 2, 'b': 1}
+    assert tally.participants() == 3
+    assert not tally.add('first', 'b')
+
+
+def test_choices_can_change():
+    tally = ApproximateTally(['a'])
+    tally.add_choice('b')
+    tally.add('viewer', 'b')
+    tally.remove_choice('a')
+    
+    assert tally.tally() == {'b': 1}
+
+
+def test_bounds_reflect_the_sample():
+    exact = ApproximateTally(['a', 'b'])
+    _vote(exact, 1000)
+    bounds = exact.get_bounds()
+    
+    assert bounds.sample_rate == 1.0
+    assert bounds.participants == 0.0
+    assert bounds.confidence == 1.0
+    
+    sampled = ApproximateTally(['a', 'b'], sample_rate=0.1)
+    _vote(sampled, 50000)
+    bounds = sampled.get_bounds()
+    
+    assert 0 < bounds.participants < 0.05
+    assert bounds.confidence > 0.99
+    assert bounds.duplicate_rate < 0.001
+
+
+def test_ties_are_a_coin_flip():
+    tally = ApproximateTally(['a', 'b'], sample_rate=0.5)
+    tally.absorb({'first': 'a', 'second': 'b'})
+    
+    assert tally.get_bounds().confidence == 0.5
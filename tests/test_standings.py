@@ -0,0 +1,187 @@
+# This file is part of Decision Descent.
+#
+# Decision Descent is free software:
+# you can redistribute it
+# and/or modify it under the
+# terms of the GNU General
+# Public License as published by
+# the Free Software Foundation,
+# either version 3 of the License,
+# or (at your option) any later
+# version.
+#
+# Decision Descent is distributed in
+# the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without
+# even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A
+# PARTICULAR PURPOSE.  See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the
+# GNU General Public License along with
+# Decision Descent.  If not,
+# see <https://www.gnu.org/licenses/>.
+import typing
+
+import pytest
+
+pytest.importorskip('PyQt5.QtCore')
+
+from client.dataclasses import Message
+from client.logic.clock import VirtualClock
+from client.logic.standings import StandingsStream, merge_standings
+
+
+class FakePoll:
+    """Just enough of a poll for the stream to encode."""
+    
+    def __init__(self, uid: int, counts: typing.Dict[str, int], remaining: int = 30):
+        self.uid = uid
+        self.counts = counts
+        self.remaining = remaining
+    
+    def tally(self) -> typing.Dict[str, int]:
+        return dict(self.counts)
+    
+    def get_remaining(self) -> int:
+        return self.remaining
+
+
+def _standings(*entries: list) -> Message:
+    return Message('hud.standings', entries, {}, None)
+
+
+def test_merged_updates_keep_every_change():
+    merged = merge_standings(
+        _standings([1, 30, 3, '105', 2, '114', 1], [2, 20, 1, '5', 1]),
+        _standings([1, 29, 4, '114', 2])
+    )
+    
+    assert merged.args == ([2, 20, 1, '5', 1], [1, 29, 4, '105', 2, '114', 2])
+
+
+def test_removals_replace_earlier_updates():
+    merged = merge_standings(_standings([1, 30, 3, '105', 3]), _standings([1]))
+    
+    assert merged.args == ([1],)
+
+
+def test_updates_after_a_removal_are_kept_alongside_it():
+    merged = merge_standings(
+        _standings([1, 30, 3, '105', 3], [1]),
+        _standings([1, 30, 0, '118', 0], [1, 29, 1, '118', 1])
+    )
+    
+    assert merged.args == ([1], [1, 29, 1, '118', 1])
+
+
+@pytest.fixture()
+def stream():
+    clock = VirtualClock()
+    polls = {}
+    sent = []
+    enabled = [True]
+    stream = StandingsStream(clock, lambda: list(polls.values()), sent.append, rate=4.0,
+                             enabled=lambda: enabled[0])
+    
+    return clock, polls, sent, enabled, stream
+
+
+def test_new_polls_are_sent_in_full(stream):
+    clock, polls, sent, _, standings = stream
+    polls[1] = FakePoll(1, {'105': 0, '114': 0})
+    
+    standings.mark()
+    clock.advance(1)
+    
+    assert sent == [[[1, 30, 0, '105', 0, '114', 0]]]
+
+
+def test_only_changed_counts_are_sent(stream):
+    clock, polls, sent, _, standings = stream
+    polls[1] = FakePoll(1, {'105': 0, '114': 0})
+    standings.mark()
+    clock.advance(1)
+    
+    polls[1].counts['114'] = 2
+    standings.mark(1)
+    clock.advance(1)
+    
+    assert sent[-1] == [[1, 30, 2, '114', 2]]
+
+
+def test_updates_are_throttled(stream):
+    clock, polls, sent, _, standings = stream
+    polls[1] = FakePoll(1, {'105': 0})
+    
+    for _ in range(10):
+        polls[1].counts['105'] += 1
+        standings.mark(1)
+        clock.advance(0.0625)
+    
+    clock.advance(1)
+    
+    # Four updates a second, starting immediately.
+    assert [update[0][2] for update in sent] == [1, 4, 8, 10]
+
+
+def test_removed_polls_are_announced(stream):
+    clock, polls, sent, _, standings = stream
+    polls[1] = FakePoll(1, {'105': 0})
+    standings.mark()
+    clock.advance(1)
+    
+    del polls[1]
+    standings.mark()
+    clock.advance(1)
+    
+    assert sent[-1] == [[1]]
+
+
+def test_changed_choices_start_over(stream):
+    clock, polls, sent, _, standings = stream
+    polls[1] = FakePoll(1, {'105': 1})
+    standings.mark()
+    clock.advance(1)
+    
+    polls[1].counts = {'105': 1, '118': 0}
+    standings.mark(1)
+    clock.advance(1)
+    
+    assert sent[-1] == [[1], [1, 30, 1, '105', 1, '118', 0]]
+
+
+def test_disabled_streams_catch_up_once_enabled(stream):
+    clock, polls, sent, enabled, standings = stream
+    polls[1] = FakePoll(1, {'105': 0, '114': 0})
+    standings.mark()
+    clock.advance(1)
+    
+    enabled[0] = False
+    standings.mark()
+    clock.advance(1)
+    
+    # Counts may change without being marked while the HUD is disabled, so
+    # the stream compares every poll against what it last sent.
+    polls[1].counts['105'] = 3
+    
+    assert len(sent) == 1
+    
+    enabled[0] = True
+    standings.mark()
+    clock.advance(1)
+    
+    assert sent[-1] == [[1, 30, 3, '105', 3]]
+
+
+def test_resetting_resends_everything(stream):
+    clock, polls, sent, _, standings = stream
+    polls[1] = FakePoll(1, {'105': 2})
+    standings.mark()
+    clock.advance(1)
+    
+    standings.reset()
+    clock.advance(1)
+    
+    assert sent[-1] == [[1, 30, 2, '105', 2]]
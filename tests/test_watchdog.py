@@ -0,0 +1,115 @@
+# This file is part of Decision Descent.
+#
+# Decision Descent is free software:
+# you can redistribute it
+# and/or modify it under the
+# terms of the GNU General
+# Public License as published by
+# the Free Software Foundation,
+# either version 3 of the License,
+# or (at your option) any later
+# version.
+#
+# Decision Descent is distributed in
+# the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without
+# even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A
+# PARTICULAR PURPOSE.  See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the
+# GNU General Public License along with
+# Decision Descent.  If not,
+# see <https://www.gnu.org/licenses/>.
+import time
+
+import pytest
+
+QtCore = pytest.importorskip('PyQt5.QtCore')
+
+from client.logic import catchable
+from client.logic.watchdog import Watchdog
+
+
+@catchable.signal
+def slow_slot(seconds: float):
+    time.sleep(seconds)
+
+
+@catchable.signal
+def fast_slot():
+    pass
+
+
+@pytest.fixture(scope='module')
+def application():
+    return QtCore.QCoreApplication.instance() or QtCore.QCoreApplication([])
+
+
+@pytest.fixture()
+def watchdog(application):
+    # The heartbeat is driven by hand, so its interval only needs to be
+    # shorter than the time the tests wait for.
+    watchdog = Watchdog(interval=0, threshold=0.02, capacity=3)
+    watchdog.start()
+    yield watchdog
+    watchdog.stop()
+
+
+def test_stalls_are_blamed_on_the_slowest_handler(watchdog):
+    stalls = []
+    watchdog.onStall.connect(stalls.append)
+    
+    fast_slot()
+    slow_slot(0.05)
+    fast_slot()
+    watchdog.beat()
+    
+    stall, = stalls
+    
+    assert stall.handler == 'slow_slot'
+    assert stall.elapsed >= 0.05
+    assert stall.latency >= 0.05
+    assert stall.active == ()
+
+
+def test_prompt_heartbeats_are_not_stalls(watchdog):
+    fast_slot()
+    watchdog.beat()
+    
+    assert watchdog.stalls == 0
+    assert watchdog.get_stalls() == []
+
+
+def test_stalls_without_handlers_are_unattributed(watchdog):
+    time.sleep(0.03)
+    watchdog.beat()
+    
+    stall, = watchdog.get_stalls()
+    
+    assert stall.handler is None
+
+
+def test_only_the_worst_stalls_are_kept(watchdog):
+    for seconds in (0.05, 0.03, 0.09, 0.04, 0.07):
+        slow_slot(seconds)
+        watchdog.beat()
+    
+    kept = [s.elapsed for s in watchdog.get_stalls()]
+    
+    assert watchdog.stalls == 5
+    assert kept == pytest.approx([0.09, 0.07, 0.05], abs=0.01)
+    
+    watchdog.clear()
+    
+    assert watchdog.get_stalls() == []
+
+
+def test_stopped_watchdogs_ignore_handlers(watchdog):
+    watchdog.stop()
+    slow_slot(0.03)
+    watchdog.start()
+    watchdog.beat()
+    
+    assert watchdog.stalls == 0